@@ -0,0 +1,151 @@
+import asyncio
+import json
+import math
+import time
+
+from app.metrics import registry
+
+
+ADMISSION_REJECTIONS = registry.counter("vastu_admission_rejections_total", "Requests shed by admission control.")
+ADMISSION_WAIT = registry.histogram("vastu_admission_wait_seconds", "Time admitted requests spent queued.")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit plus a bounded FIFO wait queue for one class of endpoints.
+
+    - Up to `max_concurrency` requests run at once.
+    - Up to `max_queue` more wait, each for at most `queue_timeout` seconds (503).
+    - Anything beyond that is rejected immediately (429).
+
+    All bookkeeping happens on the event loop, so no locks are needed.
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of service time, used to suggest Retry-After
+        self._avg_service = 1.0
+
+    def retry_after(self):
+        backlog = (self.waiting + self.active) / self.max_concurrency
+        return max(1, math.ceil(backlog * self._avg_service))
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue_full")
+                raise AdmissionRejected(429, f"{self.name} queue is full", self.retry_after())
+
+            self.waiting += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("queue_timeout")
+                raise AdmissionRejected(503, f"{self.name} queue wait exceeded {self.queue_timeout}s", self.retry_after())
+            finally:
+                self.waiting -= 1
+            ADMISSION_WAIT.observe(time.perf_counter() - start, pool=self.name)
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        return time.perf_counter()
+
+    def release(self, started):
+        self.active -= 1
+        elapsed = time.perf_counter() - started
+        self._avg_service = 0.8 * self._avg_service + 0.2 * elapsed
+        self._semaphore.release()
+
+    def _reject(self, reason):
+        self.rejected += 1
+        ADMISSION_REJECTIONS.inc(pool=self.name, reason=reason)
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware (not BaseHTTPMiddleware) so a slot stays held until
+    the response body has been fully sent, including streaming responses.
+    """
+
+    def __init__(self, app, heavy, light, heavy_paths=(), exempt_paths=(), heavy_suffixes=()):
+        self.app = app
+        self.heavy = heavy
+        self.light = light
+        # Prefixes, plus suffixes for routes with an id in the middle
+        self.heavy_paths = tuple(heavy_paths)
+        self.heavy_suffixes = tuple(heavy_suffixes)
+        self.exempt_paths = set(exempt_paths)
+
+    def _controller_for(self, path):
+        if path in self.exempt_paths:
+            return None
+        if path.startswith(self.heavy_paths) or path.endswith(self.heavy_suffixes):
+            return self.heavy
+        return self.light
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        controller = self._controller_for(scope["path"])
+        if controller is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            started = await controller.acquire()
+        except AdmissionRejected as e:
+            await self._send_rejection(send, e)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(started)
+
+    async def _send_rejection(self, send, rejection):
+        body = json.dumps({"detail": rejection.reason}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejection.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def admission_collector(*controllers):
+    def collect():
+        return [
+            ("vastu_admission_queue_depth", "gauge", "Requests waiting for an admission slot.",
+             [({"pool": c.name}, c.waiting) for c in controllers]),
+            ("vastu_admission_in_flight", "gauge", "Requests currently holding an admission slot.",
+             [({"pool": c.name}, c.active) for c in controllers]),
+            ("vastu_admission_limit", "gauge", "Configured concurrency limit.",
+             [({"pool": c.name}, c.max_concurrency) for c in controllers]),
+        ]
+    return collect
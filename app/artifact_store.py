@@ -0,0 +1,151 @@
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+
+
+class Artifact:
+    __slots__ = ("id", "content_type", "data", "filename")
+
+    def __init__(self, artifact_id, content_type, data, filename=None):
+        self.id = artifact_id
+        self.content_type = content_type
+        self.data = data
+        self.filename = filename
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else 0
+
+    @property
+    def pending(self):
+        # Reserved for output still being built (deferred reports)
+        return self.data is None
+
+    @property
+    def etag(self):
+        # An id always names the same bytes (content hash, or a reserved id
+        # filled exactly once), so it is a valid strong validator
+        return f'"{self.id}"'
+
+
+class ArtifactStore:
+    """
+    In-memory store for generated PNG/PDF files, served raw by
+    GET /artifacts/{id} instead of being base64'd into the JSON body.
+
+    Artifacts are content-addressed (sha256), so identical renders share one
+    entry and the ETag never changes for a given id. The store is bounded by
+    total bytes and evicts least-recently-used artifacts first. Pending
+    artifacts (reserved, still being built) are never evicted: clients poll
+    them, so they stay until fulfil() or discard().
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, data, content_type, filename=None):
+        artifact_id = hashlib.sha256(data).hexdigest()[:32]
+        with self._lock:
+            existing = self._items.get(artifact_id)
+            if existing is not None:
+                self._items.move_to_end(artifact_id)
+                return existing
+
+            artifact = Artifact(artifact_id, content_type, data, filename)
+            self._items[artifact_id] = artifact
+            self.total_bytes += artifact.size
+            self._evict()
+            return artifact
+
+    def reserve(self, content_type, filename=None):
+        """
+        A pending artifact whose bytes come later (fulfil). The id is random,
+        since the content isn't known yet, so it is handed out right away.
+        """
+        artifact = Artifact(secrets.token_hex(16), content_type, None, filename)
+        with self._lock:
+            self._items[artifact.id] = artifact
+        return artifact
+
+    def fulfil(self, artifact, data):
+        with self._lock:
+            artifact.data = data
+            self._items[artifact.id] = artifact
+            self._items.move_to_end(artifact.id)
+            self.total_bytes += artifact.size
+            self._evict()
+        return artifact
+
+    def discard(self, artifact_id):
+        with self._lock:
+            artifact = self._items.pop(artifact_id, None)
+            if artifact is not None:
+                self.total_bytes -= artifact.size
+
+    def get(self, artifact_id):
+        with self._lock:
+            artifact = self._items.get(artifact_id)
+            if artifact is not None:
+                self._items.move_to_end(artifact_id)
+            return artifact
+
+    def _evict(self):
+        # Always keep the newest artifact, even if it alone exceeds the bound
+        if self.total_bytes <= self.max_bytes:
+            return
+        newest = next(reversed(self._items))
+        freed = self.total_bytes - self.max_bytes
+        victims = []
+        for artifact_id, old in self._items.items():
+            if freed <= 0:
+                break
+            if old.pending or artifact_id == newest:
+                continue
+            victims.append(artifact_id)
+            freed -= old.size
+        for artifact_id in victims:
+            self.total_bytes -= self._items.pop(artifact_id).size
+
+
+def parse_range(header, size):
+    """
+    Parses a single-range `Range: bytes=...` header.
+    Returns (start, end) inclusive, None to serve the full body
+    (missing/multi-range/malformed), or raises ValueError when unsatisfiable.
+    RFC 9110: a malformed Range is ignored (200); only a well-formed range
+    that misses the body is a 416.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges are not worth the complexity for PNG/PDF; full body is valid
+        return None
+
+    start_s, sep, end_s = spec.partition("-")
+    start_s, end_s = start_s.strip(), end_s.strip()
+    if not sep or not (start_s or end_s) or not all(s.isascii() and s.isdigit() for s in (start_s, end_s) if s):
+        return None
+    start = int(start_s) if start_s else None
+    end = int(end_s) if end_s else None
+    if start is not None and end is not None and end < start:
+        # "bytes=5-3" is invalid syntax, not an unsatisfiable range
+        return None
+
+    if start is None:
+        # Suffix range: last N bytes
+        if end == 0:
+            raise ValueError("empty suffix range")
+        start = max(size - end, 0)
+        end = size - 1
+    else:
+        end = size - 1 if end is None else min(end, size - 1)
+
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
@@ -0,0 +1,76 @@
+import time
+import zipfile
+
+# Already-compressed formats are stored as is; deflating them costs CPU for ~0%
+STORED_EXTENSIONS = (".png", ".jpg", ".jpeg", ".pdf", ".zip")
+
+
+def compression_for(name):
+    return zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+class _Sink:
+    # Write-only, unseekable file object: zipfile then streams each entry with
+    # a data descriptor instead of seeking back to patch its header
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Builds a ZIP archive one entry at a time for a StreamingResponse:
+
+        bundle = ZipStream()
+        yield bundle.add("option_1.png", png_bytes)
+        ...
+        yield bundle.close()
+
+    add() returns the bytes of that entry (local header, data, descriptor),
+    so only the entry being written is ever held, plus a small central
+    directory that close() emits. `files` lists what was written, for the
+    manifest.
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w")
+        self.files = []
+        self.bytes_sent = 0
+
+    def add(self, name, data, seconds=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = compression_for(name)
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+        entry = {
+            "name": name,
+            "size": len(data),
+            "compression": "stored" if info.compress_type == zipfile.ZIP_STORED else "deflated",
+        }
+        if seconds is not None:
+            entry["seconds"] = round(seconds, 4)
+        self.files.append(entry)
+        return self._drain()
+
+    def close(self):
+        self._zip.close()
+        return self._drain()
+
+    def _drain(self):
+        data = self._sink.drain()
+        self.bytes_sent += len(data)
+        return data
@@ -0,0 +1,118 @@
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default)
+
+
+class Settings:
+    """
+    Server-side tunables. Everything is read from VASTU_* environment
+    variables so deployments (Render, local uvicorn) can adjust limits
+    without code changes.
+    """
+
+    def __init__(self):
+        # Artifact delivery (GET /artifacts/{id})
+        self.artifact_store_max_mb = _env_int("VASTU_ARTIFACT_STORE_MB", 256)
+        self.artifact_max_age = _env_int("VASTU_ARTIFACT_MAX_AGE", 86400)
+        self.default_delivery = _env_str("VASTU_DEFAULT_DELIVERY", "base64")
+        # Upper bound on OutputPreferences.number_of_plans (more is a 422)
+        self.max_plans = _env_int("VASTU_MAX_PLANS", 6)
+        # Upper bound on BuildingConfig.floors, e.g. "G+59" is 60 (more is a 422)
+        self.max_floors = _env_int("VASTU_MAX_FLOORS", 60)
+        # Designs per GET /projects/{id}/bundle (newest first; page with offset)
+        self.max_bundle_designs = _env_int("VASTU_MAX_BUNDLE_DESIGNS", 20)
+        # Upper bound on SweepInput.plots (more is a 422)
+        self.max_sweep_plots = _env_int("VASTU_MAX_SWEEP_PLOTS", 50)
+        # Placement grid when a request doesn't set one: "3x3", "8x8" or "9x9"
+        self.default_grid = _env_str("VASTU_DEFAULT_GRID", "3x3")
+        # Pixel budget for one option's stacked floor image; tall buildings
+        # get smaller tiles instead of an unbounded canvas
+        self.max_composite_mpx = _env_int("VASTU_MAX_COMPOSITE_MPX", 24)
+        # Hugging Face model for report summaries; "stub" uses a fixed template
+        # (no torch/transformers), for benchmarks, load tests and CI
+        self.text_model = _env_str("VASTU_TEXT_MODEL", "distilgpt2")
+        # Concurrent generations per worker; slots share the model weights
+        self.text_model_slots = _env_int("VASTU_TEXT_MODEL_SLOTS", 1)
+
+        # Precomputed layouts (python -m app.layout_table build); "" disables lookups
+        self.layout_table = _env_str("VASTU_LAYOUT_TABLE", os.path.join(os.path.dirname(__file__), "layout_table.bin"))
+
+        # Response cache for /generate-prompt and /generate-design
+        self.cache_enabled = _env_int("VASTU_CACHE_ENABLED", 1) == 1
+        self.cache_max_entries = _env_int("VASTU_CACHE_MAX_ENTRIES", 256)
+        self.cache_max_mb = _env_int("VASTU_CACHE_MAX_MB", 128)
+        self.cache_ttl = _env_int("VASTU_CACHE_TTL", 3600)
+        # Rendered floor tiles reused across options, requests and sessions
+        self.tile_cache_mb = _env_int("VASTU_TILE_CACHE_MB", 128)
+        # Floor size (px) on side-by-side comparison sheets
+        self.comparison_tile_px = _env_int("VASTU_COMPARISON_TILE_PX", 1024)
+
+        # Design sessions (POST/PUT /sessions): idle TTL and count limit
+        self.session_ttl = _env_int("VASTU_SESSION_TTL", 1800)
+        self.session_max = _env_int("VASTU_SESSION_MAX", 256)
+
+        # SQLite design history (GET /designs, /projects), e.g. /var/lib/vastu/projects.db;
+        # off ("") unless set. Stores every response and artifact, so it is
+        # pruned by age (days) and design count (0 = no limit)
+        self.project_db = _env_str("VASTU_PROJECT_DB", "")
+        self.project_max_age_days = _env_int("VASTU_PROJECT_MAX_AGE_DAYS", 30)
+        self.project_max_designs = _env_int("VASTU_PROJECT_MAX_DESIGNS", 10000)
+        # Client IPs and/or X-Vastu-History-Token values allowed to list designs
+        # and projects or bundle a project; a design id alone opens only that design
+        self.history_allowlist = [x.strip() for x in _env_str("VASTU_HISTORY_ALLOWLIST", "127.0.0.1,::1").split(",") if x.strip()]
+
+        # Independent stages of one request (summary, per-option render/PDF)
+        # run concurrently on this many threads per worker; 0 runs them inline
+        self.stage_threads = _env_int("VASTU_STAGE_THREADS", 4)
+        # Processes for GIL-bound PDF builds (0 = build in the stage thread)
+        self.stage_processes = _env_int("VASTU_STAGE_PROCESSES", 0)
+
+        # Default response deadline for /generate-design and sessions when the
+        # request has no output.deadline_ms (0 = none), and the part of it kept
+        # back for serializing and sending the response
+        self.deadline_ms = _env_int("VASTU_DEADLINE_MS", 0)
+        self.deadline_reserve_ms = _env_int("VASTU_DEADLINE_RESERVE_MS", 100)
+
+        # Opt-in memory accounting per stage: "off", "rss" or "tracemalloc"
+        self.memory_tracking = _env_str("VASTU_MEMORY_TRACKING", "off").lower()
+        # Per-request budget for canvases and retained outputs (0 = unlimited);
+        # over budget, options render smaller, then the request is refused
+        self.request_memory_mb = _env_int("VASTU_REQUEST_MEMORY_MB", 0)
+        # Heavy requests are refused (503) while the worker's RSS is above this (0 = off)
+        self.max_rss_mb = _env_int("VASTU_MAX_RSS_MB", 0)
+
+        # Pre-fork launcher (python -m app.server). Torch/BLAS threads are per
+        # worker: keep workers * torch_threads at or below the core count
+        self.workers = _env_int("VASTU_WORKERS", 2)
+        self.torch_threads = _env_int("VASTU_TORCH_THREADS", 1)
+        # Sync endpoint threads per worker (anyio's default is 40)
+        self.request_threads = _env_int("VASTU_REQUEST_THREADS", 8)
+        # Seconds a stopping worker gets to finish in-flight requests
+        self.graceful_timeout = _env_int("VASTU_GRACEFUL_TIMEOUT", 30)
+
+        # Opt-in request profiling: "off", "header" or "always"
+        self.profiling_mode = _env_str("VASTU_PROFILING", "off").lower()
+        # Client IPs and/or X-Vastu-Profile-Token values allowed to request profiles
+        self.profiling_allowlist = [x.strip() for x in _env_str("VASTU_PROFILE_ALLOWLIST", "127.0.0.1,::1").split(",") if x.strip()]
+        self.profiling_max_stored = _env_int("VASTU_PROFILE_MAX_STORED", 50)
+
+        # Admission control. "heavy" covers design/sweep (canvases, PDFs, LLM);
+        # everything else shares the "light" budget.
+        self.heavy_max_concurrency = _env_int("VASTU_HEAVY_MAX_CONCURRENCY", 2)
+        self.heavy_max_queue = _env_int("VASTU_HEAVY_MAX_QUEUE", 8)
+        self.heavy_queue_timeout = _env_int("VASTU_HEAVY_QUEUE_TIMEOUT", 30)
+        self.light_max_concurrency = _env_int("VASTU_LIGHT_MAX_CONCURRENCY", 32)
+        self.light_max_queue = _env_int("VASTU_LIGHT_MAX_QUEUE", 128)
+        self.light_queue_timeout = _env_int("VASTU_LIGHT_QUEUE_TIMEOUT", 5)
+
+
+settings = Settings()
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from app.metrics import registry
+
+DEADLINE_DEGRADED = registry.counter("vastu_deadline_degraded_total", "Stages degraded to meet a request deadline, by stage.")
+DEADLINE_MISSED = registry.counter("vastu_deadline_missed_total", "Deadline requests whose response was ready after the deadline.")
+
+
+class Deadline:
+    """
+    Wall-clock budget of one request (OutputPreferences.deadline_ms or the
+    server default), measured from when the request arrived, so admission
+    queueing counts too. `reserve` is kept back for serializing and sending
+    the response.
+
+    budget_ms 0 means no deadline: nothing ever expires or degrades.
+    """
+
+    def __init__(self, budget_ms, start=None, reserve_ms=0):
+        self.budget_ms = budget_ms
+        self.start = start if start is not None else time.perf_counter()
+        self.usable = max(0.0, (budget_ms - reserve_ms) / 1000)
+        self.degraded = False
+
+    @property
+    def active(self):
+        return self.budget_ms > 0
+
+    def remaining(self):
+        if not self.active:
+            return float("inf")
+        return self.usable - (time.perf_counter() - self.start)
+
+    def past(self, fraction=1.0):
+        """True once `fraction` of the usable budget is spent."""
+        return self.active and time.perf_counter() - self.start >= self.usable * fraction
+
+    def fits(self, seconds, share=1.0):
+        # Would work estimated at `seconds` finish within `share` of what's left?
+        return not self.active or seconds <= self.remaining() * share
+
+    def degrade(self, stage_name):
+        self.degraded = True
+        DEADLINE_DEGRADED.inc(stage=stage_name)
+
+
+class CostModel:
+    """
+    Moving average of seconds per unit of work for the stages a deadline can
+    trade away (render: per canvas byte, PDF and summary: per call), learned
+    from every request so deadline decisions use this machine's speed.
+    """
+
+    # Used until a stage has been observed on this worker; deliberately on
+    # the slow side so a cold worker degrades rather than overruns
+    DEFAULTS = {
+        "render": 2e-8, # draw + PNG encode, ~1 s for a 2048px, 4-floor option
+        "pdf_report": 0.5,
+        "text_generation": 5.0, # distilgpt2, 100 new tokens on one CPU thread
+    }
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, units=1):
+        if units <= 0:
+            return
+        rate = seconds / units
+        with self._lock:
+            old = self._rates.get(name)
+            self._rates[name] = rate if old is None else old + self.alpha * (rate - old)
+
+    def estimate(self, name, units=1):
+        rate = self._rates.get(name, self.DEFAULTS.get(name, 0.0))
+        return rate * units
+
+
+costs = CostModel()
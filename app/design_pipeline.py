@@ -0,0 +1,340 @@
+import base64
+import hashlib
+import json
+import time
+from io import BytesIO
+
+from app.config import settings
+from app.deadline import costs
+from app.floor_allocator import BuildingLayout
+from app.geometry import floor_geometry
+from app.layout import room_kind
+from app.mandala import get_grid
+from app.metrics import stage
+from app.result_cache import cacheable, effective_vastu_level
+from app.text_generator import StubTextGenerator
+
+# Under a deadline, options after the first stop being optimized once this
+# much of the budget is spent; they reuse option 1's floors instead
+PLAN_SHARE = 0.3
+
+
+class OutputPlan:
+    """
+    Which stages a request actually needs, derived from OutputPreferences:
+
+    - options:  number_of_plans (OutputPreferences bounds it to 1..VASTU_MAX_PLANS)
+    - images:   PNGs returned to the client (output_format "none"/"data" turns them off)
+    - reports:  PDFs, only when export_format lists "PDF"
+    - summary:  the LLM text only feeds the PDF, so it follows `reports`
+    - render:   rasterize when either images or reports need the drawing
+    - comparison: one side-by-side sheet of all options (OutputPreferences.comparison)
+    - thumbnails: per-floor thumbnail size in px, or None
+    """
+
+    NO_IMAGE_FORMATS = ("none", "data", "json")
+
+    def __init__(self, output):
+        self.options = output.number_of_plans
+        self.images = (output.output_format or "2D").strip().lower() not in self.NO_IMAGE_FORMATS
+        self.reports = any(f.strip().upper() == "PDF" for f in (output.export_format or []))
+        self.summary = self.reports
+        self.render = self.images or self.reports
+        self.comparison = bool(output.comparison)
+        self.thumbnails = output.thumbnail_px
+
+
+class DesignPipeline:
+    """
+    The /generate-design stages, split so callers can share work:
+
+    - plan():   floor allocation + optimization. Depends on the room program,
+                floors and vastu level; plot size only via the floor area budget.
+    - render(), score(), summary(), report(): the per-plot stages.
+    """
+
+    def __init__(self, rule_engine, optimizer, scorer, allocator, services, tiles=None, plans=None, executor=None):
+        self.rule_engine = rule_engine
+        self.optimizer = optimizer
+        self.scorer = scorer
+        self.allocator = allocator
+        # Rendered floor tiles (TileCache), shared by every request and session
+        self.tiles = tiles
+        # Optional ResultCache for plan() output. Keyed by plan_key, which has
+        # no facing, so all four facings of a program share one entry.
+        self.plans = plans
+        # Heavy engines (PIL, ReportLab, torch) are resolved on first use
+        self.services = services
+        # Optional StageExecutor; report() ships PDF builds to its process pool
+        self.executor = executor
+
+    @property
+    def visualizer(self):
+        return self.services.get("visualizer")
+
+    @property
+    def report_gen(self):
+        return self.services.get("report_gen")
+
+    @property
+    def text_gen(self):
+        return self.services.get("text_gen")
+
+    def plan_key(self, user_input):
+        """
+        Identifies inputs that produce the same plan(). Plot size only matters
+        through the floor allocation (area budget), so that is keyed instead.
+        """
+        building = self.allocator.plan_building(user_input)
+        return json.dumps({
+            "rooms": user_input.rooms.model_dump(mode="json"),
+            "allocation": {str(f): rooms for f, rooms in building.floors.items()},
+            "units_per_floor": building.units_per_floor,
+            "vastu_level": effective_vastu_level(user_input.vastu_level),
+            "seed": user_input.seed,
+            "grid": self.grid_for(user_input).name,
+        }, sort_keys=True)
+
+    def grid_for(self, user_input):
+        return get_grid(user_input.grid) or get_grid(settings.default_grid) or get_grid("3x3")
+
+    def plan(self, user_input, rng, count=3, previous=None, deadline=None):
+        """
+        previous: (user_input, options) from an earlier plan() in the same
+        design session. Floors whose room program and rule inputs are
+        unchanged reuse the old layout object; the rest are re-optimized,
+        warm-started from the old layout of that floor. Each returned
+        BuildingLayout lists the reused floors in `.reused`.
+
+        Fresh seeded plans (no `previous`) are looked up in / stored to self.plans.
+        Returned options may be shared with other requests: read-only.
+
+        deadline: options planned after PLAN_SHARE of it copy option 1's
+        floors (listed in `.shortcut`); such plans are never cached.
+        """
+        if previous is None and self.plans is not None and cacheable(user_input):
+            key = hashlib.sha256(json.dumps(
+                {"ns": "plan", "rules": self.rule_engine.version, "plan": self.plan_key(user_input), "count": count},
+                sort_keys=True
+            ).encode("utf-8")).hexdigest()
+            options = self.plans.get(key)
+            if options is None:
+                options = self._plan(user_input, rng, count, None, deadline)
+                if not any(opt.shortcut for opt in options):
+                    self.plans.put(key, options)
+            return options
+        return self._plan(user_input, rng, count, previous, deadline)
+
+    def _plan(self, user_input, rng, count, previous, deadline=None):
+        # 1. Allocate Rooms to Floors
+        with stage("allocate"):
+            building = self.allocator.plan_building(user_input)
+
+        # 2. Generate Options (Variants)
+        # `count` distinct options with potentially different scores/layouts.
+        # Method: Run optimizer once per option with different constraints.
+
+        # Store options structure: [ {floor: layout}, {floor: layout}, ... ]
+        final_options = [{} for _ in range(count)]
+
+        # 3x3 keeps the original zone-sharing optimizer; 8x8/9x9 place pada blocks
+        grid = self.grid_for(user_input)
+        fine_grid = grid if grid.n > 3 else None
+
+        prev_input, prev_options = previous or (None, [])
+        # Zones and pada rules only depend on these; anything else (plot, facing,
+        # output prefs) can't change an unchanged floor's layout
+        same_rules = prev_input is not None and (
+            effective_vastu_level(prev_input.vastu_level) == effective_vastu_level(user_input.vastu_level)
+            and self.grid_for(prev_input) == grid
+            and prev_input.seed == user_input.seed
+        )
+        reused = [set() for _ in range(count)]
+        shortcut = [set() for _ in range(count)]
+
+        # Typical floors (same room program) are optimized once and share the
+        # layout object, so a G+20 tower costs the same as a G+2 one.
+        for f_idx in building.distinct_floors():
+            room_names = building.floors[f_idx]
+            pada_rules = None
+            for opt_idx in range(count):
+                prev = prev_options[opt_idx] if opt_idx < len(prev_options) else {}
+                old = prev.get(f_idx)
+                # A deadline copy of option 1 is not a real result; re-optimize it
+                if old is not None and f_idx in prev.shortcut:
+                    old = None
+                if same_rules and old is not None and sorted(old) == sorted(room_names):
+                    final_options[opt_idx][f_idx] = old
+                    reused[opt_idx].add(f_idx)
+                    continue
+
+                if opt_idx > 0 and deadline is not None and deadline.past(PLAN_SHARE):
+                    final_options[opt_idx][f_idx] = final_options[0][f_idx]
+                    shortcut[opt_idx].add(f_idx)
+                    continue
+
+                if fine_grid and pada_rules is None:
+                    pada_rules = self._pada_rules(fine_grid, room_names)
+                room_zones = self._option_zones(opt_idx, room_names, user_input.vastu_level, rng)
+                with stage("optimize"):
+                    if fine_grid:
+                        variants = self.optimizer.generate_grid_variants(
+                            room_zones, fine_grid, count=1, rng=rng, pada_rules=pada_rules, initial=old
+                        )
+                    else:
+                        variants = self.optimizer.generate_variants(room_zones, count=1, rng=rng, initial=old)
+                final_options[opt_idx][f_idx] = variants[0][0]
+
+        options = []
+        for opt_idx, opt in enumerate(final_options):
+            floors = BuildingLayout({f_idx: opt[building.typical[f_idx]] for f_idx in sorted(building.floors)}, building)
+            floors.reused = {f for f in floors if building.typical[f] in reused[opt_idx]}
+            floors.shortcut = {f for f in floors if building.typical[f] in shortcut[opt_idx]}
+            options.append(floors)
+        if any(shortcut):
+            deadline.degrade("optimize")
+        return options
+
+    def _pada_rules(self, grid, room_names):
+        out = {}
+        for r in room_names:
+            rules = self.rule_engine.get_pada_rules(grid.name, room_kind(r))
+            out[r] = {kind: {grid.cell_index(c) for c in cells} for kind, cells in rules.items()}
+        return out
+
+    def _option_zones(self, opt_idx, room_names, vastu_level, rng):
+        room_zones = {}
+        for r in room_names:
+            rule_name = room_kind(r)
+            if opt_idx == 0:
+                # Option 1: Strict / User Level
+                zones = self.rule_engine.get_zone_for_room(rule_name, vastu_level)
+            elif opt_idx == 1:
+                # Option 2: Balanced (Try alternatives if available)
+                # Use Medium to get more options
+                zones = self.rule_engine.get_zone_for_room(rule_name, "medium")
+                # For variety, if we have >1 zone, rotate the list
+                if len(zones) > 1:
+                     zones = zones[1:] + zones[:1] # Shift preference
+            else:
+                # Option 3+: Experimental / Relaxed
+                zones = self.rule_engine.get_zone_for_room(rule_name, "medium")
+                if len(zones) > 1:
+                    rng.shuffle(zones)
+            room_zones[r] = zones
+        return room_zones
+
+    def score(self, opt_layouts):
+        # Aggregate full layout for scoring
+        full_layout = {}
+        for f, layout in opt_layouts.items():
+            full_layout.update(layout)
+        with stage("score"):
+            return self.scorer.calculate_score(full_layout, self.rule_engine.get_all_rules())
+
+    def geometry(self, opt_layouts, plot):
+        """
+        {floor_index: FloorGeometry}. Builds a new dict on each call; the
+        per-floor geometry comes from geometry._compute's lru_cache, so
+        render() and report() on the same option share it.
+        """
+        with stage("geometry"):
+            return {f: floor_geometry(layout, plot) for f, layout in opt_layouts.items()}
+
+    def render(self, opt_layouts, plot, rendered=None, tile_px=None):
+        # rendered: optional list that receives the floors actually rasterized
+        # tile_px: smaller floor size under a tight memory budget or deadline
+        drawn = rendered if rendered is not None else []
+        start = time.perf_counter()
+        with stage("render"):
+            img = self.visualizer.create_composite_image(
+                [opt_layouts], plot_details=plot, single_option_mode=True, tiles=self.tiles, rendered=drawn, tile_px=tile_px
+            )
+        png = encode_png(img)
+        # Deadlines pay for drawing and encoding alike, and both scale with the
+        # tile; only renders that rasterized floors say anything about speed
+        if drawn:
+            costs.observe("render", time.perf_counter() - start, self.render_bytes(opt_layouts, tile_px))
+        return png
+
+    def render_bytes(self, opt_layouts, tile_px=None):
+        return self.visualizer.canvas_bytes(opt_layouts, tile_px)
+
+    # Comparison sheets and thumbnails are composed from the floor tiles
+    # render() already cached: paste + resize, no re-rasterizing.
+    def comparison(self, options, plot):
+        with stage("compose"):
+            img = self.visualizer.create_composite_image(
+                options, plot_details=plot, tiles=self.tiles, tile_px=settings.comparison_tile_px
+            )
+        return encode_png(img)
+
+    def thumbnails(self, opt_layouts, plot, size):
+        """[(floor_ids, png_buffer), ...] for one option."""
+        with stage("compose"):
+            thumbs = self.visualizer.thumbnails(opt_layouts, plot_details=plot, tiles=self.tiles, size=size)
+        return [(floor_ids, encode_png(img)) for floor_ids, img in thumbs]
+
+    def summary_context(self, user_input, plot):
+        # Everything the summary text depends on; equal contexts give equal prompts
+        return {
+            "style": user_input.design.style if user_input.design else "Modern",
+            "plot_size": f"{plot.length * plot.width}",
+            "facing": plot.facing,
+            "floors": user_input.building.floors,
+            "bedrooms": user_input.rooms.bedrooms
+        }
+
+    def summary(self, user_input, plot, template=False):
+        # AI Text Generation; template=True fills the fixed template instead (deadline)
+        context = self.summary_context(user_input, plot)
+        if template:
+            return StubTextGenerator().generate_report_text(context)
+        text_gen = self.text_gen
+        with stage("text_generation"):
+            start = time.perf_counter()
+            text = text_gen.generate_report_text(context)
+            costs.observe("text_generation", time.perf_counter() - start)
+        return text
+
+    def report(self, option_num, image_buffer, score, breakdown, notes, plot, ai_summary, geometry=None):
+        dimensions = {}
+        for geo in (geometry or {}).values():
+            dimensions.update(geo.dimensions())
+        with stage("pdf_report"):
+            start = time.perf_counter()
+            if self.executor is not None and self.executor.processes > 0:
+                pdf = BytesIO(self.executor.in_process(
+                    build_report, option_num, image_buffer.getvalue(), score, breakdown, notes, plot, ai_summary, dimensions
+                ))
+            else:
+                pdf = self.report_gen.generate_report(
+                    option_num, image_buffer, score, breakdown, notes, plot, ai_summary=ai_summary, dimensions=dimensions
+                )
+            costs.observe("pdf_report", time.perf_counter() - start)
+        return pdf
+
+
+def build_report(option_num, png, score, breakdown, notes, plot, ai_summary, dimensions):
+    # Process-pool entry point: the child builds its own PDF engine once and
+    # only bytes cross the process boundary
+    from app.services import services
+    pdf = services.get("report_gen").generate_report(
+        option_num, BytesIO(png), score, breakdown, notes, plot, ai_summary=ai_summary, dimensions=dimensions
+    )
+    return pdf.getvalue()
+
+
+def encode_png(img):
+    # Closes img: every caller passes a canvas it owns, and the pixels are
+    # dead weight once the PNG exists
+    with stage("png_encode"):
+        buffered_img = BytesIO()
+        img.save(buffered_img, format="PNG")
+        img.close()
+    return buffered_img
+
+
+def to_base64(buffer):
+    with stage("base64_encode"):
+        return base64.b64encode(buffer.getvalue()).decode("utf-8")
@@ -1,154 +1,237 @@
+import re
+
+from app.layout import room_kind
+
+# Rough carpet areas (sq ft) used to budget rooms onto floors
+ROOM_AREA_SQFT = {
+    "master_bedroom": 180,
+    "bedroom": 140,
+    "living_room": 220,
+    "kitchen": 100,
+    "dining_area": 120,
+    "bathroom": 45,
+    "pooja_room": 30,
+    "parking": 150,
+    "staircase": 80,
+    "study_room": 100,
+    "balcony": 40,
+}
+
+# Share of the plot a floor may cover when built_up_area isn't given
+DEFAULT_COVERAGE = 0.8
+
+SQFT_PER_UNIT = {"ft": 1.0, "m": 10.7639}
+
+FLOOR_WORDS = {
+    "single": 1, "ground": 1, "g": 1, "bungalow": 1,
+    "duplex": 2, "triplex": 3,
+}
+
+
+def parse_floor_count(floors_config):
+    """
+    "G" -> 1, "G+1" -> 2, "G+12" -> 13, "3" -> 3, "duplex" -> 2.
+    Unknown strings fall back to a single floor.
+    """
+    text = (floors_config or "").strip().lower().replace(" ", "")
+    m = re.fullmatch(r"g\+(\d+)", text)
+    if m:
+        return int(m.group(1)) + 1
+    m = re.fullmatch(r"(\d+)(floors?|storeys?|stories)?", text)
+    if m:
+        return max(1, int(m.group(1)))
+    return FLOOR_WORDS.get(text, 1)
+
+
+def room_area(room_name):
+    return ROOM_AREA_SQFT.get(room_kind(room_name), 80)
+
+
+class BuildingPlan:
+    """
+    Result of FloorAllocator.plan_building.
+
+    floors:          {floor_index: [room names]}
+    units_per_floor: identical units on each residential floor (1 for houses)
+    typical:         {floor_index: first floor_index with the same room program}
+                     so callers optimize/render each distinct floor once
+    notes:           allocation warnings (over-budget floors etc.)
+    """
+
+    def __init__(self, floors, units_per_floor=1, notes=None):
+        self.floors = floors
+        self.units_per_floor = units_per_floor
+        self.notes = notes or []
+
+        self.typical = {}
+        first_seen = {}
+        for f_idx in sorted(floors):
+            key = tuple(sorted(floors[f_idx]))
+            self.typical[f_idx] = first_seen.setdefault(key, f_idx)
+
+    def distinct_floors(self):
+        return sorted(set(self.typical.values()))
+
+
+class BuildingLayout(dict):
+    """
+    {floor_index: layout} for one option, plus what the renderer needs to
+    draw repeated floors once. Typical floors share the same layout object.
+    """
+
+    def __init__(self, floors, plan):
+        super().__init__(floors)
+        self.units_per_floor = plan.units_per_floor
+        self.typical = plan.typical
+        self.notes = plan.notes
+        # Floors carried over unchanged from a previous plan (design sessions)
+        self.reused = set()
+        # Floors that copied option 1's layout because planning ran out of deadline
+        self.shortcut = set()
+
+
 class FloorAllocator:
-    def __init__(self):
-        pass
+    def __init__(self, coverage=DEFAULT_COVERAGE):
+        self.coverage = coverage
 
     def allocate(self, user_input):
         """
-        Distributes rooms into 'ground_floor' and 'first_floor' (and 'second_floor' etc.)
-        based on user_input.building.floors and room types.
+        Distributes rooms into floors ({0: ground, 1: first, ...}).
+        Kept for callers that only need the room lists.
         """
-        floors_config = user_input.building.floors.lower()
-        
-        # Determine number of floors
-        num_floors = 1
-        if "g+1" in floors_config or "2" in floors_config:
-            num_floors = 2
-        elif "g+2" in floors_config or "3" in floors_config:
-            num_floors = 3
-        
-        # Base Allocation
-        rooms_by_floor = {
-            0: [], # Ground
-            1: [], # First
-            2: []  # Second
-        }
-        
-        # Room Lists
-        # We need to reconstruct the full list of rooms from boolean/count flags
-        all_rooms = []
-        if user_input.rooms.parking: all_rooms.append("parking")
-        if user_input.rooms.living_room: all_rooms.append("living_room")
-        if user_input.rooms.dining_area: all_rooms.append("dining_area")
-        if user_input.rooms.kitchen: all_rooms.append("kitchen")
-        if user_input.rooms.pooja_room: all_rooms.append("pooja_room")
-        
-        # Bedrooms
-        # Master Bedroom priorities
-        all_rooms.append("master_bedroom") # Assuming at least 1? The schema has bedrooms count.
-        # Actually schema has 'bedrooms: int'
-        # Let's clean this up. We should use the same Logic as main.py used to generate 'room_zones' keys
-        
-        # Let's assume we return a dict of room_names -> floor_index
-        # Usage in main.py: 
-        #   allocations = allocator.allocate(user_input) 
-        #   for room, floor in allocations.items(): ...
-        
-        pass 
-        # Re-thinking strategy: The allocator should take the 'room_zones' keys (or equivalent list) 
-        # and assign them floors. But 'room_zones' is created after looking at rules.
-        # Better: Allocator returns specific room lists for each floor.
-        
-        ground_rooms = []
-        first_rooms = []
-        second_rooms = []
-        
+        return self.plan_building(user_input).floors
+
+    def floor_budget(self, user_input, num_floors):
+        """Usable sq ft per floor, from built_up_area (total) or plot coverage."""
+        plot = user_input.plot
+        plot_sqft = plot.length * plot.width * SQFT_PER_UNIT.get((plot.unit or "").lower(), 1.0)
+        budget = plot_sqft * self.coverage
+        built_up = user_input.building.built_up_area
+        if built_up:
+            budget = min(budget, built_up / num_floors) if plot_sqft else built_up / num_floors
+        return budget
+
+    def plan_building(self, user_input):
+        num_floors = parse_floor_count(user_input.building.floors)
+        units = max(1, user_input.building.units_per_floor or 1)
+        if units > 1 or "apartment" in (user_input.building.building_type or "").lower():
+            return self._plan_apartments(user_input, num_floors, units)
+        return self._plan_house(user_input, num_floors)
+
+    def _common_rooms(self, rooms):
+        common = []
+        if rooms.parking: common.append("parking")
+        if rooms.living_room: common.append("living_room")
+        if rooms.kitchen: common.append("kitchen")
+        if rooms.dining_area: common.append("dining_area")
+        if rooms.pooja_room: common.append("pooja_room")
+        if rooms.study_room: common.append("study_room")
+        return common
+
+    def _bed_and_bath_names(self, rooms):
+        beds = ["master_bedroom"] + [f"bedroom_{i+1}" for i in range(1, rooms.bedrooms)]
+        baths = ["bathroom"] + [f"bathroom_{i+1}" for i in range(1, rooms.bathrooms)] if rooms.bathrooms > 0 else []
+        return beds, baths
+
+    def _plan_house(self, user_input, num_floors):
+        rooms = user_input.rooms
+        beds, baths = self._bed_and_bath_names(rooms)
+        floors = {i: [] for i in range(num_floors)}
+        notes = []
+
         # 1. Essential Ground
-        if user_input.rooms.parking: ground_rooms.append("parking")
-        if user_input.rooms.living_room: ground_rooms.append("living_room")
-        if user_input.rooms.kitchen: ground_rooms.append("kitchen")
-        if user_input.rooms.dining_area: ground_rooms.append("dining_area")
-        if user_input.rooms.pooja_room: ground_rooms.append("pooja_room")
-        
-        # 2. Bedrooms & Bathrooms allocation
-        total_beds = user_input.rooms.bedrooms
-        total_baths = user_input.rooms.bathrooms
-        
+        floors[0].extend(self._common_rooms(rooms))
+
         if num_floors == 1:
-            ground_rooms.append("master_bedroom")
-            if total_beds > 1:
-                for i in range(1, total_beds):
-                    ground_rooms.append(f"bedroom_{i+1}")
-            
-            # Bathrooms
-            ground_rooms.append("bathroom") # Master bath
-            if total_baths > 1:
-                for i in range(1, total_baths):
-                    ground_rooms.append(f"bathroom_{i+1}")
-                    
-        elif num_floors >= 2:
-            # G+1 Strategy:
-            # Ground: Guest Bed (if many), Common areas
-            # First: Master Bed, Kids Bed
-            
-            # Staircase is needed on ALL floors
-            ground_rooms.append("staircase")
-            first_rooms.append("staircase")
-            
-            if total_beds == 1:
-                # 1 Bed -> First floor (Private) or Ground? 
-                # Usually Master is Upper in Duplex. Let's put Master on First.
-                first_rooms.append("master_bedroom")
-            else:
-                # 2+ Beds
-                # Put one on Ground (Guest/Parents) if count > 2?
-                # Or if just 2, maybe both up?
-                # Let's say: Master -> First. Bed 2 -> First. Bed 3 -> Ground.
-                first_rooms.append("master_bedroom")
-                
-                remaining = total_beds - 1
-                current_bed_idx = 2
-                
-                # Fill First Floor first
-                if remaining > 0:
-                    first_rooms.append(f"bedroom_{current_bed_idx}")
-                    remaining -= 1
-                    current_bed_idx += 1
-                
-                # Spill to Ground if more
-                while remaining > 0:
-                    ground_rooms.append(f"bedroom_{current_bed_idx}")
-                    remaining -= 1
-                    current_bed_idx += 1
-            
-            # Bathrooms Logic (Attached/Common)
-            # Simple heuristic: Distribtue baths alongside bedrooms
-            # But we don't have explicit tagging yet. 
-            # Let's count bedrooms on each floor and allocate baths proportionally.
-            
-            g_beds = len([r for r in ground_rooms if "bedroom" in r])
-            f_beds = len([r for r in first_rooms if "bedroom" in r])
-            
-            # Allocate baths
-            # Master Bath (Main) -> With Master Bed (First Floor)
-            if total_baths > 0:
-                # Find where Master Bed is
-                # It is in first_rooms
-                first_rooms.append("bathroom") # Master bath
-                remaining_baths = total_baths - 1
-                
-                # Assign remaining baths
-                # If Ground has beds, give it a bath
-                if remaining_baths > 0 and g_beds > 0:
-                     ground_rooms.append("bathroom_2")
-                     remaining_baths -= 1
-                
-                # If First has more beds and we have baths left
-                if remaining_baths > 0 and f_beds > 1: # Already gave 1 to Master
-                     first_rooms.append("bathroom_3")
-                     remaining_baths -= 1
-                     
-                # Spill rest
-                while remaining_baths > 0:
-                     first_rooms.append(f"bathroom_{4 + (total_baths - remaining_baths)}") # Random ID
-                     remaining_baths -= 1
-            
-            
-        # Compile
-        floors = {
-            0: ground_rooms,
-            1: first_rooms
-        }
-        if num_floors > 2:
-            floors[2] = ["bedroom_extra", "bathroom_extra", "staircase"] # Placeholder logic
-            
-        return floors
+            floors[0].extend(beds)
+            floors[0].extend(baths)
+            if rooms.balcony: floors[0].append("balcony")
+            return BuildingPlan(floors, 1, notes)
+
+        # Staircase is needed on ALL floors
+        for f in floors:
+            floors[f].append("staircase")
+
+        budget = self.floor_budget(user_input, num_floors)
+        used = {f: sum(room_area(r) for r in floors[f]) for f in floors}
+        upper = list(range(1, num_floors))
+
+        overflow = []
+
+        def place(room, candidates):
+            # First candidate with room in the budget; otherwise the emptiest floor
+            area = room_area(room)
+            for f in candidates:
+                if used[f] + area <= budget:
+                    floors[f].append(room)
+                    used[f] += area
+                    return f
+            f = min(floors, key=lambda k: used[k])
+            floors[f].append(room)
+            used[f] += area
+            overflow.append(room)
+            return f
+
+        # 2. Bedrooms: Master on the first floor (private), then spread evenly
+        # over upper floors; spill to ground once the upper floors are full.
+        bed_floor = {}
+        bed_floor["master_bedroom"] = place("master_bedroom", upper + [0])
+        for bed in beds[1:]:
+            least_full = sorted(upper, key=lambda f: (sum(1 for b in bed_floor.values() if b == f), f))
+            bed_floor[bed] = place(bed, least_full + [0])
+
+        # 3. Bathrooms: Master bath with the master bed, the rest go to the
+        # floor with the most bedrooms per bathroom.
+        bath_count = {f: 0 for f in floors}
+        if baths:
+            f = place("bathroom", [bed_floor["master_bedroom"]] + upper + [0])
+            bath_count[f] += 1
+            for bath in baths[1:]:
+                need = sorted(
+                    floors,
+                    key=lambda f: (-(sum(1 for b in bed_floor.values() if b == f) - bath_count[f]), f)
+                )
+                f = place(bath, need)
+                bath_count[f] += 1
+
+        if rooms.balcony:
+            place("balcony", upper[::-1] + [0])
+
+        if overflow:
+            notes.append(
+                f"Floors exceed the ~{budget:.0f} sq ft area budget; over-budget rooms: {', '.join(overflow)}"
+            )
+        return BuildingPlan(floors, 1, notes)
+
+    def _plan_apartments(self, user_input, num_floors, units):
+        """
+        Every residential floor repeats the same unit `units` times, so floor
+        layouts hold one unit's rooms; BuildingPlan.units_per_floor says how
+        many copies the floor carries. Ground is stilt parking + core when the
+        building has upper floors.
+        """
+        rooms = user_input.rooms
+        beds, baths = self._bed_and_bath_names(rooms)
+        notes = []
+
+        unit_rooms = [r for r in self._common_rooms(rooms) if r != "parking"] + beds + baths
+        if rooms.balcony: unit_rooms.append("balcony")
+
+        floors = {}
+        if num_floors == 1:
+            floors[0] = unit_rooms + (["parking"] if rooms.parking else [])
+        else:
+            floors[0] = (["parking"] if rooms.parking else []) + ["staircase"]
+            if not rooms.parking:
+                floors[0] = unit_rooms + ["staircase"]
+            for f in range(1, num_floors):
+                floors[f] = unit_rooms + ["staircase"]
+
+        budget = self.floor_budget(user_input, num_floors)
+        unit_area = sum(room_area(r) for r in unit_rooms)
+        if unit_area * units > budget:
+            notes.append(
+                f"{units} units of ~{unit_area:.0f} sq ft exceed the ~{budget:.0f} sq ft floor budget"
+            )
+
+        return BuildingPlan(floors, units, notes)
@@ -0,0 +1,232 @@
+from functools import lru_cache
+
+from app.layout import Layout, room_kind
+
+# Relative room sizes used when several rooms share one 3x3 zone
+SIZE_WEIGHTS = {
+    "master_bedroom": 1.6,
+    "living_room": 1.5,
+    "kitchen": 1.0,
+    "dining_area": 1.0,
+    "bedroom": 1.2,
+    "parking": 1.4,
+    "staircase": 0.8,
+    "pooja_room": 0.5,
+    "bathroom": 0.5,
+    "store_room": 0.5,
+    "balcony": 0.6,
+}
+
+ZONE_POS = {
+    "NW": (0, 0), "N": (0, 1), "NE": (0, 2),
+    "W": (1, 0), "Center": (1, 1), "E": (1, 2),
+    "SW": (2, 0), "S": (2, 1), "SE": (2, 2),
+}
+
+# Which plot edge the main door faces, per plot facing: (wall, zone row or col)
+MAIN_ENTRY = {
+    "north": ("top", "row", 0),
+    "south": ("bottom", "row", 2),
+    "east": ("right", "col", 2),
+    "west": ("left", "col", 0),
+}
+
+# Rooms that take the main entrance when they sit on the facing edge. Every
+# other room's door is the same for all facings.
+ENTRY_KINDS = ("parking", "living_room")
+
+DOOR_WIDTH_FT = 3.0
+MAIN_DOOR_WIDTH_FT = 4.0
+FT_PER_UNIT = {"ft": 1.0, "m": 3.28084}
+
+
+def size_weight(room_name):
+    return SIZE_WEIGHTS.get(room_kind(room_name), 1.0)
+
+
+class Door:
+    __slots__ = ("wall", "x", "y", "width", "main")
+
+    def __init__(self, wall, x, y, width, main=False):
+        self.wall = wall # "top", "bottom", "left" or "right" wall of the room
+        self.x = x # midpoint on that wall, plot units
+        self.y = y
+        self.width = width
+        self.main = main
+
+    def to_dict(self):
+        return {"wall": self.wall, "x": round(self.x, 3), "y": round(self.y, 3),
+                "width": round(self.width, 3), "main": self.main}
+
+
+class RoomRect:
+    """
+    One room in plot coordinates: origin at the north-west corner, x runs
+    east along the plot width, y runs south along the plot length.
+    """
+
+    __slots__ = ("name", "x", "y", "w", "h", "row", "col", "door")
+
+    def __init__(self, name, x, y, w, h, row, col, door=None):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.row = row # 3x3 zone band, for entry/door logic
+        self.col = col
+        self.door = door
+
+    @property
+    def area(self):
+        return self.w * self.h
+
+    @property
+    def center(self):
+        return self.x + self.w / 2, self.y + self.h / 2
+
+    def to_dict(self):
+        return {
+            "x": round(self.x, 3), "y": round(self.y, 3),
+            "width": round(self.w, 3), "length": round(self.h, 3),
+            "area": round(self.area, 2),
+            "door": self.door.to_dict() if self.door else None,
+        }
+
+
+class FloorGeometry:
+    """
+    Room rectangles, doors and real-unit dimensions for one floor layout.
+    Computed once per (layout, plot) by floor_geometry() and shared by the
+    raster renderer, PDF reports and the JSON response.
+    """
+
+    __slots__ = ("rooms", "width", "length", "unit")
+
+    def __init__(self, rooms, width, length, unit):
+        self.rooms = tuple(rooms)
+        self.width = width
+        self.length = length
+        self.unit = unit
+
+    def dimensions(self):
+        """{room: "12.0ft x 13.3ft"} as printed on plans and reports."""
+        return {r.name: f"{r.w:.1f}{self.unit} x {r.h:.1f}{self.unit}" for r in self.rooms}
+
+    def to_dict(self):
+        return {r.name: r.to_dict() for r in self.rooms}
+
+
+def _subdivide_cell(rooms, x, y, size):
+    # Same split rules the renderer always used, in 0..1 plan coordinates
+    rects = []
+    count = len(rooms)
+    weights = [size_weight(r) for r in rooms]
+
+    if count == 1:
+        # Small rooms (Bathroom, Pooja) take 45% of the cell; the rest stays a passage
+        if weights[0] < 0.8:
+            rects.append((rooms[0], x, y, size * 0.45, size))
+        else:
+            rects.append((rooms[0], x, y, size, size))
+
+    elif count == 2:
+        # Side by side, proportional to weight, capped to 25-75%
+        w1, w2 = weights
+        ratio = max(0.25, min(0.75, w1 / (w1 + w2)))
+        w_split = size * ratio
+        rects.append((rooms[0], x, y, w_split, size))
+        rects.append((rooms[1], x + w_split, y, size - w_split, size))
+
+    elif count == 3:
+        # Largest room takes the left half, the other two split the right half
+        hero_idx = weights.index(max(weights))
+        hero_w = size / 2
+        rects.append((rooms[hero_idx], x, y, hero_w, size))
+
+        (o1_idx, o1_w), (o2_idx, o2_w) = [(i, w) for i, w in enumerate(weights) if i != hero_idx]
+        ratio_o = max(0.25, min(0.75, o1_w / (o1_w + o2_w)))
+        h_split = size * ratio_o
+        rects.append((rooms[o1_idx], x + hero_w, y, size - hero_w, h_split))
+        rects.append((rooms[o2_idx], x + hero_w, y + h_split, size - hero_w, size - h_split))
+
+    elif count >= 4:
+        # 2x2 grid; a 5th+ room in one zone isn't drawn (same as before)
+        half = size / 2
+        rects.append((rooms[0], x, y, half, half))
+        rects.append((rooms[1], x + half, y, half, half))
+        rects.append((rooms[2], x, y + half, half, half))
+        rects.append((rooms[3], x + half, y + half, half, half))
+
+    return rects
+
+
+def _unit_rects(layout):
+    """[(room, x, y, w, h, row, col)] in 0..1 plan coordinates."""
+    grid = layout.grid
+    rects = []
+
+    if grid is not None and layout.blocks is not None:
+        for room, (r0, c0, rows, cols) in layout.blocks.items():
+            row, col = grid.band_position(layout[room])
+            rects.append((room, c0 / grid.n, r0 / grid.n, cols / grid.n, rows / grid.n, row, col))
+        return rects
+
+    zone_allocations = {k: [] for k in ZONE_POS}
+    for room, zone in layout.items():
+        if zone in zone_allocations:
+            zone_allocations[zone].append(room)
+
+    for zone, rooms in zone_allocations.items():
+        if not rooms:
+            continue
+        row, col = ZONE_POS[zone]
+        for room, x, y, w, h in _subdivide_cell(rooms, col / 3, row / 3, 1 / 3):
+            rects.append((room, x, y, w, h, row, col))
+    return rects
+
+
+def _door_for(room, x, y, w, h, row, col, facing, door_w, main_w):
+    cx, cy = x + w / 2, y + h / 2
+
+    # Parking / living rooms on the facing edge get the main entrance
+    entry = MAIN_ENTRY.get(facing)
+    kind = room_kind(room)
+    if entry and kind in ENTRY_KINDS:
+        wall, axis, band = entry
+        if (row if axis == "row" else col) == band:
+            pos = {"top": (cx, y), "bottom": (cx, y + h), "left": (x, cy), "right": (x + w, cy)}[wall]
+            return Door(wall, pos[0], pos[1], main_w, main=True)
+
+    # Internal doors open on the wall facing the middle of the plan
+    dx, dy = 0.5 - cx, 0.5 - cy
+    if abs(dx) > abs(dy):
+        return Door("right", x + w, cy, door_w) if dx > 0 else Door("left", x, cy, door_w)
+    return Door("bottom", cx, y + h, door_w) if dy > 0 else Door("top", cx, y, door_w)
+
+
+@lru_cache(maxsize=2048)
+def _compute(layout, width, length, unit, facing):
+    ft = FT_PER_UNIT.get(unit, 1.0)
+    rooms = []
+    for room, x, y, w, h, row, col in _unit_rects(layout):
+        # Doors are placed in unit coordinates, then scaled with the room
+        door = _door_for(room, x, y, w, h, row, col, facing, 0, 0)
+        door.x *= width
+        door.y *= length
+        door.width = (MAIN_DOOR_WIDTH_FT if door.main else DOOR_WIDTH_FT) / ft
+        rooms.append(RoomRect(room, x * width, y * length, w * width, h * length, row, col, door))
+    return FloorGeometry(rooms, width, length, unit)
+
+
+def floor_geometry(layout, plot_details=None):
+    """
+    FloorGeometry for a layout on a plot (defaults: 30 x 40 ft, north facing).
+    Cached per (layout, plot), so every renderer/report call after the
+    first is a dict lookup.
+    """
+    if plot_details is not None:
+        width, length, unit, facing = plot_details.width, plot_details.length, plot_details.unit, plot_details.facing.lower()
+    else:
+        width, length, unit, facing = 30, 40, "ft", "north"
+    return _compute(Layout.of(layout), width, length, unit, facing)
@@ -0,0 +1,171 @@
+import threading
+import weakref
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+
+# Room kinds by name prefix, checked in order: "master_bedroom" before
+# "bedroom", "staircase" before anything else that might contain "stair".
+ROOM_KINDS = (
+    ("master", "master_bedroom"),
+    ("living", "living_room"),
+    ("dining", "dining_area"),
+    ("pooja", "pooja_room"),
+    ("kitchen", "kitchen"),
+    ("staircase", "staircase"),
+    ("bedroom", "bedroom"),
+    ("bathroom", "bathroom"),
+    ("parking", "parking"),
+    ("balcony", "balcony"),
+    ("study", "study_room"),
+    ("store", "store_room"),
+)
+
+# Zone codes for the byte-packed zone column. Unknown zones are appended
+# (under the lock: layouts are built on several stage threads at once).
+ZONES = ["NW", "N", "NE", "W", "Center", "E", "SW", "S", "SE", "Flexible"]
+_ZONE_CODES = {z: i for i, z in enumerate(ZONES)}
+_ZONES_LOCK = threading.Lock()
+
+
+def _zone_code(zone):
+    code = _ZONE_CODES.get(zone)
+    if code is None:
+        with _ZONES_LOCK:
+            code = _ZONE_CODES.get(zone)
+            if code is None:
+                if len(ZONES) >= 256:
+                    raise ValueError(f"Too many distinct zones to pack: {zone!r}")
+                code = len(ZONES)
+                ZONES.append(zone)
+                _ZONE_CODES[zone] = code
+    return code
+
+
+@lru_cache(maxsize=4096)
+def _resolve_kind(name):
+    for key, kind in ROOM_KINDS:
+        if key in name:
+            return kind
+    return name
+
+
+class RoomId:
+    """
+    A room name with its type resolved once: RoomId("bedroom_2").kind == "bedroom".
+    Get instances through room_id(), which interns them.
+    """
+
+    __slots__ = ("name", "kind", "_hash", "__weakref__")
+
+    def __init__(self, name):
+        self.name = name
+        self.kind = _resolve_kind(name)
+        self._hash = hash(name)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, RoomId) and other.name == self.name
+
+    def __repr__(self):
+        return f"RoomId({self.name!r})"
+
+
+# Weak, so names from requests (custom rooms) go away with their layouts
+_ROOM_IDS = weakref.WeakValueDictionary()
+_ROOM_IDS_LOCK = threading.Lock()
+
+
+def room_id(name):
+    rid = _ROOM_IDS.get(name)
+    if rid is None:
+        with _ROOM_IDS_LOCK:
+            rid = _ROOM_IDS.get(name)
+            if rid is None:
+                rid = _ROOM_IDS[name] = RoomId(name)
+    return rid
+
+
+def room_kind(name):
+    return _resolve_kind(name)
+
+
+class Layout(Mapping):
+    """
+    Immutable {room_name: zone} placement for one floor.
+
+    Rooms are interned RoomIds and zones are packed one byte per room, so a
+    layout is a couple of small tuples plus a name -> position index for
+    O(1) lookups. It is a read-only Mapping, so
+    `layout[room]`, `.items()`, `dict(layout)` and json serialization of
+    `dict(layout)` behave like the plain dicts used before.
+
+    Fine-grid layouts (8x8 / 9x9) also carry `grid` and `blocks`
+    (room -> (r0, c0, rows, cols)); 3x3 layouts leave both as None.
+
+    Equal placements hash equally regardless of insertion order, so layouts
+    can be used directly as cache / dedup keys.
+    """
+
+    __slots__ = ("_rooms", "_zones", "_index", "_hash", "grid", "blocks")
+
+    def __init__(self, assigned, grid=None, blocks=None):
+        self._rooms = tuple(room_id(r) for r in assigned)
+        self._zones = bytes(_zone_code(z) for z in assigned.values())
+        self._index = {rid.name: i for i, rid in enumerate(self._rooms)}
+        self._hash = None
+        self.grid = grid
+        self.blocks = MappingProxyType(dict(blocks)) if blocks is not None else None
+
+    @classmethod
+    def of(cls, layout):
+        # Accept the plain dicts older callers still build (e.g. merged floors)
+        return layout if isinstance(layout, Layout) else cls(layout)
+
+    def __getitem__(self, name):
+        i = self._index.get(name)
+        if i is None:
+            raise KeyError(name)
+        return ZONES[self._zones[i]]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return (rid.name for rid in self._rooms)
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def entries(self):
+        """(RoomId, zone) pairs in placement order."""
+        return [(rid, ZONES[code]) for rid, code in zip(self._rooms, self._zones)]
+
+    def _key(self):
+        key = tuple(sorted((rid.name, code) for rid, code in zip(self._rooms, self._zones)))
+        if self.blocks is not None:
+            key += (self.grid.name,) + tuple(sorted(self.blocks.items()))
+        return key
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self._key())
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, Layout):
+            return hash(self) == hash(other) and self._key() == other._key()
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Layout({dict(self)!r})"
+
+    def pada_ids(self):
+        if self.blocks is None:
+            return {}
+        return {room: [self.grid.cell_id(c) for c in self.grid.block_cells(block)]
+                for room, block in self.blocks.items()}
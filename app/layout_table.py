@@ -0,0 +1,293 @@
+"""
+Precomputed floor layouts, shipped as one memory-mapped file.
+
+Placement only depends on the room program of a floor, the zones the rules
+allow for each room (vastu level / option variant) and the grid, never on
+plot size. `build` enumerates common room programs offline, keeps the
+best-scoring layout the optimizer can find for each, and writes:
+
+    header   magic, format, rules version, slot/record counts
+    index    open-addressed hash slots: (key hash u64, record number u32)
+    records  fixed width: key hash, room count, grid n, then per room
+             (zone code, note flag, r0, c0, rows, cols)
+
+LayoutOptimizer looks a floor up here before searching. The file is mapped
+read-only, so every worker process shares the same page-cache pages.
+
+    python -m app.layout_table build --out app/layout_table.bin
+    python -m app.layout_table info app/layout_table.bin
+"""
+import argparse
+import hashlib
+import itertools
+import mmap
+import os
+import random
+import struct
+import sys
+
+from app.layout import Layout, ZONES
+
+MAGIC = b"VLT1"
+FORMAT_VERSION = 1
+MAX_ROOMS = 20
+HEADER = struct.Struct("<4sHH12sIII")
+SLOT = struct.Struct("<QI")
+RECORD_HEAD = struct.Struct("<QBB")
+ROOM = struct.Struct("<BBBBBB")
+RECORD_SIZE = RECORD_HEAD.size + MAX_ROOMS * ROOM.size
+NO_BLOCK = 0xFF
+
+# Note flags, so table hits return the same notes a live search would
+NOTE_NONE, NOTE_FALLBACK, NOTE_REDUCED = 0, 1, 2
+# Built-in zones only; codes past these are assigned at runtime and not stable
+STABLE_ZONES = 10
+
+
+def table_key(room_zones, grid=None):
+    """
+    64-bit hash of a floor's placement problem. Room order is kept: the
+    optimizer breaks priority ties by insertion order.
+    """
+    text = (grid.name if grid is not None else "3x3") + "|" + ";".join(
+        f"{room}={','.join(zones)}" for room, zones in room_zones.items()
+    )
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _notes_flags(notes):
+    flags = {}
+    for note in notes:
+        room = note.split(" ", 1)[0]
+        flags[room] = NOTE_REDUCED if "reduced to a single pada" in note else NOTE_FALLBACK
+    return flags
+
+
+def _pack_record(key, room_zones, layout, notes, grid):
+    flags = _notes_flags(notes)
+    parts = [RECORD_HEAD.pack(key, len(room_zones), grid.n if grid is not None else 3)]
+    for room in room_zones:
+        code = ZONES.index(layout[room])
+        block = layout.blocks.get(room) if layout.blocks is not None else None
+        r0, c0, rows, cols = block if block is not None else (NO_BLOCK,) * 4
+        parts.append(ROOM.pack(code, flags.get(room, NOTE_NONE), r0, c0, rows, cols))
+    return b"".join(parts).ljust(RECORD_SIZE, b"\0")
+
+
+class LayoutTable:
+    """Read-only view of a built table file."""
+
+    def __init__(self, path, buf, n_slots, n_records, rules_version):
+        self.path = path
+        self._buf = buf
+        self.n_slots = n_slots
+        self.n_records = n_records
+        self.rules_version = rules_version
+        self._records_at = HEADER.size + n_slots * SLOT.size
+
+    @classmethod
+    def open(cls, path, rules_version=None):
+        """
+        Maps the file, or returns None when it is missing, malformed or was
+        built for a different rule set (stale layouts are worse than a search).
+        """
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, record_size, version, n_slots, n_records, _ = HEADER.unpack_from(buf, 0)
+        version = version.rstrip(b"\0").decode("ascii") # struct pads short versions
+        if magic != MAGIC or fmt != FORMAT_VERSION or record_size != RECORD_SIZE:
+            buf.close()
+            return None
+        if rules_version is not None and version != rules_version:
+            buf.close()
+            return None
+        return cls(path, buf, n_slots, n_records, version)
+
+    def lookup(self, room_zones, grid=None):
+        """(Layout, notes) for this floor problem, or None on a miss."""
+        if not self.n_slots or len(room_zones) > MAX_ROOMS:
+            return None
+        key = table_key(room_zones, grid)
+        slot = key % self.n_slots
+        for _ in range(self.n_slots):
+            slot_key, record = SLOT.unpack_from(self._buf, HEADER.size + slot * SLOT.size)
+            if record == 0:
+                return None
+            if slot_key == key:
+                return self._decode(record - 1, key, room_zones, grid)
+            slot = (slot + 1) % self.n_slots
+        return None
+
+    def _decode(self, record, key, room_zones, grid):
+        offset = self._records_at + record * RECORD_SIZE
+        rec_key, n_rooms, grid_n = RECORD_HEAD.unpack_from(self._buf, offset)
+        if rec_key != key or n_rooms != len(room_zones) or grid_n != (grid.n if grid is not None else 3):
+            return None
+
+        assigned, blocks, notes = {}, {}, []
+        offset += RECORD_HEAD.size
+        for room in room_zones:
+            code, flag, r0, c0, rows, cols = ROOM.unpack_from(self._buf, offset)
+            offset += ROOM.size
+            zone = ZONES[code]
+            assigned[room] = zone
+            if r0 != NO_BLOCK:
+                blocks[room] = (r0, c0, rows, cols)
+            if flag == NOTE_FALLBACK:
+                notes.append(f"{room} placed in {zone} (Fallback)")
+            elif flag == NOTE_REDUCED:
+                notes.append(f"{room} reduced to a single pada in {zone}")
+        if grid is not None:
+            return Layout(assigned, grid, blocks), notes
+        return Layout(assigned), notes
+
+    def close(self):
+        self._buf.close()
+
+
+def write_table(path, entries, rules_version):
+    """entries: {key: record bytes}. Writes atomically (tmp file + rename)."""
+    n_records = len(entries)
+    # Load factor <= 0.5 keeps linear probes short
+    n_slots = max(8, n_records * 2)
+    index = bytearray(n_slots * SLOT.size)
+    records = []
+    for key in sorted(entries):
+        slot = key % n_slots
+        while SLOT.unpack_from(index, slot * SLOT.size)[1] != 0:
+            slot = (slot + 1) % n_slots
+        records.append(entries[key])
+        SLOT.pack_into(index, slot * SLOT.size, key, len(records))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_SIZE, rules_version.encode("ascii"), n_slots, n_records, 0))
+        f.write(index)
+        f.write(b"".join(records))
+    os.replace(tmp, path)
+    return n_records
+
+
+# --- offline build ---------------------------------------------------------
+
+def _programs(max_bedrooms, max_bathrooms):
+    from app.schemas import RoomRequirements
+
+    toggles = itertools.product((True, False), repeat=5) # dining, pooja, study, balcony, parking
+    for (dining, pooja, study, balcony, parking), beds, baths in itertools.product(
+            toggles, range(1, max_bedrooms + 1), range(1, max_bathrooms + 1)):
+        yield RoomRequirements(
+            bedrooms=beds, bathrooms=baths, kitchen=True, living_room=True, dining_area=dining,
+            pooja_room=pooja, study_room=study, balcony=balcony, parking=parking
+        )
+
+
+def _solve(optimizer, scorer, rules, room_zones, grid, pada_rules, restarts):
+    # Pool unique candidates from several seeded searches; the first one is the
+    # greedy layout a live request would get, and it wins ties
+    candidates, seen = [], set()
+    for seed in range(restarts):
+        rng = random.Random(seed)
+        if grid is not None:
+            found = optimizer.generate_grid_variants(room_zones, grid, count=50, rng=rng, pada_rules=pada_rules)
+        else:
+            found = optimizer.generate_variants(room_zones, count=50, rng=rng)
+        for layout, notes in found:
+            if layout not in seen:
+                seen.add(layout)
+                candidates.append((layout, notes))
+    return max(candidates, key=lambda c: scorer.calculate_score(c[0], rules)[0])
+
+
+def build(out, grids=("3x3", "9x9"), floors=("G", "G+1", "G+2"), max_bedrooms=5, max_bathrooms=4,
+          plots=((30, 40), (40, 60), (60, 80)), restarts=4, verbose=True):
+    from app.design_pipeline import DesignPipeline
+    from app.floor_allocator import FloorAllocator
+    from app.mandala import get_grid
+    from app.optimizer import LayoutOptimizer
+    from app.rule_engine import VastuRuleEngine
+    from app.schemas import BuildingConfig, OutputPreferences, PlotDetails, UserInput
+    from app.vastu_scoring import VastuScorer
+
+    rule_engine = VastuRuleEngine()
+    optimizer = LayoutOptimizer() # no table: always search
+    scorer = VastuScorer()
+    rules = rule_engine.get_all_rules()
+    pipeline = DesignPipeline(rule_engine, optimizer, scorer, FloorAllocator(), services=None)
+
+    # Distinct floor programs first; many inputs share them
+    problems = {}
+    for rooms, floor_cfg, (length, width), level in itertools.product(
+            _programs(max_bedrooms, max_bathrooms), floors, plots, ("high", "medium", "low")):
+        user_input = UserInput(
+            plot=PlotDetails(length=length, width=width, unit="ft", shape="rectangle", facing="north"),
+            building=BuildingConfig(floors=floor_cfg, building_type="independent_house"),
+            rooms=rooms, vastu_preference=level, vastu_level=level, output=OutputPreferences(),
+        )
+        building = pipeline.allocator.plan_building(user_input)
+        for f_idx in building.distinct_floors():
+            names = building.floors[f_idx]
+            if len(names) > MAX_ROOMS:
+                continue
+            # Options 1-2 use fixed zone lists; 3+ shuffle them per request
+            for opt_idx in (0, 1):
+                room_zones = pipeline._option_zones(opt_idx, names, level, rng=None)
+                for grid_name in grids:
+                    grid = get_grid(grid_name)
+                    fine = grid if grid.n > 3 else None
+                    key = table_key(room_zones, fine)
+                    if key not in problems:
+                        problems[key] = (dict(room_zones), fine)
+
+    entries = {}
+    for i, (key, (room_zones, grid)) in enumerate(problems.items()):
+        pada_rules = pipeline._pada_rules(grid, list(room_zones)) if grid is not None else None
+        layout, notes = _solve(optimizer, scorer, rules, room_zones, grid, pada_rules, restarts)
+        if any(ZONES.index(z) >= STABLE_ZONES for z in layout.values()):
+            continue
+        entries[key] = _pack_record(key, room_zones, layout, notes, grid)
+        if verbose and (i + 1) % 500 == 0:
+            print(f"  solved {i + 1}/{len(problems)}", file=sys.stderr)
+
+    count = write_table(out, entries, rule_engine.version)
+    if verbose:
+        print(f"wrote {count} layouts to {out} ({os.path.getsize(out)} bytes, rules {rule_engine.version})")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed layout table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="enumerate room programs and write the table")
+    p_build.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout_table.bin"))
+    p_build.add_argument("--grids", default="3x3,9x9", help="comma-separated: 3x3,8x8,9x9")
+    p_build.add_argument("--floors", default="G,G+1,G+2", help="comma-separated floor configs")
+    p_build.add_argument("--max-bedrooms", type=int, default=5)
+    p_build.add_argument("--max-bathrooms", type=int, default=4)
+    p_build.add_argument("--restarts", type=int, default=4, help="seeded searches pooled per floor program")
+
+    p_info = sub.add_parser("info", help="print a table's header")
+    p_info.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.out, grids=tuple(args.grids.split(",")), floors=tuple(args.floors.split(",")),
+              max_bedrooms=args.max_bedrooms, max_bathrooms=args.max_bathrooms, restarts=args.restarts)
+        return 0
+
+    table = LayoutTable.open(args.path)
+    if table is None:
+        print(f"{args.path}: not a layout table")
+        return 1
+    print(f"{args.path}: {table.n_records} layouts, {table.n_slots} slots, rules {table.rules_version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
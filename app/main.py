@@ -1,46 +1,185 @@
-from fastapi import FastAPI
-from app.schemas import UserInput, PromptOutput
-from app.rule_engine import VastuRuleEngine
-from app.optimizer import LayoutOptimizer
-from app.prompt_builder import PromptBuilder
-from app.vastu_scoring import VastuScorer
-from app.visualizer import Visualizer
-# from app.image_generator import ImageGenerator  <-- Removed
-from app.floor_allocator import FloorAllocator
-from app.report_generator import PDFReportGenerator
-from app.text_generator import TextGenerator
 import base64
-from io import BytesIO
-from PIL import ImageDraw, ImageFont
+import json
+import logging
+import random
+import time
 
-from fastapi import FastAPI
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.schemas import UserInput, PromptOutput
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.schemas import (
+    UserInput, PromptOutput, DesignOutput, SessionOutput, SweepInput, SweepOutput, DesignSummary, ProjectSummary
+)
 from app.rule_engine import VastuRuleEngine
 from app.optimizer import LayoutOptimizer
+from app.layout_table import LayoutTable
+from app.prompt_builder import PromptBuilder
+from app.vastu_scoring import VastuScorer
+from app.floor_allocator import FloorAllocator
+from app.artifact_store import ArtifactStore, parse_range
+from app.bundle import ZipStream
+from app.result_cache import ResultCache, cacheable, canonical_key, canonicalize_input
+from app.design_pipeline import DesignPipeline, OutputPlan, to_base64
+from app.metrics import registry, stage, begin_request, request_start, server_timing_header, set_stage_hook, REQUEST_SECONDS, RESPONSE_BYTES
+from app.deadline import Deadline, DEADLINE_MISSED, costs
+from app.memory import MemoryTracker, MemoryBudget, MemoryBudgetExceeded, BUDGET_DEGRADED, BUDGET_REFUSED, check_rss, log_request, rss_bytes
+from app import memory
+from app.profiling import RequestProfiler
+from app.admission import AdmissionController, AdmissionMiddleware, admission_collector
+from app.services import services
+from app.sessions import SessionStore, diff_inputs
+from app.project_store import ProjectStore
+from app.stage_graph import StageGraph, StageExecutor
+from app.tiles import TileCache
+from app.config import settings
+# Visualizer (PIL), PDFReportGenerator (ReportLab) and TextGenerator (torch)
+# are built lazily through app.services; don't import them here.
 
 app = FastAPI(title="AI Vastu Prompt Generator")
+logger = logging.getLogger("vastu.design")
+
+heavy_admission = AdmissionController(
+    "heavy", settings.heavy_max_concurrency, settings.heavy_max_queue, settings.heavy_queue_timeout
+)
+light_admission = AdmissionController(
+    "light", settings.light_max_concurrency, settings.light_max_queue, settings.light_queue_timeout
+)
+registry.add_collector(admission_collector(heavy_admission, light_admission))
+
+# Opt-in per-stage memory accounting (metrics + one log line per request)
+memory_tracker = MemoryTracker(settings.memory_tracking) if settings.memory_tracking in ("rss", "tracemalloc") else None
+set_stage_hook(memory_tracker)
 
+app.add_middleware(
+    AdmissionMiddleware,
+    heavy=heavy_admission,
+    light=light_admission,
+    heavy_paths=("/generate-design", "/generate-sweep", "/generate-bundle", "/sessions"),
+    heavy_suffixes=("/bundle",), # /projects/{id}/bundle
+    exempt_paths=("/metrics",) # Scrapes must keep working while overloaded
+)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    timings = begin_request()
+    mem_samples = memory.begin_request() if memory_tracker is not None else None
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template so /artifacts/{id} doesn't explode cardinality
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    if mem_samples:
+        log_request(path, mem_samples)
+    REQUEST_SECONDS.observe(elapsed, path=path, method=request.method, status=response.status_code)
+    size = response.headers.get("content-length")
+    if size is not None:
+        RESPONSE_BYTES.observe(int(size), path=path)
+
+    timings.append(("total", elapsed))
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+@app.exception_handler(MemoryBudgetExceeded)
+async def memory_budget_exceeded(request: Request, exc: MemoryBudgetExceeded):
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+# Added last so it is the outermost layer: 429/503 rejections still carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], # In production, specifiy frontend URL
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
 rule_engine = VastuRuleEngine()
-optimizer = LayoutOptimizer()
+# Mapped read-only, so forked workers share its pages; None if missing or built for other rules
+optimizer = LayoutOptimizer(table=LayoutTable.open(settings.layout_table, rule_engine.version))
 builder = PromptBuilder()
 scorer = VastuScorer()
-visualizer = Visualizer()
 allocator = FloorAllocator()
-report_gen = PDFReportGenerator()
-text_gen = TextGenerator()
+artifact_store = ArtifactStore(max_bytes=settings.artifact_store_max_mb * 1024 * 1024)
+result_cache = ResultCache(
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_mb * 1024 * 1024,
+    ttl=settings.cache_ttl,
+    enabled=settings.cache_enabled
+)
+
+profiler = RequestProfiler(
+    mode=settings.profiling_mode,
+    allowlist=settings.profiling_allowlist,
+    max_profiles=settings.profiling_max_stored
+)
+
+def _cache_metrics():
+    stats = result_cache.stats()
+    return [
+        ("vastu_cache_hits_total", "counter", "Result cache hits.", [({}, stats["hits"])]),
+        ("vastu_cache_misses_total", "counter", "Result cache misses.", [({}, stats["misses"])]),
+        ("vastu_cache_evictions_total", "counter", "Result cache LRU/size evictions.", [({}, stats["evictions"])]),
+        ("vastu_cache_entries", "gauge", "Entries held by the result cache.", [({}, stats["entries"])]),
+        ("vastu_cache_bytes", "gauge", "Approximate bytes held by the result cache.", [({}, stats["bytes"])]),
+        ("vastu_artifact_store_bytes", "gauge", "Bytes held by the artifact store.", [({}, artifact_store.total_bytes)]),
+        ("vastu_tile_cache_hits_total", "counter", "Floor tiles pasted from the tile cache.", [({}, tile_cache.hits)]),
+        ("vastu_tile_cache_misses_total", "counter", "Floor tiles that had to be rasterized.", [({}, tile_cache.misses)]),
+        ("vastu_tile_cache_bytes", "gauge", "Raw pixel bytes held by the tile cache.", [({}, tile_cache.total_bytes)]),
+        ("vastu_sessions", "gauge", "Live design sessions.", [({}, len(sessions))]),
+        ("vastu_process_rss_bytes", "gauge", "Resident set size of this worker.", [({}, rss_bytes())]),
+    ]
+
+registry.add_collector(_cache_metrics)
+
+tile_cache = TileCache(max_bytes=settings.tile_cache_mb * 1024 * 1024)
+sessions = SessionStore(ttl=settings.session_ttl, max_sessions=settings.session_max)
+stage_executor = StageExecutor(threads=settings.stage_threads, processes=settings.stage_processes)
+pipeline = DesignPipeline(rule_engine, optimizer, scorer, allocator, services, tiles=tile_cache, plans=result_cache, executor=stage_executor)
+project_store = ProjectStore(
+    settings.project_db,
+    max_designs=settings.project_max_designs,
+    max_age=settings.project_max_age_days * 86400,
+) if settings.project_db else None
+
+def _rng_for(user_input):
+    # Seeded requests are reproducible; unseeded ones keep the old random behaviour
+    return random.Random(user_input.seed)
 
 @app.post("/generate-prompt", response_model=PromptOutput)
-def generate_prompt(user_input: UserInput):
+def generate_prompt(user_input: UserInput, request: Request, response: Response):
+    with profiler.capture(request, response, "generate-prompt"):
+        return _generate_prompt(user_input)
+
+def _generate_prompt(user_input):
+    user_input = canonicalize_input(user_input)
+    # Placement and score don't depend on facing; only the prompt text does,
+    # so the cached part is shared by all four facings
+    cache_key = canonical_key("prompt", user_input, rule_engine.version, facing=False)
+    cached = result_cache.get(cache_key) if cacheable(user_input) else None
+    if cached is None:
+        cached = _place_prompt_rooms(user_input)
+        if cacheable(user_input):
+            result_cache.put(cache_key, cached)
+    layout, notes, score, breakdown = cached
+
+    with stage("prompt_build"):
+        prompt, notes = builder.build(user_input, layout, notes)
 
+    return {
+        "optimized_prompt": prompt,
+        "vastu_score": score,
+        "vastu_breakdown": breakdown,
+        "vastu_notes": notes
+    }
+
+def _place_prompt_rooms(user_input):
     room_zones = {}
 
     if user_input.rooms.kitchen:
@@ -66,19 +205,14 @@ def generate_prompt(user_input: UserInput):
         for i in range(1, user_input.rooms.bedrooms):
             room_zones[f"bedroom_{i+1}"] = rule_engine.get_zone_for_room("bedroom", user_input.vastu_level)
 
-    layout, notes = optimizer.optimize(room_zones)
-    prompt, notes = builder.build(user_input, layout, notes)
-
-    score, breakdown = scorer.calculate_score(
-        layout, rule_engine.get_all_rules()
-    )
+    with stage("optimize"):
+        layout, notes = optimizer.optimize(room_zones, rng=_rng_for(user_input))
 
-    return {
-        "optimized_prompt": prompt,
-        "vastu_score": score,
-        "vastu_breakdown": breakdown,
-        "vastu_notes": notes
-    }
+    with stage("score"):
+        score, breakdown = scorer.calculate_score(
+            layout, rule_engine.get_all_rules()
+        )
+    return layout, notes, score, breakdown
 
 # Initialize Image Generator (Disabled for Procedural Mode)
 # try:
@@ -88,105 +222,763 @@ def generate_prompt(user_input: UserInput):
 #     print(f"Failed to load Image Generator: {e}")
 #     generator = None
 
-def get_base_rule_name(r):
-    base_name = r.split("_")[0] if "bedroom" in r or "bathroom" in r else r
-    if "master" in r: base_name = "master_bedroom"
-    rule_name = base_name
-    if "staircase" in r: rule_name = "staircase"
-    return base_name, rule_name
-
 @app.post("/generate-design")
-def generate_design(user_input: UserInput):
-    # 1. Allocate Rooms to Floors
-    floors_alloc = allocator.allocate(user_input)
-    
-    # 2. Generate Options (Variants)
-    # We want 3 distinct options with potentially different scores/layouts.
-    # Method: Run optimizer 3 times with different constraints.
-
-    # Store options structure: [ {floor: layout}, {floor: layout}, {floor: layout} ]
-    final_options = [{}, {}, {}] 
-
-    for f_idx, room_names in floors_alloc.items():
-        # Option 1: Strict / User Level
-        rz_opt1 = {}
-        for r in room_names:
-            base, rule_name = get_base_rule_name(r)
-            rz_opt1[r] = rule_engine.get_zone_for_room(rule_name, user_input.vastu_level)
-        
-        vars_1 = optimizer.generate_variants(rz_opt1, count=1)
-        final_options[0][f_idx] = vars_1[0][0]
-        
-        # Option 2: Balanced (Try alternatives if available)
-        rz_opt2 = {}
-        for r in room_names:
-            base, rule_name = get_base_rule_name(r)
-            # Use Medium to get more options
-            zones = rule_engine.get_zone_for_room(rule_name, "medium")
-            # For variety, if we have >1 zone, rotate the list
-            if len(zones) > 1:
-                 zones = zones[1:] + zones[:1] # Shift preference
-            rz_opt2[r] = zones
-            
-        vars_2 = optimizer.generate_variants(rz_opt2, count=1)
-        final_options[1][f_idx] = vars_2[0][0]
-
-        # Option 3: Experimental / Relaxed
-        rz_opt3 = {}
-        import random
-        for r in room_names:
-            base, rule_name = get_base_rule_name(r)
-            zones = rule_engine.get_zone_for_room(rule_name, "medium")
-            if len(zones) > 1:
-                random.shuffle(zones)
-            rz_opt3[r] = zones
-            
-        vars_3 = optimizer.generate_variants(rz_opt3, count=1)
-        final_options[2][f_idx] = vars_3[0][0]
-
-    # 4. Process Outputs (Image + Report)
+def generate_design(user_input: UserInput, request: Request, response: Response):
+    with profiler.capture(request, response, "generate-design"):
+        return _generate_design(user_input)
+
+def _generate_design(user_input):
+    user_input = canonicalize_input(user_input)
+    cache_key = canonical_key("design", user_input, rule_engine.version)
+    cached = result_cache.get(cache_key) if cacheable(user_input) else None
+    if cached is not None:
+        if all(_get_artifact(a["id"]) is not None for a in cached.get("artifacts", [])):
+            return _record_design(user_input, cache_key, cached, reuse=True)
+        # Artifacts were evicted from the store; the ids would 404, so regenerate
+        result_cache.invalidate(cache_key)
+
+    # Only build what the client asked for (plans, images, PDFs)
+    out_plan = OutputPlan(user_input.output)
+    deadline = _deadline_for(user_input)
+    _check_memory()
+
+    # 1-2. Allocate rooms to floors and optimize the requested options;
+    # the rest of the graph starts as soon as the plan exists
+    result = _deliver_design(
+        user_input, out_plan,
+        lambda: pipeline.plan(user_input, _rng_for(user_input), count=out_plan.options, deadline=deadline),
+        deadline=deadline
+    )
+    # Degraded output is only good enough for this request's deadline
+    if not deadline.degraded and cacheable(user_input):
+        result_cache.put(cache_key, result)
+    return _record_design(user_input, cache_key, result)
+
+def _deadline_for(user_input):
+    return Deadline(
+        user_input.output.deadline_ms or settings.deadline_ms,
+        start=request_start(), reserve_ms=settings.deadline_reserve_ms
+    )
+
+def _record_design(user_input, input_hash, result, reuse=False):
+    """
+    Files the response in the design history and returns a copy carrying its
+    design_id (cached results are shared, so never mutate them). reuse=True
+    (result cache hit) returns the existing record for the same input and
+    project instead of adding a duplicate row.
+    """
+    if project_store is None:
+        return result
+    project_id = user_input.project.id if user_input.project else None
+    with stage("persist"):
+        design_id = project_store.find_design(input_hash, project_id) if reuse else None
+        if design_id is None:
+            stored = [artifact_store.get(a["id"]) for a in result.get("artifacts", [])]
+            # Deferred reports are saved by their background build
+            stored = [a for a in stored if a is not None and not a.pending]
+            design_id = project_store.save_design(user_input, input_hash, result, stored)
+    return dict(result, design_id=design_id)
+
+def _check_memory():
+    # Before heavy work: refuse (503) rather than risk an OOM kill; the tile
+    # cache is dropped first since it's the biggest thing we can give back
+    check_rss(settings.max_rss_mb * 1024 * 1024, on_pressure=tile_cache.clear)
+
+# Full-size floors first, then smaller renders, before giving up on the budget
+RENDER_FALLBACK_PX = (None, 1024, 512)
+# Under a deadline, the renders still to come split this share of the time left
+RENDER_SHARE = 0.5
+# The LLM summary runs alongside planning and rendering, but PDFs wait for it
+SUMMARY_SHARE = 0.5
+
+def _fit_render(budget, deadline, opt_layouts, option, renders_left, degradations):
+    """
+    Largest floor size whose canvas fits the memory budget and, under a
+    deadline, whose estimated render time (for this and the renders after
+    it) fits RENDER_SHARE of the time left. Past the deadline the smallest
+    size is used; nothing fitting the budget raises MemoryBudgetExceeded.
+    """
+    fitting = [px for px in RENDER_FALLBACK_PX if budget.fits(pipeline.render_bytes(opt_layouts, px))]
+    if not fitting:
+        BUDGET_REFUSED.inc(reason="budget")
+        raise MemoryBudgetExceeded(
+            f"Option {option} does not fit the {settings.request_memory_mb} MB request memory budget; "
+            "request fewer options, images or reports"
+        )
+    in_time = [
+        px for px in fitting
+        if deadline.fits(costs.estimate("render", pipeline.render_bytes(opt_layouts, px)) * renders_left, RENDER_SHARE)
+    ]
+    tile_px = in_time[0] if in_time else fitting[-1]
+    if tile_px != fitting[0]:
+        deadline.degrade("render")
+        degradations.append(f"Option {option} rendered at {tile_px}px per floor to meet the {deadline.budget_ms} ms deadline.")
+    elif tile_px:
+        BUDGET_DEGRADED.inc()
+        degradations.append(f"Option {option} rendered at {tile_px}px per floor to fit the memory budget.")
+    return tile_px
+
+def _deliver_design(user_input, out_plan, plan, rendered=None, deadline=None):
+    """
+    plan: callable returning the options (pipeline.plan, or a session's
+    already planned options). The outputs are built as a StageGraph, so
+    independent stages overlap: the summary runs while options are planned,
+    and option N+1 renders while option N's PDF is built.
+    rendered: optional list, filled with the floors rasterized per option
+    deadline: Deadline the stages degrade for (smaller renders, template
+    summary, reports deferred to a background build)
+    """
+    deadline = deadline or Deadline(0)
+    # "artifacts" mode keeps the raw bytes server-side and only returns ids
+    delivery = (user_input.output.delivery or settings.default_delivery).lower()
+    use_artifacts = delivery == "artifacts"
+    budget = MemoryBudget(settings.request_memory_mb * 1024 * 1024)
+    plot = user_input.plot
+
+    def encode(buf, content_type, filename, kind, option, floor=None):
+        # Artifact ref or base64 string, built inside the stage that made buf
+        if use_artifacts:
+            return _artifact_ref(artifact_store.put(buf.getvalue(), content_type, filename), kind, option, floor)
+        encoded = to_base64(buf)
+        budget.charge(len(encoded))
+        return encoded
+
+    def render_stage(i):
+        # A. Image. Canvases are rendered one at a time (each render waits for
+        # the previous one) so the budget check sees every live PNG
+        def run(options, _previous=None):
+            out = {"buf": None, "image": None, "drawn": [], "degradations": []}
+            if not out_plan.render:
+                return out
+            tile_px = _fit_render(budget, deadline, options[i], i+1, out_plan.options - i, out["degradations"])
+            buf = pipeline.render(options[i], plot, rendered=out["drawn"], tile_px=tile_px)
+            budget.charge(buf.getbuffer().nbytes)
+            if out_plan.images:
+                out["image"] = encode(buf, "image/png", f"option_{i+1}.png", "image", i+1)
+            if out_plan.reports:
+                out["buf"] = buf # the PDF stage closes it
+            else:
+                budget.release(buf.getbuffer().nbytes)
+                buf.close()
+            return out
+        return run
+
+    def summary_stage():
+        if not out_plan.summary:
+            return "", None
+        # The model can't be interrupted, so under a deadline it only runs
+        # when its usual time fits; otherwise the PDFs get the template text
+        if not deadline.fits(costs.estimate("text_generation"), SUMMARY_SHARE):
+            deadline.degrade("text_generation")
+            return pipeline.summary(user_input, plot, template=True), f"Report summary uses template text to meet the {deadline.budget_ms} ms deadline."
+        return pipeline.summary(user_input, plot), None
+
+    def report_stage(i):
+        # B. Report, from the PNG above and the shared floor geometry
+        def run(options, image, score, floor_geo, summary):
+            notes = [f"Option {i+1} optimized for compliance."] + options[i].notes
+            png = image["buf"]
+            image["buf"] = None
+            # The PNG was only kept for the PDF
+            budget.release(png.getbuffer().nbytes)
+
+            def build():
+                pdf_buffer = pipeline.report(i+1, png, score[0], score[1], notes, plot, summary[0], floor_geo)
+                png.close()
+                return pdf_buffer
+
+            # Past the deadline, the PDF is built after the response and the
+            # client fetches it from the reserved artifact
+            if not deadline.fits(costs.estimate("pdf_report")):
+                deadline.degrade("pdf_report")
+                return {"deferred": artifact_store.reserve("application/pdf", f"report_{i+1}.pdf"), "build": build}
+            pdf_buffer = build()
+            report = encode(pdf_buffer, "application/pdf", f"report_{i+1}.pdf", "report", i+1)
+            pdf_buffer.close()
+            return {"report": report}
+        return run
+
+    def thumbnail_stage(i):
+        # C. Thumbnails, resized from the tiles the render stage cached
+        def run(options, _image):
+            refs, option_thumbs = [], {}
+            for floor_ids, buf in pipeline.thumbnails(options[i], plot, out_plan.thumbnails):
+                out = encode(buf, "image/png", f"option_{i+1}_floor_{floor_ids[0]}_thumb.png", "thumbnail", i+1, floor_ids[0])
+                if use_artifacts:
+                    refs.append(out)
+                else:
+                    for f_idx in floor_ids:
+                        option_thumbs[str(f_idx)] = out
+                buf.close()
+            return refs, option_thumbs
+        return run
+
+    def comparison_stage(options, *_images):
+        # D. Comparison sheet: one canvas, pasted from the same tiles
+        sheet = pipeline.comparison(options, plot)
+        if use_artifacts:
+            return _artifact_ref(artifact_store.put(sheet.getvalue(), "image/png", "comparison.png"), "comparison", 0)
+        return to_base64(sheet)
+
+    graph = StageGraph()
+    graph.add("plan", plan)
+    # The summary context is the same for every option, so generate it once
+    graph.add("summary", summary_stage)
+    previous = ()
+    for i in range(out_plan.options):
+        # Room rectangles, doors and dimensions, shared by the image and the PDF
+        graph.add(f"geometry:{i}", lambda options, i=i: pipeline.geometry(options[i], plot), "plan")
+        graph.add(f"score:{i}", lambda options, i=i: pipeline.score(options[i]), "plan")
+        graph.add(f"render:{i}", render_stage(i), "plan", *previous)
+        previous = (f"render:{i}",)
+        if out_plan.reports:
+            graph.add(f"report:{i}", report_stage(i), "plan", f"render:{i}", f"score:{i}", f"geometry:{i}", "summary")
+        if out_plan.thumbnails:
+            graph.add(f"thumbnails:{i}", thumbnail_stage(i), "plan", f"render:{i}")
+    if out_plan.comparison:
+        graph.add("comparison", comparison_stage, "plan", *[f"render:{i}" for i in range(out_plan.options)])
+
+    results = stage_executor.run(graph)
+
+    final_options = results["plan"]
     images_base64 = []
     reports_base64 = []
-    
+    artifacts = []
+    scores = []
+    thumbnails = []
+    geometry = []
+    degradations = []
+    deferred = []
+
+    shortcut = [i + 1 for i, opt in enumerate(final_options) if opt.shortcut]
+    if shortcut:
+        degradations.append(
+            f"Option{'s' if len(shortcut) > 1 else ''} {', '.join(map(str, shortcut))} copy option 1's layout on the floors "
+            f"listed in copied_floors instead of being optimized separately, to meet the {deadline.budget_ms} ms deadline."
+        )
+    if results["summary"][1]:
+        degradations.append(results["summary"][1])
+    for i in range(out_plan.options):
+        image = results[f"render:{i}"]
+        degradations.extend(image["degradations"])
+        geometry.append({str(f): geo.to_dict() for f, geo in results[f"geometry:{i}"].items()})
+        scores.append(results[f"score:{i}"][0])
+        if rendered is not None:
+            rendered.append(image["drawn"])
+        if image["image"] is not None:
+            (artifacts if use_artifacts else images_base64).append(image["image"])
+        if out_plan.reports:
+            report = results[f"report:{i}"]
+            if "deferred" in report:
+                # Listed as an artifact even in base64 delivery: there are no bytes to inline yet
+                ref = _artifact_ref(report["deferred"], "report", i+1)
+                artifacts.append(ref)
+                deferred.append((report["deferred"], report["build"]))
+                degradations.append(f"Option {i+1} report deferred to meet the {deadline.budget_ms} ms deadline; fetch it from {ref['url']}.")
+            else:
+                (artifacts if use_artifacts else reports_base64).append(report["report"])
+        if out_plan.thumbnails:
+            refs, option_thumbs = results[f"thumbnails:{i}"]
+            if use_artifacts:
+                artifacts.extend(refs)
+            else:
+                thumbnails.append(option_thumbs)
+
+    comparison_image = ""
+    if out_plan.comparison:
+        if use_artifacts:
+            artifacts.append(results["comparison"])
+        else:
+            comparison_image = results["comparison"]
+
+    for artifact, build in deferred:
+        stage_executor.background(_build_deferred, artifact, build)
+    if deadline.past():
+        DEADLINE_MISSED.inc()
+
+    message = f"Generated {out_plan.options} Option{'s' if out_plan.options > 1 else ''}"
+    message += " with Professional AI Reports." if out_plan.reports else "."
+    layouts = [{str(f): dict(layout) for f, layout in opt.items()} for opt in final_options]
+    padas = [{str(f): layout.pada_ids() for f, layout in opt.items() if layout.grid is not None} for opt in final_options]
+
+    result = {
+        "images": images_base64,
+        "reports": reports_base64,
+        "image_base64": images_base64[0] if images_base64 else "",
+        "artifacts": artifacts,
+        "scores": scores,
+        "layouts": layouts,
+        "padas": padas if any(padas) else [],
+        "copied_floors": [sorted(opt.shortcut) for opt in final_options] if shortcut else [],
+        "geometry": geometry,
+        "comparison_image": comparison_image,
+        "thumbnails": thumbnails,
+        "degradations": degradations,
+        "prompt": message
+    }
+    return result
+
+# Design sessions: the form keeps one session and resubmits edits with PUT.
+# Only floors whose room program (or rules) changed are re-optimized, and
+# only floors whose drawing changed are re-rendered.
+@app.post("/sessions", response_model=SessionOutput)
+def create_session(user_input: UserInput, request: Request, response: Response):
+    session = sessions.create()
+    with profiler.capture(request, response, "sessions"):
+        return _run_session(session, user_input)
+
+@app.put("/sessions/{session_id}", response_model=SessionOutput)
+def update_session(session_id: str, user_input: UserInput, request: Request, response: Response):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    with profiler.capture(request, response, "sessions"):
+        return _run_session(session, user_input)
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"deleted": session_id}
+
+def _run_session(session, user_input):
+    user_input = canonicalize_input(user_input)
+    deadline = _deadline_for(user_input)
+    _check_memory()
+    with session.lock:
+        out_plan = OutputPlan(user_input.output)
+        previous = (session.user_input, session.options) if session.user_input is not None else None
+        changes = diff_inputs(session.user_input, user_input) if previous else []
+
+        final_options = pipeline.plan(user_input, _rng_for(user_input), count=out_plan.options, previous=previous, deadline=deadline)
+        rendered = []
+        result = _deliver_design(user_input, out_plan, lambda: final_options, rendered=rendered, deadline=deadline)
+
+        session.user_input = user_input
+        session.options = final_options
+        session.revision += 1
+        result = _record_design(user_input, canonical_key("design", user_input, rule_engine.version), result)
+
+        result.update({
+            "session_id": session.id,
+            "revision": session.revision,
+            "changes": changes,
+            "reoptimized_floors": [sorted(set(opt) - opt.reused) for opt in final_options],
+            "rerendered_floors": [sorted(floors) for floors in rendered],
+        })
+        return result
+
+
+SQFT_PER_UNIT = {"ft": 1.0, "m": 10.7639}
+
+@app.post("/generate-sweep", response_model=SweepOutput)
+def generate_sweep(sweep: SweepInput, request: Request, response: Response):
+    with profiler.capture(request, response, "generate-sweep"):
+        return _generate_sweep(sweep)
+
+def _generate_sweep(sweep):
+    """
+    Evaluates one room program across many plots. Allocation and optimization
+    don't look at the plot, so they run once per distinct plan_key; each
+    variant then only pays for render, score and report. Variants with the
+    same summary prompt (plot area and facing) share one summary.
+    """
+    base_input = canonicalize_input(sweep.design)
+    out_plan = OutputPlan(base_input.output)
+    _check_memory()
+
+    plans = {}
+    summaries = {}
+    rows = []
+    for v_idx, plot in enumerate(sweep.plots):
+        variant_input = canonicalize_input(base_input.model_copy(update={"plot": plot}))
+        plot = variant_input.plot
+
+        key = pipeline.plan_key(variant_input)
+        if key not in plans:
+            plans[key] = pipeline.plan(variant_input, _rng_for(variant_input), count=out_plan.options)
+        options = plans[key]
+
+        ai_summary = ""
+        if out_plan.summary:
+            context = tuple(sorted(pipeline.summary_context(variant_input, plot).items()))
+            if context not in summaries:
+                summaries[context] = pipeline.summary(variant_input, plot)
+            ai_summary = summaries[context]
+        option_scores = []
+        artifacts = []
+        for i, opt_layouts in enumerate(options):
+            buffered_img = pipeline.render(opt_layouts, plot) if out_plan.render else None
+            if out_plan.images:
+                artifacts.append(_artifact_ref(
+                    artifact_store.put(buffered_img.getvalue(), "image/png", f"variant_{v_idx+1}_option_{i+1}.png"), "image", i+1
+                ))
+
+            score, breakdown = pipeline.score(opt_layouts)
+            option_scores.append(score)
+
+            if out_plan.reports:
+                notes = [f"Option {i+1} optimized for compliance."] + opt_layouts.notes
+                pdf_buffer = pipeline.report(i+1, buffered_img, score, breakdown, notes, plot, ai_summary, pipeline.geometry(opt_layouts, plot))
+                artifacts.append(_artifact_ref(
+                    artifact_store.put(pdf_buffer.getvalue(), "application/pdf", f"variant_{v_idx+1}_report_{i+1}.pdf"), "report", i+1
+                ))
+                pdf_buffer.close()
+            if buffered_img is not None:
+                buffered_img.close()
+
+        best_idx = max(range(len(option_scores)), key=lambda i: option_scores[i])
+        rows.append({
+            "variant": v_idx + 1,
+            "plot": plot,
+            "area_sqft": round(plot.length * plot.width * SQFT_PER_UNIT.get(plot.unit, 1.0), 2),
+            "best_option": best_idx + 1,
+            "best_score": option_scores[best_idx],
+            "option_scores": option_scores,
+            "artifacts": artifacts
+        })
+
+    # Best compliance first; larger plots break ties (more room per space)
+    rows.sort(key=lambda r: (-r["best_score"], -r["area_sqft"], r["variant"]))
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+
+    return {"plans_computed": len(plans), "table": rows}
+
+# Bundles: everything as one streamed ZIP instead of base64 inside JSON.
+# Each file goes out as soon as it exists and is dropped, so a bundle holds
+# one artifact at a time however many options it has.
+BUNDLE_HEADERS = {"Content-Disposition": 'attachment; filename="vastu_design.zip"'}
+
+@app.post("/generate-bundle")
+def generate_bundle(user_input: UserInput):
+    """
+    Per option: PNG, PDF and a JSON of layouts, geometry and score breakdown;
+    plus the image prompt, the comparison sheet if asked for, and
+    manifest.json (scores, files, timings) as the last entry.
+    """
+    user_input = canonicalize_input(user_input)
+    out_plan = OutputPlan(user_input.output)
+    _check_memory()
+    # Everything that can fail (planning, the prompt, render sizing against the
+    # memory budget) happens before the first byte, so it still gets a status code
+    start = time.perf_counter()
+    final_options = pipeline.plan(user_input, _rng_for(user_input), count=out_plan.options)
+    plan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    prompt = _generate_prompt(user_input)["optimized_prompt"]
+    prompt_seconds = time.perf_counter() - start
+
+    # Each option's PNG is released before the next is sized, so sizing them
+    # all against an empty budget up front gives the same answer as in-stream
+    degradations = []
+    tile_pxs = [None] * len(final_options)
+    if out_plan.render:
+        budget = MemoryBudget(settings.request_memory_mb * 1024 * 1024)
+        tile_pxs = [_fit_render(budget, Deadline(0), opt_layouts, i+1, 1, degradations)
+                    for i, opt_layouts in enumerate(final_options)]
+
+    stream = _bundle_stream(user_input, out_plan, final_options, plan_seconds, prompt, prompt_seconds, tile_pxs, degradations)
+    return StreamingResponse(stream, media_type="application/zip", headers=BUNDLE_HEADERS)
+
+def _bundle_stream(user_input, out_plan, final_options, plan_seconds, prompt, prompt_seconds, tile_pxs, degradations):
+    started = time.perf_counter()
+    bundle = ZipStream()
+    budget = MemoryBudget(settings.request_memory_mb * 1024 * 1024)
+    plot = user_input.plot
+    timings = {"plan": round(plan_seconds, 4)}
+    options = []
+
+    yield bundle.add("prompt.txt", prompt, prompt_seconds)
+
+    ai_summary = ""
+    if out_plan.summary:
+        start = time.perf_counter()
+        ai_summary = pipeline.summary(user_input, plot)
+        timings["summary"] = round(time.perf_counter() - start, 4)
+
     for i, opt_layouts in enumerate(final_options):
-        # A. Image
-        img = visualizer.create_composite_image([opt_layouts], plot_details=user_input.plot, single_option_mode=True)
-        
-        buffered_img = BytesIO()
-        img.save(buffered_img, format="PNG")
-        img_str = base64.b64encode(buffered_img.getvalue()).decode("utf-8")
-        images_base64.append(img_str)
-        
-        # B. Report
-        # Aggregate full layout for scoring
-        full_layout = {}
-        for f, layout in opt_layouts.items():
-            full_layout.update(layout)
-            
-        # Score
-        score, breakdown = scorer.calculate_score(full_layout, rule_engine.get_all_rules())
-        
-        # Determine notes
-        notes = [f"Option {i+1} optimized for compliance."]
-        
-        # AI Text Generation
-        context = {
-            "style": user_input.design.style,
-            "plot_size": f"{user_input.plot.length * user_input.plot.width}",
-            "facing": user_input.plot.facing,
-            "floors": user_input.building.floors,
-            "bedrooms": user_input.rooms.bedrooms
+        name = f"option_{i+1}"
+        floor_geo = pipeline.geometry(opt_layouts, plot)
+        score, breakdown = pipeline.score(opt_layouts)
+
+        png = None
+        if out_plan.render:
+            start = time.perf_counter()
+            png = pipeline.render(opt_layouts, plot, tile_px=tile_pxs[i])
+            budget.charge(png.getbuffer().nbytes)
+            if out_plan.images:
+                yield bundle.add(f"{name}/{name}.png", png.getvalue(), time.perf_counter() - start)
+
+        if out_plan.reports:
+            start = time.perf_counter()
+            notes = [f"Option {i+1} optimized for compliance."] + opt_layouts.notes
+            pdf = pipeline.report(i+1, png, score, breakdown, notes, plot, ai_summary, floor_geo)
+            yield bundle.add(f"{name}/{name}_report.pdf", pdf.getvalue(), time.perf_counter() - start)
+            pdf.close()
+
+        if png is not None:
+            budget.release(png.getbuffer().nbytes)
+            png.close()
+
+        detail = {
+            "option": i + 1,
+            "score": score,
+            "breakdown": breakdown,
+            "notes": opt_layouts.notes,
+            "layouts": {str(f): dict(layout) for f, layout in opt_layouts.items()},
+            "padas": {str(f): layout.pada_ids() for f, layout in opt_layouts.items() if layout.grid is not None},
+            "geometry": {str(f): geo.to_dict() for f, geo in floor_geo.items()},
         }
-        ai_summary = text_gen.generate_report_text(context)
-        
-        # Generate PDF
-        pdf_buffer = report_gen.generate_report(i+1, buffered_img, score, breakdown, notes, user_input.plot, ai_summary=ai_summary)
-        pdf_str = base64.b64encode(pdf_buffer.getvalue()).decode("utf-8")
-        reports_base64.append(pdf_str)
+        yield bundle.add(f"{name}/{name}.json", json.dumps(detail, indent=2))
+        options.append({"option": i + 1, "score": score, "folder": f"{name}/"})
+
+    if out_plan.comparison:
+        start = time.perf_counter()
+        sheet = pipeline.comparison(final_options, plot)
+        yield bundle.add("comparison.png", sheet.getvalue(), time.perf_counter() - start)
+        sheet.close()
+
+    timings["total"] = round(plan_seconds + time.perf_counter() - started, 4)
+    manifest = {
+        "rules_version": rule_engine.version,
+        "input": user_input.model_dump(mode="json"),
+        "options": options,
+        "best_option": max(options, key=lambda o: o["score"])["option"] if options else None,
+        "files": bundle.files,
+        "timings": timings,
+        "degradations": degradations,
+    }
+    yield bundle.add("manifest.json", json.dumps(manifest, indent=2))
+    yield bundle.close()
 
+@app.get("/metrics")
+def metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _require_profiling(request):
+    # Debug endpoints don't exist unless profiling is switched on
+    if not profiler.enabled or not profiler.is_allowed(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/debug/profiles")
+def list_profiles(request: Request):
+    _require_profiling(request)
+    return {"profiles": profiler.store.list()}
+
+@app.get("/debug/memory")
+def debug_memory(request: Request, limit: int = 25):
+    # Largest live allocation sites; needs VASTU_MEMORY_TRACKING=tracemalloc
+    _require_profiling(request)
     return {
-        "images": images_base64,
-        "reports": reports_base64,
-        "image_base64": images_base64[0],
-        "prompt": "Generated 3 Options with Professional AI Reports."
+        "mode": settings.memory_tracking,
+        "rss_bytes": rss_bytes(),
+        "top": memory_tracker.top(limit) if memory_tracker is not None else [],
+    }
+
+@app.get("/debug/profiles/{profile_id}")
+def get_profile(profile_id: str, request: Request, format: str = "pstats", sort: str = "cumulative"):
+    _require_profiling(request)
+    captured = profiler.store.get(profile_id)
+    if captured is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+
+    if format == "collapsed":
+        # Brendan Gregg folded-stack format, feed to flamegraph.pl / speedscope
+        return Response(content=captured.collapsed_text(), media_type="text/plain")
+    if format == "prof":
+        if captured.stats is None:
+            raise HTTPException(status_code=404, detail="Binary pstats only exist for cprofile captures")
+        return Response(
+            content=captured.prof_bytes(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{captured.id}.prof"'}
+        )
+    if captured.stats is None:
+        return Response(content=captured.collapsed_text(), media_type="text/plain")
+    return Response(content=captured.pstats_text(sort=sort), media_type="text/plain")
+
+@app.get("/services")
+def service_status():
+    # Which lazy subsystems have been loaded in this worker, and how long each took
+    return services.status()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+def _require_store(request=None):
+    if project_store is None:
+        raise HTTPException(status_code=404, detail="Design history is disabled (VASTU_PROJECT_DB)")
+    # Project ids and owners are client-chosen, so anything that browses by
+    # them is allowlisted like the debug endpoints
+    if request is not None:
+        client = request.client.host if request.client else None
+        token = request.headers.get("x-vastu-history-token")
+        if client not in settings.history_allowlist and (token is None or token not in settings.history_allowlist):
+            raise HTTPException(status_code=403, detail="Design history listing is not allowed for this client")
+    return project_store
+
+# Design history: reopening is a key lookup in SQLite, never a pipeline run
+@app.get("/designs/{design_id}", response_model=DesignOutput)
+def load_design(design_id: str):
+    result = _require_store().load_design(design_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Design not found")
+    return result
+
+@app.get("/designs", response_model=list[DesignSummary])
+def list_designs(request: Request, project: Optional[str] = None, owner: Optional[str] = None, input_hash: Optional[str] = None,
+                 min_score: Optional[float] = None, order: str = "recent", limit: int = 50, offset: int = 0):
+    # order: "recent" (newest first) or "score" (best first)
+    store = _require_store(request)
+    # Scoped listings only: one client must not page through everyone's history
+    if project is None and owner is None:
+        raise HTTPException(status_code=422, detail="Filter by project or owner")
+    return store.list_designs(
+        project_id=project, owner=owner, input_hash=input_hash, min_score=min_score,
+        order=order, limit=max(1, min(limit, 500)), offset=max(0, offset)
+    )
+
+@app.get("/projects", response_model=list[ProjectSummary])
+def list_projects(request: Request, owner: Optional[str] = None, limit: int = 50, offset: int = 0):
+    store = _require_store(request)
+    if owner is None:
+        raise HTTPException(status_code=422, detail="Filter by owner")
+    return store.list_projects(owner=owner, limit=max(1, min(limit, 500)), offset=max(0, offset))
+
+@app.get("/projects/{project_id}/bundle")
+def project_bundle(project_id: str, request: Request, limit: Optional[int] = None, offset: int = 0):
+    """
+    The project's designs, newest first, as one streamed ZIP with one folder
+    per design; at most VASTU_MAX_BUNDLE_DESIGNS per bundle (page with offset).
+    """
+    store = _require_store(request)
+    limit = max(1, min(limit or settings.max_bundle_designs, settings.max_bundle_designs))
+    # One extra row tells the manifest whether more designs are left
+    designs = store.list_designs(project_id=project_id, limit=limit + 1, offset=max(0, offset))
+    if not designs:
+        raise HTTPException(status_code=404, detail="Project not found or has no designs")
+    truncated = len(designs) > limit
+    headers = {"Content-Disposition": f'attachment; filename="project_{project_id}.zip"'}
+    stream = _project_bundle_stream(store, project_id, designs[:limit], truncated)
+    return StreamingResponse(stream, media_type="application/zip", headers=headers)
+
+def _project_bundle_stream(store, project_id, designs, truncated=False):
+    bundle = ZipStream()
+    entries = []
+    for row in designs:
+        # One design's response in memory at a time
+        result = store.load_design(row["id"])
+        folder = f"{row['id']}/"
+        files_before = len(bundle.files)
+
+        # base64 delivery kept the files inside the JSON: unpack them
+        result.pop("image_base64", None)
+        for i, data in enumerate(result.pop("images", [])):
+            yield bundle.add(f"{folder}option_{i+1}.png", base64.b64decode(data))
+        for i, data in enumerate(result.pop("reports", [])):
+            yield bundle.add(f"{folder}report_{i+1}.pdf", base64.b64decode(data))
+        comparison = result.pop("comparison_image", "")
+        if comparison:
+            yield bundle.add(f"{folder}comparison.png", base64.b64decode(comparison))
+        for i, thumbs in enumerate(result.pop("thumbnails", [])):
+            for floor, data in thumbs.items():
+                yield bundle.add(f"{folder}option_{i+1}_floor_{floor}_thumb.png", base64.b64decode(data))
+        # artifact delivery: the bytes are in the store
+        for ref in result.get("artifacts", []):
+            persisted = store.get_artifact(ref["id"])
+            if persisted is not None:
+                data, _, filename = persisted
+                yield bundle.add(folder + (filename or ref["id"]), data)
+
+        yield bundle.add(f"{folder}design.json", json.dumps(result, indent=2))
+        entries.append({
+            "design_id": row["id"],
+            "created_at": row["created_at"],
+            "best_score": row["best_score"],
+            "scores": result.get("scores", []),
+            "files": [f["name"] for f in bundle.files[files_before:]],
+        })
+
+    manifest = {"project_id": project_id, "designs": entries, "truncated": truncated, "files": bundle.files}
+    yield bundle.add("manifest.json", json.dumps(manifest, indent=2))
+    yield bundle.close()
+
+def _artifact_ref(artifact, kind, option, floor=None):
+    return {
+        "id": artifact.id,
+        "kind": kind,
+        "option": option,
+        "floor": floor,
+        "content_type": artifact.content_type,
+        "size": artifact.size,
+        "url": f"/artifacts/{artifact.id}",
+        "pending": artifact.pending
     }
+
+def _build_deferred(artifact, build):
+    # Runs after the response went out; GET /artifacts/{id} answers 202 meanwhile
+    try:
+        buf = build()
+    except Exception:
+        logger.exception("deferred artifact %s failed", artifact.id)
+        artifact_store.discard(artifact.id)
+        return
+    artifact_store.fulfil(artifact, buf.getvalue())
+    buf.close()
+    if project_store is not None:
+        project_store.save_artifact(artifact)
+
+def _get_artifact(artifact_id):
+    artifact = artifact_store.get(artifact_id)
+    if artifact is None and project_store is not None:
+        # Evicted from memory (or a restart); designs in the history keep their bytes
+        persisted = project_store.get_artifact(artifact_id)
+        if persisted is not None:
+            artifact = artifact_store.put(*persisted)
+    return artifact
+
+@app.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str, request: Request):
+    artifact = _get_artifact(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+    if artifact.pending:
+        # Deferred report still being built; clients poll the same URL
+        return JSONResponse(status_code=202, content={"detail": "Artifact is still being generated"}, headers={"Retry-After": "1"})
+
+    headers = {
+        "ETag": artifact.etag,
+        # Content-addressed ids never change meaning, so clients may cache freely
+        "Cache-Control": f"public, max-age={settings.artifact_max_age}, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if artifact.filename:
+        headers["Content-Disposition"] = f'inline; filename="{artifact.filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or artifact.etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == artifact.etag):
+        try:
+            byte_range = parse_range(range_header, artifact.size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{artifact.size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{artifact.size}"
+            return Response(
+                content=artifact.data[start:end + 1],
+                status_code=206,
+                media_type=artifact.content_type,
+                headers=headers
+            )
+
+    return Response(content=artifact.data, media_type=artifact.content_type, headers=headers)
@@ -0,0 +1,151 @@
+from app.layout import room_kind
+
+ZONE_GRID = (
+    ("NW", "N", "NE"),
+    ("W", "Center", "E"),
+    ("SW", "S", "SE"),
+)
+
+# Block shapes (rows, cols) a room kind occupies on a fine grid
+ROOM_BLOCKS = {
+    "master_bedroom": (2, 2),
+    "living_room": (2, 2),
+    "parking": (2, 2),
+    "bedroom": (2, 2),
+    "kitchen": (2, 1),
+    "dining_area": (1, 2),
+    "staircase": (2, 1),
+    "study_room": (1, 2),
+    "balcony": (1, 1),
+    "pooja_room": (1, 1),
+    "bathroom": (1, 1),
+    "store_room": (1, 1),
+}
+
+
+def block_for_room(room_name):
+    return ROOM_BLOCKS.get(room_kind(room_name), (1, 1))
+
+
+class PlacementGrid:
+    """
+    An n x n Vastu Purusha Mandala grid (3x3 zones, 8x8 Manduka, 9x9 Paramasayika).
+
+    Every cell (pada) belongs to one of the nine direction bands used by
+    vastu_rules.json, so zone rules keep working while placement happens on
+    finer cells. Cells are addressed as "r{row}c{col}" with r0 on the north edge.
+
+    The spatial index is precomputed once per grid size:
+    - zone_cells:  zone -> cell indices
+    - neighbors:   cell -> 4-connected neighbor indices
+    - placements:  (zone, shape) -> bitmasks of every block of that shape that
+                   fits inside the zone, so checking a placement is one AND.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.name = f"{n}x{n}"
+        lo = round(n / 3)
+        hi = n - lo
+        self._band = tuple(0 if i < lo else 2 if i >= hi else 1 for i in range(n))
+
+        self.zone_of = tuple(ZONE_GRID[self._band[r]][self._band[c]] for r in range(n) for c in range(n))
+        self.zone_cells = {}
+        for idx, zone in enumerate(self.zone_of):
+            self.zone_cells.setdefault(zone, []).append(idx)
+
+        self.neighbors = tuple(self._neighbors(idx) for idx in range(n * n))
+        self._placements = {}
+
+    # Grids of one size are interchangeable; compare them by value, not identity
+    def __eq__(self, other):
+        return isinstance(other, PlacementGrid) and other.n == self.n
+
+    def __hash__(self):
+        return hash(self.n)
+
+    def _neighbors(self, idx):
+        r, c = divmod(idx, self.n)
+        out = []
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            rr, cc = r + dr, c + dc
+            if 0 <= rr < self.n and 0 <= cc < self.n:
+                out.append(rr * self.n + cc)
+        return tuple(out)
+
+    def cell_id(self, idx):
+        r, c = divmod(idx, self.n)
+        return f"r{r}c{c}"
+
+    def cell_index(self, cell_id):
+        r, _, c = cell_id[1:].partition("c")
+        return int(r) * self.n + int(c)
+
+    def band_position(self, zone):
+        # (row, col) of the zone on the coarse 3x3 grid
+        for r, row in enumerate(ZONE_GRID):
+            if zone in row:
+                return r, row.index(zone)
+        return 1, 1
+
+    def placements(self, zone, shape):
+        """[(mask, (r0, c0, rows, cols)), ...] for blocks of `shape` fully inside `zone`."""
+        key = (zone, shape)
+        cached = self._placements.get(key)
+        if cached is not None:
+            return cached
+
+        cells = set(self.zone_cells.get(zone, ()))
+        rows, cols = shape
+        out = []
+        for idx in sorted(cells):
+            r0, c0 = divmod(idx, self.n)
+            mask = 0
+            fits = True
+            for dr in range(rows):
+                for dc in range(cols):
+                    rr, cc = r0 + dr, c0 + dc
+                    cell = rr * self.n + cc
+                    if rr >= self.n or cc >= self.n or cell not in cells:
+                        fits = False
+                        break
+                    mask |= 1 << cell
+                if not fits:
+                    break
+            if fits:
+                out.append((mask, (r0, c0, rows, cols)))
+        # Racing threads compute the same list; setdefault keeps just one
+        return self._placements.setdefault(key, out)
+
+    def block_cells(self, block):
+        r0, c0, rows, cols = block
+        return [(r0 + dr) * self.n + (c0 + dc) for dr in range(rows) for dc in range(cols)]
+
+    def block_center(self, block):
+        r0, c0, rows, cols = block
+        return r0 + rows / 2, c0 + cols / 2
+
+    def block_distance(self, a, b):
+        (ra, ca), (rb, cb) = self.block_center(a), self.block_center(b)
+        return abs(ra - rb) + abs(ca - cb)
+
+    def blocks_adjacent(self, a, b):
+        cells_b = set(self.block_cells(b))
+        return any(nb in cells_b for cell in self.block_cells(a) for nb in self.neighbors[cell])
+
+
+# Built at import, so concurrent requests never race to create them
+_GRIDS = {name: PlacementGrid(int(name.split("x")[0])) for name in ("3x3", "8x8", "9x9")}
+
+
+def get_grid(name):
+    """'3x3', '8x8' or '9x9' -> shared PlacementGrid (None for unknown names)."""
+    if not name:
+        return None
+    name = name.lower().replace(" ", "")
+    if name in ("81", "81-pada", "paramasayika"):
+        name = "9x9"
+    elif name in ("64", "64-pada", "manduka"):
+        name = "8x8"
+    return _GRIDS.get(name)
+
@@ -0,0 +1,165 @@
+import contextvars
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+
+from app.metrics import registry, SIZE_BUCKETS
+
+logger = logging.getLogger("vastu.memory")
+
+# Stage deltas can be negative (a stage frees more than it allocates) or far
+# above a response body, so these buckets are wider than SIZE_BUCKETS
+DELTA_BUCKETS = (-16777216, -1048576, 0) + SIZE_BUCKETS + (268435456,)
+
+STAGE_RSS_DELTA = registry.histogram(
+    "vastu_stage_rss_delta_bytes", "Process RSS change across each pipeline stage (memory tracking on).", DELTA_BUCKETS
+)
+STAGE_ALLOC_PEAK = registry.histogram(
+    "vastu_stage_alloc_peak_bytes", "Peak Python allocations above the stage's starting point (tracemalloc mode).", DELTA_BUCKETS
+)
+BUDGET_DEGRADED = registry.counter("vastu_memory_budget_degraded_total", "Options rendered at reduced size to fit the request memory budget.")
+BUDGET_REFUSED = registry.counter("vastu_memory_budget_refused_total", "Requests refused by the memory budget or RSS ceiling, by reason.")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Current resident set size. Falls back to the peak RSS where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Per-request list of (stage, rss_delta, alloc_peak) while tracking is on
+_request_memory = contextvars.ContextVar("vastu_request_memory", default=None)
+
+
+def begin_request():
+    samples = []
+    _request_memory.set(samples)
+    return samples
+
+
+class MemoryTracker:
+    """
+    Stage hook (metrics.set_stage_hook) recording memory per pipeline stage.
+
+    mode "rss":         RSS before/after each stage; cheap, process-wide.
+    mode "tracemalloc": also the peak of traced Python allocations inside the
+                        stage (PNG/PDF bytes, BytesIO, base64 strings). PIL
+                        pixel buffers are C allocations and only show up in
+                        the RSS delta. Slows allocation-heavy code
+                        noticeably; use on debug or canary workers.
+
+    Numbers are process-wide, so concurrent requests and nested stages
+    blur them; run with one worker thread for exact attribution.
+    """
+
+    def __init__(self, mode="rss", frames=1):
+        self.mode = mode
+        if mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @property
+    def tracing(self):
+        return self.mode == "tracemalloc" and tracemalloc.is_tracing()
+
+    def enter(self):
+        start_alloc = 0
+        if self.tracing:
+            start_alloc = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return rss_bytes(), start_alloc
+
+    def exit(self, name, token):
+        start_rss, start_alloc = token
+        rss_delta = rss_bytes() - start_rss
+        STAGE_RSS_DELTA.observe(rss_delta, stage=name)
+        alloc_peak = None
+        if self.tracing:
+            alloc_peak = max(0, tracemalloc.get_traced_memory()[1] - start_alloc)
+            STAGE_ALLOC_PEAK.observe(alloc_peak, stage=name)
+        samples = _request_memory.get()
+        if samples is not None:
+            samples.append((name, rss_delta, alloc_peak))
+
+    def top(self, limit=25):
+        """Largest live allocation sites (tracemalloc mode), for GET /debug/memory."""
+        if not self.tracing:
+            return []
+        stats = tracemalloc.take_snapshot().statistics("lineno")
+        return [{"site": str(s.traceback[0]), "bytes": s.size, "blocks": s.count} for s in stats[:limit]]
+
+
+def log_request(path, samples):
+    # One line per request: stage rss deltas (and alloc peaks) in KiB
+    if not samples:
+        return
+    parts = []
+    for name, rss_delta, alloc_peak in samples:
+        part = f"{name}:rss={rss_delta // 1024:+d}K"
+        if alloc_peak is not None:
+            part += f",peak={alloc_peak // 1024}K"
+        parts.append(part)
+    logger.info("memory %s rss=%dM %s", path, rss_bytes() // (1024 * 1024), " ".join(parts))
+
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MemoryBudget:
+    """
+    Per-request byte budget for the big intermediates of /generate-design.
+
+    Outputs kept until the response is sent (base64 strings, PNG/PDF
+    buffers still needed by a later stage) are charged while alive; a canvas
+    is checked with fits() before it is allocated, so the pipeline can pick
+    a smaller render instead. limit 0 means unlimited (only accounting).
+    Stages of one request charge it from several threads.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.live = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def fits(self, nbytes):
+        return not self.limit or self.live + nbytes <= self.limit
+
+    def charge(self, nbytes):
+        with self._lock:
+            self.live += nbytes
+            self.peak = max(self.peak, self.live)
+
+    def release(self, nbytes):
+        with self._lock:
+            self.live = max(0, self.live - nbytes)
+
+
+def check_rss(max_rss, on_pressure=None):
+    """
+    Raises MemoryBudgetExceeded when the worker is above max_rss bytes, after
+    giving on_pressure() (drop caches) and a gc pass a chance to get it back
+    under. Called before heavy work so a busy worker refuses instead of
+    being OOM-killed mid-request.
+    """
+    if not max_rss or rss_bytes() <= max_rss:
+        return
+    if on_pressure is not None:
+        on_pressure()
+    gc.collect()
+    if rss_bytes() > max_rss:
+        BUDGET_REFUSED.inc(reason="rss")
+        raise MemoryBudgetExceeded("Worker memory is above its limit; retry shortly", retry_after=5)
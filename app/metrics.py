@@ -0,0 +1,210 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Seconds; covers sub-ms rule lookups up to multi-second LLM/PDF stages
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes; JSON bodies range from a few KB (artifact mode) to several MB (base64)
+SIZE_BUCKETS = (1024, 10240, 102400, 524288, 1048576, 4194304, 16777216, 67108864)
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    def __init__(self, name, help_text, kind):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "counter")
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, v) for key, v in self._values.items()]
+
+
+class Gauge(Counter):
+    def __init__(self, name, help_text):
+        _Metric.__init__(self, name, help_text, "gauge")
+        self._values = {}
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, "histogram")
+        self.buckets = tuple(buckets)
+        self._series = {} # labels -> [bucket_counts, sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                for bound, c in zip(self.buckets, counts):
+                    out.append((self.name + "_bucket", key + (("le", _fmt_value(float(bound))),), c))
+                out.append((self.name + "_bucket", key + (("le", "+Inf"),), count))
+                out.append((self.name + "_sum", key, total))
+                out.append((self.name + "_count", key, count))
+        return out
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process Prometheus registry. Metrics are scraped from
+    GET /metrics, so no external collector or client library is needed.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, fn):
+        """
+        fn() -> [(name, kind, help, [(labels_dict, value), ...]), ...]
+        Evaluated at scrape time, for state that already lives elsewhere (cache stats).
+        """
+        self._collectors.append(fn)
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, value in m.samples():
+                lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+        for fn in self._collectors:
+            for name, kind, help_text, samples in fn():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_fmt_labels(tuple(sorted(labels.items())))} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("vastu_stage_seconds", "Time spent in each design pipeline stage.")
+STAGE_TOTAL = registry.counter("vastu_stage_total", "Number of times each pipeline stage ran.")
+REQUEST_SECONDS = registry.histogram("vastu_request_seconds", "End-to-end HTTP request latency.")
+RESPONSE_BYTES = registry.histogram("vastu_response_bytes", "HTTP response body size.", SIZE_BUCKETS)
+OPTIMIZER_ATTEMPTS = registry.counter("vastu_optimizer_attempts_total", "Placement attempts made by LayoutOptimizer.")
+OPTIMIZER_FALLBACKS = registry.counter("vastu_optimizer_fallback_placements_total", "Rooms placed via the fallback zone list.")
+OPTIMIZER_FLEXIBLE = registry.counter("vastu_optimizer_flexible_placements_total", "Rooms that could not be placed in any zone.")
+OPTIMIZER_TABLE = registry.counter("vastu_optimizer_table_lookups_total", "Precomputed layout table lookups, by result (hit/miss).")
+
+
+# Per-request list of (stage, seconds) for the Server-Timing header.
+# The middleware installs a fresh list; worker threads append to the same object.
+_request_timings = contextvars.ContextVar("vastu_request_timings", default=None)
+# perf_counter() when the request arrived, before any admission queueing
+_request_start = contextvars.ContextVar("vastu_request_start", default=None)
+
+
+def begin_request():
+    timings = []
+    _request_timings.set(timings)
+    _request_start.set(time.perf_counter())
+    return timings
+
+
+def request_start():
+    return _request_start.get()
+
+
+# Optional per-stage hook with enter() -> token and exit(name, token),
+# e.g. app.memory.MemoryTracker. None keeps stage() to two clock reads.
+_stage_hook = None
+
+
+def set_stage_hook(hook):
+    global _stage_hook
+    _stage_hook = hook
+
+
+@contextmanager
+def stage(name):
+    hook = _stage_hook
+    token = hook.enter() if hook is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        STAGE_TOTAL.inc(stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+        if hook is not None:
+            hook.exit(name, token)
+
+
+def server_timing_header(timings):
+    # Repeated stages (3 options x render) are summed into one entry
+    totals = {}
+    for name, elapsed in timings:
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, total + elapsed)
+    parts = []
+    for name, (count, total) in totals.items():
+        parts.append(f'{name};dur={total * 1000:.1f};desc="x{count}"')
+    return ", ".join(parts)
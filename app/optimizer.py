@@ -1,3 +1,31 @@
+import os
+import random
+import threading
+
+from app.metrics import OPTIMIZER_ATTEMPTS, OPTIMIZER_FALLBACKS, OPTIMIZER_FLEXIBLE, OPTIMIZER_TABLE
+from app.layout import Layout
+from app.mandala import block_for_room
+
+_local = threading.local()
+
+
+def thread_rng():
+    """This thread's random.Random, for unseeded searches (the module RNG is shared by every thread)."""
+    rng = getattr(_local, "rng", None)
+    if rng is None:
+        rng = _local.rng = random.Random()
+    return rng
+
+
+def _reset_thread_rngs():
+    # A forked worker must not replay its parent's sequence
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_thread_rngs)
+
 class LayoutOptimizer:
     ROOM_PRIORITY = [
         "pooja_room",
@@ -23,19 +51,37 @@ class LayoutOptimizer:
         "living_room": ["center", "dining_area"]
     }
 
+    def __init__(self, table=None):
+        # Optional LayoutTable of precomputed floors, consulted before searching
+        self.table = table
+
+    def _lookup(self, room_zones, grid, count, initial):
+        # Only single fresh layouts are tabled; variant sets and warm starts search
+        if self.table is None or count != 1 or initial is not None:
+            return None
+        hit = self.table.lookup(room_zones, grid)
+        OPTIMIZER_TABLE.inc(result="hit" if hit is not None else "miss")
+        return [hit] if hit is not None else None
+
     def _get_dist(self, z1, z2):
         if z1 not in self.ZONE_COORDS or z2 not in self.ZONE_COORDS: return 99
         r1, c1 = self.ZONE_COORDS[z1]
         r2, c2 = self.ZONE_COORDS[z2]
         return abs(r1-r2) + abs(c1-c2)
 
-    def optimize(self, room_zones):
+    def optimize(self, room_zones, rng=None):
         # Wrapper for backward compatibility if needed, returns best single layout
-        variants = self.generate_variants(room_zones, count=1)
+        variants = self.generate_variants(room_zones, count=1, rng=rng)
         return variants[0][0], variants[0][1]
 
-    def generate_variants(self, room_zones, count=3):
-        import random
+    def generate_variants(self, room_zones, count=3, rng=None, initial=None):
+        # rng: a random.Random for seeded (reproducible) runs; defaults to a per-thread RNG
+        # initial: previous layout to warm-start from; rooms keep their old zone while it is still allowed
+        tabled = self._lookup(room_zones, None, count, initial)
+        if tabled is not None:
+            return tabled
+
+        rng = rng or thread_rng()
         
         candidates = []
         seen_hashes = set()
@@ -64,7 +110,7 @@ class LayoutOptimizer:
                 # Shuffle the middle/lower priority items to induce variation
                 mid_idx = 3
                 sub_list = current_priority[mid_idx:]
-                random.shuffle(sub_list)
+                rng.shuffle(sub_list)
                 current_priority = current_priority[:mid_idx] + sub_list
             
             sorted_rooms = sorted(
@@ -98,8 +144,13 @@ class LayoutOptimizer:
                     # valid_zones is usually [Preferred..., Allowed...]
                     # Let's shuffle the whole list slightly but bias towards front?
                     # Simple shuffle for exploration
-                    if random.random() < 0.3: # 30% chance to shuffle preferences
-                         random.shuffle(possible_zones)
+                    if rng.random() < 0.3: # 30% chance to shuffle preferences
+                         rng.shuffle(possible_zones)
+
+                warm_zone = initial.get(room) if initial else None
+                if warm_zone in possible_zones:
+                    possible_zones.remove(warm_zone)
+                    possible_zones.insert(0, warm_zone)
 
                 placed = False
                 for zone in possible_zones:
@@ -121,26 +172,162 @@ class LayoutOptimizer:
                             zone_capacity[zone] = zone_capacity.get(zone, 0) + 1
                             placed = True
                             notes.append(f"{room} placed in {zone} (Fallback)")
+                            OPTIMIZER_FALLBACKS.inc()
                             break
                             
                 if not placed:
                     assigned[room] = "Flexible"
+                    OPTIMIZER_FLEXIBLE.inc()
                     # Ideally mark as invalid if critical room missing
                     # But we'll just accept it with a note
             
-            # Check uniqueness
-            # Hash based on sorted tuples of (room, zone)
-            layout_hash = tuple(sorted(assigned.items()))
-            if layout_hash not in seen_hashes:
-                seen_hashes.add(layout_hash)
-                candidates.append((assigned, notes))
+            # Check uniqueness (Layout hashes on its sorted (room, zone) pairs)
+            layout = Layout(assigned)
+            if layout not in seen_hashes:
+                seen_hashes.add(layout)
+                candidates.append((layout, notes))
         
+        OPTIMIZER_ATTEMPTS.inc(attempts)
+
         # If we failed to get random variants, just return the greedy one duplicated
         if not candidates:
-             candidates.append(self.optimize(room_zones))
+             candidates.append(self.optimize(room_zones, rng=rng))
              
         return candidates
 
+    def generate_grid_variants(self, room_zones, grid, count=1, rng=None, pada_rules=None, initial=None):
+        """
+        Same search as generate_variants, but rooms occupy blocks of padas on a
+        fine PlacementGrid (8x8 / 9x9) instead of sharing 3x3 zones.
+
+        pada_rules: {room: {"preferred": set(cell_idx), "avoid": set(cell_idx)}}
+        initial:    previous Layout on the same grid; rooms keep their old block
+                    when it is still free and in an allowed zone
+
+        Each room only looks at its candidate zones and the precomputed block
+        placements inside them, so cost grows with rooms, not grid cells.
+        """
+        tabled = self._lookup(room_zones, grid, count, initial)
+        if tabled is not None:
+            return tabled
+
+        rng = rng or thread_rng()
+        pada_rules = pada_rules or {}
+        warm_blocks = initial.blocks if initial is not None and initial.grid == grid else {}
+
+        candidates = []
+        seen_hashes = set()
+        attempts = 0
+        max_attempts = 50
+        current_rels = self._setup_dynamic_relationships(room_zones)
+
+        while len(candidates) < count and attempts < max_attempts:
+            attempts += 1
+
+            used = 0 # bitmask of occupied cells
+            assigned = {}
+            blocks = {}
+            notes = []
+
+            current_priority = self.ROOM_PRIORITY.copy()
+            if attempts > 1:
+                mid_idx = 3
+                sub_list = current_priority[mid_idx:]
+                rng.shuffle(sub_list)
+                current_priority = current_priority[:mid_idx] + sub_list
+
+            sorted_rooms = sorted(
+                room_zones.keys(),
+                key=lambda r: current_priority.index(r) if r in current_priority else 99
+            )
+
+            for room in sorted_rooms:
+                possible_zones = list(room_zones[room])
+
+                anchor_zone = None
+                anchor_block = None
+                for related in current_rels.get(room, []):
+                    if related in assigned:
+                        anchor_zone = assigned[related]
+                        anchor_block = blocks.get(related)
+                        break
+
+                if anchor_zone:
+                    possible_zones.sort(key=lambda z: self._get_dist(z, anchor_zone))
+                elif attempts > 1 and rng.random() < 0.3:
+                    rng.shuffle(possible_zones)
+
+                prefs = pada_rules.get(room, {})
+                shape = block_for_room(room)
+                placed = self._warm_block(grid, warm_blocks.get(room), initial, room, possible_zones, used)
+                if placed is None:
+                    placed = self._place_block(grid, possible_zones, shape, used, anchor_block, prefs)
+                if placed is None and shape != (1, 1):
+                    # Crowded zone: accept a smaller room in the preferred zone
+                    placed = self._place_block(grid, possible_zones, (1, 1), used, anchor_block, prefs)
+                    if placed is not None:
+                        notes.append(f"{room} reduced to a single pada in {placed[0]}")
+
+                if placed is None:
+                    fallback_preference = ["NW", "SE", "W", "S", "E", "N", "Center"]
+                    if anchor_zone:
+                        fallback_preference.sort(key=lambda z: self._get_dist(z, anchor_zone))
+                    placed = self._place_block(grid, fallback_preference, (1, 1), used, anchor_block, prefs)
+                    if placed is not None:
+                        notes.append(f"{room} placed in {placed[0]} (Fallback)")
+                        OPTIMIZER_FALLBACKS.inc()
+
+                if placed is None:
+                    assigned[room] = "Flexible"
+                    OPTIMIZER_FLEXIBLE.inc()
+                    continue
+
+                zone, mask, block = placed
+                assigned[room] = zone
+                blocks[room] = block
+                used |= mask
+
+            layout = Layout(assigned, grid, blocks)
+            if layout not in seen_hashes:
+                seen_hashes.add(layout)
+                candidates.append((layout, notes))
+
+        OPTIMIZER_ATTEMPTS.inc(attempts)
+        return candidates
+
+    def _warm_block(self, grid, block, initial, room, zones, used):
+        if block is None or initial.get(room) not in zones:
+            return None
+        mask = 0
+        for cell in grid.block_cells(block):
+            mask |= 1 << cell
+        if mask & used:
+            return None
+        return initial[room], mask, block
+
+    def _place_block(self, grid, zones, shape, used, anchor_block, prefs):
+        preferred = prefs.get("preferred", ())
+        avoid = prefs.get("avoid", ())
+
+        for zone in zones:
+            best = None
+            best_key = None
+            for mask, block in grid.placements(zone, shape):
+                if mask & used:
+                    continue
+                cells = grid.block_cells(block)
+                if avoid and any(c in avoid for c in cells):
+                    continue
+                key = (
+                    -sum(1 for c in cells if c in preferred),
+                    grid.block_distance(block, anchor_block) if anchor_block else 0,
+                )
+                if best_key is None or key < best_key:
+                    best, best_key = (zone, mask, block), key
+            if best is not None:
+                return best
+        return None
+
     def _setup_dynamic_relationships(self, room_zones):
         """
         Dynamically adjusts relationships based on available rooms.
@@ -0,0 +1,223 @@
+import cProfile
+import contextvars
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+# Set while the current request is being profiled. cProfile and the sampler
+# only watch the request thread, so StageExecutor runs stages inline then
+_capturing = contextvars.ContextVar("vastu_profile_capturing", default=False)
+
+
+def capturing():
+    return _capturing.get()
+
+
+class CapturedProfile:
+    __slots__ = ("id", "mode", "label", "created", "duration", "stats", "collapsed")
+
+    def __init__(self, mode, label):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.label = label
+        self.created = time.time()
+        self.duration = 0.0
+        self.stats = None # cProfile raw stats dict (deterministic mode)
+        self.collapsed = None # {"frame;frame;frame": samples} (sampling mode)
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "label": self.label,
+            "created": self.created,
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+    def pstats_text(self, sort="cumulative", limit=80):
+        if self.stats is None:
+            return ""
+        out = io.StringIO()
+        st = pstats.Stats(_StatsHolder(self.stats), stream=out)
+        st.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def prof_bytes(self):
+        # Same format as cProfile's dump_stats, loadable by snakeviz / pstats
+        return marshal.dumps(self.stats) if self.stats is not None else b""
+
+    def collapsed_text(self):
+        if self.collapsed is not None:
+            stacks = self.collapsed
+        elif self.stats is not None:
+            stacks = _collapse_cprofile(self.stats)
+        else:
+            return ""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(stacks.items())) + "\n"
+
+
+class _StatsHolder:
+    # pstats.Stats accepts any object with create_stats()/stats
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _frame_name(filename, lineno, funcname):
+    short = filename.rsplit("/", 1)[-1]
+    return f"{funcname} ({short}:{lineno})"
+
+
+def _collapse_cprofile(stats):
+    """
+    cProfile only records caller->callee edges, so stacks are approximated
+    by following each function's heaviest caller up to a root.
+    """
+    stacks = {}
+    for func, (cc, nc, tt, ct, callers) in stats.items():
+        if tt <= 0:
+            continue
+        chain = [func]
+        seen = {func}
+        current = callers
+        while current:
+            parent = max(current.items(), key=lambda kv: kv[1][3] if isinstance(kv[1], tuple) else kv[1])[0]
+            if parent in seen:
+                break
+            chain.append(parent)
+            seen.add(parent)
+            current = stats.get(parent, (0, 0, 0, 0, {}))[4]
+        key = ";".join(_frame_name(*f) for f in reversed(chain))
+        stacks[key] = stacks.get(key, 0) + int(tt * 1_000_000) # microseconds of self time
+    return stacks
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's stack every `interval` seconds via sys._current_frames()."""
+
+    def __init__(self, target_ident, interval):
+        super().__init__(daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.stacks = {}
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            frame = sys._current_frames().get(self.target_ident)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(_frame_name(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            key = ";".join(reversed(names))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class ProfileStore:
+    def __init__(self, max_profiles=50):
+        self.max_profiles = max_profiles
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._items[profile.id] = profile
+            while len(self._items) > self.max_profiles:
+                self._items.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._items.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [p.summary() for p in reversed(self._items.values())]
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiling.
+
+    mode "off":    capture() is a no-op (no profiler objects, no header parsing).
+    mode "header": requests sending `X-Vastu-Profile: cprofile|sample` from an
+                   allowlisted client IP (or with an allowlisted
+                   X-Vastu-Profile-Token) are profiled.
+    mode "always": every request is profiled with cProfile (debug servers only).
+    """
+
+    def __init__(self, mode="off", allowlist=(), max_profiles=50, sample_interval=0.005):
+        self.mode = mode
+        self.allowlist = set(allowlist)
+        self.sample_interval = sample_interval
+        self.store = ProfileStore(max_profiles)
+
+    @property
+    def enabled(self):
+        return self.mode in ("header", "always")
+
+    def is_allowed(self, request):
+        client = request.client.host if request.client else None
+        token = request.headers.get("x-vastu-profile-token")
+        return client in self.allowlist or (token is not None and token in self.allowlist)
+
+    def _requested_mode(self, request):
+        if self.mode == "always":
+            return "cprofile"
+        wanted = (request.headers.get("x-vastu-profile") or "").strip().lower()
+        if not wanted or not self.is_allowed(request):
+            return None
+        return "sample" if wanted.startswith("sampl") else "cprofile"
+
+    @contextmanager
+    def capture(self, request, response, label):
+        if not self.enabled:
+            yield None
+            return
+
+        mode = self._requested_mode(request)
+        if mode is None:
+            yield None
+            return
+
+        captured = CapturedProfile(mode, label)
+        sampler = prof = None
+        if mode == "sample":
+            sampler = _Sampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+        else:
+            prof = cProfile.Profile()
+            prof.enable()
+
+        token = _capturing.set(True)
+        start = time.perf_counter()
+        try:
+            yield captured
+        finally:
+            _capturing.reset(token)
+            # Failed requests are often the interesting ones, so store those too
+            if prof is not None:
+                prof.disable()
+                prof.create_stats()
+                captured.stats = prof.stats
+            else:
+                sampler.stop()
+                captured.collapsed = sampler.stacks
+            captured.duration = time.perf_counter() - start
+            self.store.add(captured)
+            response.headers["X-Vastu-Profile-Id"] = captured.id
@@ -0,0 +1,280 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    owner TEXT,
+    name TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_owner ON projects (owner, updated_at);
+
+CREATE TABLE IF NOT EXISTS designs (
+    id TEXT PRIMARY KEY,
+    project_id TEXT,
+    owner TEXT,
+    input_hash TEXT NOT NULL,
+    input_json TEXT NOT NULL,
+    best_score REAL,
+    option_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    result BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS designs_project ON designs (project_id, created_at);
+CREATE INDEX IF NOT EXISTS designs_owner ON designs (owner, created_at);
+CREATE INDEX IF NOT EXISTS designs_input ON designs (input_hash, project_id);
+CREATE INDEX IF NOT EXISTS designs_score ON designs (best_score);
+
+CREATE TABLE IF NOT EXISTS design_options (
+    design_id TEXT NOT NULL,
+    option INTEGER NOT NULL,
+    score REAL,
+    layouts TEXT NOT NULL,
+    PRIMARY KEY (design_id, option)
+);
+CREATE INDEX IF NOT EXISTS design_options_score ON design_options (score);
+
+CREATE TABLE IF NOT EXISTS design_artifacts (
+    design_id TEXT NOT NULL,
+    artifact_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    option INTEGER NOT NULL,
+    floor INTEGER,
+    content_type TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS design_artifacts_design ON design_artifacts (design_id);
+CREATE INDEX IF NOT EXISTS design_artifacts_artifact ON design_artifacts (artifact_id);
+
+CREATE TABLE IF NOT EXISTS artifact_blobs (
+    id TEXT PRIMARY KEY,
+    content_type TEXT NOT NULL,
+    filename TEXT,
+    data BLOB NOT NULL
+);
+"""
+
+
+def _pack(result):
+    return zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"), 1)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ProjectStore:
+    """
+    Embedded SQLite history of generated designs: project, canonical input,
+    per-option layouts and scores, artifact refs and the full response.
+
+    Reopening a design (GET /designs/{id}) is a primary-key lookup, never a
+    pipeline run. The database runs in WAL mode so readers don't block the
+    writer, and each thread (FastAPI's sync worker pool) keeps its own
+    connection; several uvicorn workers can share one file, with
+    busy_timeout absorbing short write contention.
+
+    History is bounded: designs older than max_age seconds, and the oldest
+    beyond max_designs, are pruned (0 disables either limit) along with
+    their options, artifact refs and any blobs no design references.
+    """
+
+    # Saves between prune passes; pruning scans the blob table
+    PRUNE_EVERY = 50
+
+    def __init__(self, path, busy_timeout_ms=5000, max_designs=0, max_age=0):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.max_designs = max_designs
+        self.max_age = max_age
+        self._saves = 0
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # Short-lived connection: the store may be built in a pre-fork parent,
+        # and an SQLite handle must never be carried into a forked worker
+        conn = sqlite3.connect(self.path, timeout=busy_timeout_ms / 1000)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        self.prune()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL is durable across app crashes; only an OS crash can lose the last commits
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def save_design(self, user_input, input_hash, result, artifacts=()):
+        """
+        Records one generated design and returns its id.
+        artifacts: Artifact objects from the ArtifactStore, persisted so their
+        ids stay resolvable after the in-memory store evicts them.
+        """
+        project = user_input.project
+        project_id = project.id if project else None
+        owner = project.owner if project else None
+        scores = result.get("scores", [])
+        design_id = secrets.token_hex(12)
+        now = time.time()
+
+        # The connection's context manager commits all rows at once (or rolls back)
+        with self._conn() as conn:
+            if project_id is not None:
+                conn.execute(
+                    "INSERT INTO projects (id, owner, name, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, "
+                    "owner = COALESCE(excluded.owner, projects.owner), name = COALESCE(excluded.name, projects.name)",
+                    (project_id, owner, project.name, now, now)
+                )
+            conn.execute(
+                "INSERT INTO designs (id, project_id, owner, input_hash, input_json, best_score, option_count, created_at, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (design_id, project_id, owner, input_hash, user_input.model_dump_json(),
+                 max(scores) if scores else None, len(result.get("layouts", [])), now, _pack(result))
+            )
+            conn.executemany(
+                "INSERT INTO design_options (design_id, option, score, layouts) VALUES (?, ?, ?, ?)",
+                [(design_id, i + 1, scores[i] if i < len(scores) else None, json.dumps(layouts))
+                 for i, layouts in enumerate(result.get("layouts", []))]
+            )
+            conn.executemany(
+                "INSERT INTO design_artifacts (design_id, artifact_id, kind, option, floor, content_type, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(design_id, a["id"], a["kind"], a["option"], a.get("floor"), a["content_type"], a["size"])
+                 for a in result.get("artifacts", [])]
+            )
+            # Content-addressed, so a re-rendered identical PNG is stored once
+            conn.executemany(
+                "INSERT OR IGNORE INTO artifact_blobs (id, content_type, filename, data) VALUES (?, ?, ?, ?)",
+                [(a.id, a.content_type, a.filename, a.data) for a in artifacts]
+            )
+        with self._lock:
+            self._saves += 1
+            due = self._saves % self.PRUNE_EVERY == 0
+        if due:
+            self.prune()
+        return design_id
+
+    def prune(self):
+        """Applies max_age / max_designs; returns the number of designs removed."""
+        if not self.max_age and not self.max_designs:
+            return 0
+        with self._conn() as conn:
+            doomed = set()
+            if self.max_age:
+                rows = conn.execute("SELECT id FROM designs WHERE created_at < ?", (time.time() - self.max_age,))
+                doomed.update(r["id"] for r in rows)
+            if self.max_designs:
+                rows = conn.execute(
+                    "SELECT id FROM designs ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.max_designs,)
+                )
+                doomed.update(r["id"] for r in rows)
+            if not doomed:
+                return 0
+            ids = [(d,) for d in doomed]
+            conn.executemany("DELETE FROM designs WHERE id = ?", ids)
+            conn.executemany("DELETE FROM design_options WHERE design_id = ?", ids)
+            conn.executemany("DELETE FROM design_artifacts WHERE design_id = ?", ids)
+            # Blobs are content-addressed and may be shared between designs
+            conn.execute("DELETE FROM artifact_blobs WHERE id NOT IN (SELECT artifact_id FROM design_artifacts)")
+            conn.execute(
+                "DELETE FROM projects WHERE id NOT IN (SELECT project_id FROM designs WHERE project_id IS NOT NULL)"
+            )
+        return len(doomed)
+
+    def save_artifact(self, artifact):
+        # Output finished after its design was saved (deferred reports)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO artifact_blobs (id, content_type, filename, data) VALUES (?, ?, ?, ?)",
+                (artifact.id, artifact.content_type, artifact.filename, artifact.data)
+            )
+            conn.execute("UPDATE design_artifacts SET size = ? WHERE artifact_id = ?", (artifact.size, artifact.id))
+
+    def find_design(self, input_hash, project_id=None):
+        """Newest design id for a canonical input within a project (or outside any project)."""
+        row = self._conn().execute(
+            "SELECT id FROM designs WHERE input_hash = ? AND project_id IS ? ORDER BY created_at DESC LIMIT 1",
+            (input_hash, project_id)
+        ).fetchone()
+        return row["id"] if row else None
+
+    def load_design(self, design_id):
+        row = self._conn().execute("SELECT result FROM designs WHERE id = ?", (design_id,)).fetchone()
+        if row is None:
+            return None
+        result = _unpack(row["result"])
+        result["design_id"] = design_id
+        return result
+
+    def list_designs(self, project_id=None, owner=None, input_hash=None, min_score=None, order="recent", limit=50, offset=0):
+        clauses, params = [], []
+        for column, value in (("project_id", project_id), ("owner", owner), ("input_hash", input_hash)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_score is not None:
+            clauses.append("best_score >= ?")
+            params.append(min_score)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order_by = "best_score DESC, created_at DESC" if order == "score" else "created_at DESC"
+
+        rows = self._conn().execute(
+            "SELECT id, project_id, owner, input_hash, best_score, option_count, created_at "
+            f"FROM designs {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def list_projects(self, owner=None, limit=50, offset=0):
+        where, params = ("WHERE p.owner = ?", [owner]) if owner is not None else ("", [])
+        rows = self._conn().execute(
+            "SELECT p.id, p.owner, p.name, p.created_at, p.updated_at, "
+            "(SELECT COUNT(*) FROM designs d WHERE d.project_id = p.id) AS designs, "
+            "(SELECT MAX(best_score) FROM designs d WHERE d.project_id = p.id) AS best_score "
+            f"FROM projects p {where} ORDER BY p.updated_at DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_artifact(self, artifact_id):
+        """(data, content_type, filename) of a persisted artifact, or None."""
+        row = self._conn().execute(
+            "SELECT data, content_type, filename FROM artifact_blobs WHERE id = ?", (artifact_id,)
+        ).fetchone()
+        return (bytes(row["data"]), row["content_type"], row["filename"]) if row else None
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "path": self.path,
+            "projects": conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0],
+            "designs": conn.execute("SELECT COUNT(*) FROM designs").fetchone()[0],
+            "artifacts": conn.execute("SELECT COUNT(*) FROM artifact_blobs").fetchone()[0],
+            "connections": len(self._connections),
+        }
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -15,8 +15,13 @@ class PDFReportGenerator:
         self.styles.add(ParagraphStyle(name='VastuTitle', parent=self.styles['Heading1'], fontSize=24, spaceAfter=20, textColor=colors.darkblue))
         self.styles.add(ParagraphStyle(name='VastuScore', parent=self.styles['Heading2'], fontSize=18, spaceAfter=20, textColor=colors.darkgreen))
         self.styles.add(ParagraphStyle(name='Reasoning', parent=self.styles['BodyText'], fontSize=10, leading=12))
+        # Analysis table cells. One generator serves every stage thread, so the
+        # sheet is built here once and only read by generate_report
+        self.styles.add(ParagraphStyle(name='Cell', parent=self.styles['BodyText'], fontSize=9, leading=11))
+        self.styles.add(ParagraphStyle(name='CellBold', parent=self.styles['Cell'], fontName='Helvetica-Bold'))
 
-    def generate_report(self, variant_num, image_buffer, score, breakdown, notes, plot_details, ai_summary=""):
+    def generate_report(self, variant_num, image_buffer, score, breakdown, notes, plot_details, ai_summary="", dimensions=None):
+        # dimensions: {room: "12.0ft x 13.3ft"} from the shared floor geometry
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
         
@@ -103,10 +108,8 @@ class PDFReportGenerator:
         table_data = [headers]
         
         # Define styles for columns
-        style_cell_normal = self.styles['BodyText']
-        style_cell_normal.fontSize = 9
-        style_cell_normal.leading = 11
-        style_cell_bold = ParagraphStyle('BoldCell', parent=style_cell_normal, fontName='Helvetica-Bold')
+        style_cell_normal = self.styles['Cell']
+        style_cell_bold = self.styles['CellBold']
 
         for room, info in breakdown.items():
             r_name = room.replace("_", " ").title()
@@ -120,6 +123,9 @@ class PDFReportGenerator:
             full_text = f"<b>Reasoning:</b> {reason}<br/><b>Benefit:</b> {benefit}"
             
             # Use Paragraphs to ensure wrapping
+            dims = (dimensions or {}).get(room)
+            if dims:
+                r_name += f"<br/><font size=7>{dims}</font>"
             p_room = Paragraph(r_name, style_cell_bold)
             p_zone = Paragraph(z_zone, style_cell_normal)
             p_status = Paragraph(status, style_cell_normal)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+UNIT_ALIASES = {
+    "ft": "ft", "feet": "ft", "foot": "ft", "'": "ft",
+    "m": "m", "meter": "m", "meters": "m", "metre": "m", "metres": "m", "mtr": "m",
+}
+
+
+def canonical_unit(unit):
+    u = (unit or "").strip().lower()
+    return UNIT_ALIASES.get(u, u)
+
+
+FACING_ALIASES = {"n": "north", "e": "east", "s": "south", "w": "west"}
+
+
+def canonical_facing(facing):
+    # "North", " N ", "north-facing" -> "north"
+    f = (facing or "").strip().lower()
+    for suffix in ("-facing", " facing"):
+        if f.endswith(suffix):
+            f = f[:-len(suffix)].strip()
+    return FACING_ALIASES.get(f, f)
+
+
+def canonicalize_input(user_input):
+    """
+    Returns a copy of the input with equivalent spellings collapsed
+    ("Feet" -> "ft", "N" -> "north") so the pipeline output is identical for
+    every request that maps to the same cache key.
+    """
+    plot = user_input.plot.model_copy(update={
+        "unit": canonical_unit(user_input.plot.unit),
+        "facing": canonical_facing(user_input.plot.facing),
+    })
+    return user_input.model_copy(update={"plot": plot})
+
+
+def effective_vastu_level(level):
+    # Mirrors VastuRuleEngine.get_zone_for_room: anything but high/medium is "low"
+    return level if level in ("high", "medium") else "low"
+
+
+def canonical_key(namespace, user_input, rules_version, facing=True):
+    """
+    Stable hash of a UserInput: defaults filled in, keys sorted, numbers
+    normalized, and only the vastu level the rule engine actually acts on.
+
+    facing=False drops plot.facing, for results that don't depend on it.
+    Vastu zones are absolute compass directions, so placement and scores are
+    the same for every facing; only the drawing (main door, compass) changes.
+    """
+    data = canonicalize_input(user_input).model_dump(mode="json")
+
+    # None and an all-default section behave the same downstream
+    for section, default in (("entrance", {"main_entrance_preference": [], "separate_service_entry": False}),
+                             ("room_sizes", {"master_bedroom": "medium", "kitchen": "medium", "living_room": "medium"}),
+                             ("lifestyle", {"layout_style": "modern", "open_kitchen": True, "natural_light_priority": "medium"})):
+        if data.get(section) is None:
+            data[section] = default
+
+    # Filing metadata, not a design input
+    data.pop("project", None)
+    # A deadline only changes degraded responses, and those aren't cached
+    data["output"].pop("deadline_ms", None)
+    data["vastu_level"] = effective_vastu_level(data.get("vastu_level"))
+    data["plot"]["length"] = float(data["plot"]["length"])
+    data["plot"]["width"] = float(data["plot"]["width"])
+    if not facing:
+        data["plot"].pop("facing", None)
+
+    blob = json.dumps(
+        {"ns": namespace, "rules": rules_version, "input": data},
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def cacheable(user_input):
+    # Unseeded requests ask for fresh random variants; caching them would hand
+    # every caller the same layout for the whole TTL
+    return user_input.seed is not None
+
+
+def approx_size(obj):
+    """Cheap byte estimate of a JSON-like response (dominated by base64 strings)."""
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(len(str(k)) + approx_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sum(approx_size(v) for v in obj)
+    return 8
+
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache for endpoint responses, bounded by both
+    entry count and approximate byte size.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=128 * 1024 * 1024, ttl=3600, enabled=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+
+        self._items = OrderedDict() # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._items[key]
+                self.total_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+            self._items[key] = (time.monotonic() + self.ttl, size, value)
+            self.total_bytes += size
+
+            while self._items and (len(self._items) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, (_, old_size, _) = self._items.popitem(last=False)
+                self.total_bytes -= old_size
+                self.evictions += 1
+
+    def invalidate(self, key):
+        # Used when a cached entry turns out to be unusable (e.g. its artifacts expired)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._items),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
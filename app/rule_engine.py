@@ -1,25 +1,53 @@
+import hashlib
 import json
 import os
+from types import MappingProxyType
+
+
+def _freeze(value):
+    # Read-only view of parsed JSON: one engine is shared by every request thread
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
 
 class VastuRuleEngine:
     def __init__(self, rule_file="app/vastu_rules.json"):
         BASE_DIR = os.path.dirname(__file__)
-        with open(os.path.join(BASE_DIR, "vastu_rules.json"), "r") as f:
-            self.rules = json.load(f)["rules"]
+        with open(os.path.join(BASE_DIR, "vastu_rules.json"), "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+        self.rules = _freeze(data["rules"])
+        # Optional per-pada rules for fine grids: {"9x9": {"room" or "*": {"preferred": [...], "avoid": [...]}}}
+        self.pada_rules = _freeze(data.get("padas", {}))
+        # Content hash of the rule file; part of every cache key so edits invalidate results
+        self.version = hashlib.sha256(raw).hexdigest()[:12]
 
     def get_zone_for_room(self, room_name, vastu_level):
+        # Always a new list: callers shuffle and edit it
         rule = self.rules.get(room_name, {})
 
         if vastu_level == "high":
-            return rule.get("preferred", [])
+            return list(rule.get("preferred", ()))
 
         if vastu_level == "medium":
-            return rule.get("preferred", []) + rule.get("allowed", [])
+            return list(rule.get("preferred", ())) + list(rule.get("allowed", ()))
 
         # Low compliance
         return [z for z in ["N","NE","E","SE","S","SW","W","NW", "Center"]
-                if z not in rule.get("avoid", [])]
+                if z not in rule.get("avoid", ())]
     
+    def get_pada_rules(self, grid_name, rule_name):
+        """Pada-level preferences for one room type; "*" entries apply to every room."""
+        by_grid = self.pada_rules.get(grid_name, {})
+        merged = {"preferred": [], "avoid": []}
+        for key in ("*", rule_name):
+            for kind in ("preferred", "avoid"):
+                merged[kind].extend(by_grid.get(key, {}).get(kind, ()))
+        return merged
+
     def get_all_rules(self):
         return self.rules
 
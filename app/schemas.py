@@ -1,6 +1,10 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, List
 
+from app.config import settings
+from app.floor_allocator import parse_floor_count
+from app.mandala import get_grid
+
 class PlotDetails(BaseModel):
     length: float
     width: float
@@ -12,6 +16,15 @@ class BuildingConfig(BaseModel):
     floors: str
     building_type: str
     built_up_area: Optional[float] = None
+    units_per_floor: Optional[int] = 1
+
+    @field_validator("floors")
+    @classmethod
+    def _limit_floors(cls, floors):
+        # Every floor is allocated and optimized, so "G+100000" is refused up front
+        if parse_floor_count(floors) > settings.max_floors:
+            raise ValueError(f"At most {settings.max_floors} floors")
+        return floors
 
 class RoomRequirements(BaseModel):
     bedrooms: int
@@ -45,9 +58,19 @@ class LifestylePreferences(BaseModel):
     natural_light_priority: str = "medium"
 
 class OutputPreferences(BaseModel):
-    number_of_plans: int = 3
+    number_of_plans: int = Field(3, ge=1, le=settings.max_plans)
     output_format: str = "2D"
     export_format: List[str] = ["PDF"]
+    delivery: Optional[str] = None # "base64" (inline JSON) or "artifacts" (GET /artifacts/{id})
+    comparison: Optional[bool] = False # Also return one side-by-side sheet of all options
+    thumbnail_px: Optional[int] = Field(None, ge=32, le=1024) # Also return per-floor thumbnails of this size
+    # Respond within this many ms (from arrival), trading quality for time; see degradations
+    deadline_ms: Optional[int] = None
+
+class ProjectRef(BaseModel):
+    id: str # Caller-chosen project id; designs are listed per project
+    owner: Optional[str] = None # User id, for GET /projects?owner=
+    name: Optional[str] = None
 
 class UserInput(BaseModel):
     plot: PlotDetails
@@ -61,6 +84,17 @@ class UserInput(BaseModel):
     # Legacy support
     design: Optional[DesignPreferences] = None
     vastu_level: Optional[str] = None
+    seed: Optional[int] = None # Fixes optimizer randomness for reproducible (cacheable) variants
+    grid: Optional[str] = None # Placement grid: "3x3" (default), "8x8" or "9x9" (81-pada)
+    project: Optional[ProjectRef] = None # Where the design is filed in the history; doesn't affect output
+
+    @field_validator("grid")
+    @classmethod
+    def _known_grid(cls, grid):
+        # get_grid() returns None for unknown names, which would quietly mean 3x3
+        if grid is not None and get_grid(grid) is None:
+            raise ValueError('grid must be "3x3", "8x8" or "9x9" (or 64/81-pada)')
+        return grid
 
 class PromptOutput(BaseModel):
     optimized_prompt: str
@@ -68,8 +102,79 @@ class PromptOutput(BaseModel):
     vastu_breakdown: dict
     vastu_notes: Optional[list] = []
 
+class ArtifactRef(BaseModel):
+    id: str
+    kind: str # "image", "report", "comparison" or "thumbnail"
+    option: int # 0 for the comparison sheet
+    floor: Optional[int] = None # Thumbnails only (first floor of a typical-floor run)
+    content_type: str
+    size: int
+    url: str
+    pending: bool = False # Deferred under deadline_ms: GET answers 202 until it is built
+
 class DesignOutput(BaseModel):
     image_base64: Optional[str] = "" # Deprecated, kept for backward compat
     images: list[str] = [] # List of base64 images
     reports: list[str] = [] # List of base64 PDFs
+    artifacts: list[ArtifactRef] = [] # Populated instead of images/reports in artifact delivery mode
+    scores: list[float] = [] # Vastu score per option
+    layouts: list[dict] = [] # Per option: {floor_index: {room: zone}}
+    padas: list[dict] = [] # Fine-grid mode only, per option: {floor_index: {room: [cell ids]}}
+    copied_floors: list[list[int]] = [] # Under deadline_ms only, per option: floors copied from option 1, not separately optimized
+    geometry: list[dict] = [] # Per option: {floor_index: {room: {x, y, width, length, area, door}}} in plot units
+    comparison_image: Optional[str] = "" # Side-by-side sheet of all options (base64 delivery)
+    thumbnails: list[dict] = [] # Per option: {floor_index: base64 PNG} (base64 delivery)
     prompt: str
+    design_id: Optional[str] = None # Reopen with GET /designs/{design_id}
+    degradations: list[str] = [] # Quality reduced to fit server limits (memory budget, deadline_ms), one line each
+
+class SessionOutput(DesignOutput):
+    session_id: str
+    revision: int # 1 for the first submission, +1 per edit
+    changes: list[str] = [] # Dotted UserInput fields that differ from the previous revision
+    reoptimized_floors: list[list[int]] = [] # Per option: floors re-optimized (others reused as is)
+    rerendered_floors: list[list[int]] = [] # Per option: floors rasterized (others pasted from tiles)
+
+class DesignSummary(BaseModel):
+    id: str
+    project_id: Optional[str] = None
+    owner: Optional[str] = None
+    input_hash: str
+    best_score: Optional[float] = None
+    option_count: int
+    created_at: float
+
+class ProjectSummary(BaseModel):
+    id: str
+    owner: Optional[str] = None
+    name: Optional[str] = None
+    created_at: float
+    updated_at: float
+    designs: int
+    best_score: Optional[float] = None
+
+class SweepInput(BaseModel):
+    design: UserInput # Room program, building and preferences shared by every variant
+    plots: List[PlotDetails] # Plot sizes / facings to evaluate
+
+    @field_validator("plots")
+    @classmethod
+    def _limit_plots(cls, plots):
+        # One sweep holds one admission slot for every variant it renders
+        if len(plots) > settings.max_sweep_plots:
+            raise ValueError(f"At most {settings.max_sweep_plots} plots per sweep")
+        return plots
+
+class SweepRow(BaseModel):
+    rank: int
+    variant: int
+    plot: PlotDetails
+    area_sqft: float
+    best_option: int
+    best_score: float
+    option_scores: list[float] = []
+    artifacts: list[ArtifactRef] = []
+
+class SweepOutput(BaseModel):
+    plans_computed: int # Distinct allocation + optimization runs shared across variants
+    table: list[SweepRow]
@@ -0,0 +1,250 @@
+"""
+Pre-fork launcher: loads everything heavy once, then forks the workers.
+
+    python -m app.server --workers 4 --port $PORT
+
+The parent imports app.main (rules, mapped layout table, caches), builds the
+visualizer, report generator and text model, loads fonts, then freezes the
+heap and forks. Workers share those pages copy-on-write, so each extra
+worker only costs its request working set instead of another torch import
+and model load.
+
+Signals to the parent:
+    SIGTERM / SIGINT  stop workers gracefully, then exit
+    SIGHUP            reload: re-exec the launcher on the same socket, load
+                      the new code/rules/model, start new workers, then stop
+                      the old ones (no refused connections)
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from app.config import settings
+
+logger = logging.getLogger("vastu.server")
+
+# Passed across the SIGHUP re-exec
+LISTEN_FD_ENV = "VASTU_LISTEN_FD"
+OLD_WORKERS_ENV = "VASTU_OLD_WORKERS"
+
+# Thread pools that size themselves from these at import time
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def limit_threads(torch_threads):
+    # Must run before torch/numpy are imported. Explicit env settings win
+    for name in BLAS_THREAD_VARS:
+        os.environ.setdefault(name, str(torch_threads))
+    # The tokenizers pool is not fork-safe; it warns and deadlocks otherwise
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def _set_torch_threads(torch_threads):
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
+
+
+def preload():
+    """Imports the app and builds every lazy service in this (parent) process."""
+    from app.main import app
+    from app.services import services
+
+    start = time.perf_counter()
+    services.preload("visualizer", "report_gen", "text_gen")
+    services.get("visualizer").preload_fonts()
+
+    # Anything allocated so far lives until exit; freezing keeps the
+    # collector from touching (and so un-sharing) those pages in workers
+    gc.collect()
+    gc.freeze()
+    logger.info("preloaded in %.1fs", time.perf_counter() - start)
+    return app
+
+
+def listen_socket(host, port, backlog=2048):
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        # Re-exec after SIGHUP: keep serving from the socket the old parent bound
+        sock = socket.socket(fileno=int(fd))
+    else:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock, args):
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+    # Reload is the parent's job; a terminal hangup must not kill workers
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    _set_torch_threads(args.torch_threads)
+
+    config = uvicorn.Config(
+        app, log_level=args.log_level, timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True, forwarded_allow_ips="*"
+    )
+    server = uvicorn.Server(config)
+
+    async def serve():
+        import anyio.to_thread
+        # Sync endpoints run in this pool; its size bounds per-worker memory
+        anyio.to_thread.current_default_thread_limiter().total_tokens = args.request_threads
+        await server.serve(sockets=[sock])
+
+    asyncio.run(serve())
+
+
+class Arbiter:
+    """Parent process: keeps `workers` children alive and handles signals."""
+
+    def __init__(self, app, sock, args, argv):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.argv = argv
+        self.workers = set()
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, self.args)
+            except BaseException:
+                logger.exception("worker failed")
+                code = 1
+            os._exit(code)
+        self.workers.add(pid)
+        return pid
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self.reloading = True
+
+    def reap(self):
+        """Collects exited children; returns the worker pids among them."""
+        exited = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if pid in self.workers:
+                self.workers.discard(pid)
+                exited.append(pid)
+                if not self.stopping:
+                    logger.warning("worker %d exited (status %d)", pid, status)
+        return exited
+
+    def terminate(self, pids, timeout):
+        # SIGTERM lets uvicorn finish in-flight requests; SIGKILL after timeout
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pids.discard(pid)
+        deadline = time.monotonic() + timeout
+        while pids and time.monotonic() < deadline:
+            for pid in list(pids):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                        pids.discard(pid)
+                except ChildProcessError:
+                    pids.discard(pid)
+            time.sleep(0.1)
+        for pid in list(pids):
+            logger.warning("worker %d did not stop in %ss, killing", pid, timeout)
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            pids.discard(pid)
+
+    def reload(self):
+        # exec keeps our pid, so the old workers stay our children and the new
+        # launcher can stop them once its own workers are up
+        logger.info("reloading: re-executing launcher")
+        env = dict(os.environ)
+        env[LISTEN_FD_ENV] = str(self.sock.fileno())
+        env[OLD_WORKERS_ENV] = ",".join(str(p) for p in self.workers)
+        os.execve(sys.executable, [sys.executable, "-m", "app.server"] + self.argv, env)
+
+    def run(self, old_workers=()):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        logger.info("serving on %s with %d workers %s", self.sock.getsockname(), len(self.workers), sorted(self.workers))
+        if old_workers:
+            self.terminate(set(old_workers), self.args.graceful_timeout)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+            for _ in self.reap():
+                # Brief pause so a worker that crashes on start can't spin the CPU
+                time.sleep(1)
+                if not self.stopping and not self.reloading:
+                    self.spawn()
+            time.sleep(0.5)
+
+        logger.info("stopping %d workers", len(self.workers))
+        self.terminate(set(self.workers), self.args.graceful_timeout)
+        self.workers.clear()
+        self.sock.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(description="Pre-fork server: preload models once, share them across workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--torch-threads", type=int, default=settings.torch_threads,
+                        help="torch intra-op and BLAS threads per worker")
+    parser.add_argument("--request-threads", type=int, default=settings.request_threads,
+                        help="threads per worker running sync endpoints")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.graceful_timeout,
+                        help="seconds a stopping worker gets to finish requests")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(message)s")
+    limit_threads(args.torch_threads)
+    # A second SIGHUP while this process is still preloading is dropped
+    # rather than killing it (the default action)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    old_workers = [int(p) for p in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if p]
+    sock = listen_socket(args.host, args.port)
+    app = preload()
+    _set_torch_threads(args.torch_threads)
+
+    Arbiter(app, sock, args, argv).run(old_workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class ServiceLocator:
+    """
+    Lazily constructs heavy subsystems (text model, PDF engine, rasterizer)
+    the first time they are needed, so importing app.main stays cheap.
+
+    Factories do their own imports, e.g. `from app.report_generator import
+    PDFReportGenerator` inside the factory body, so reportlab/torch/PIL are
+    only imported when a request actually needs them.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._load_seconds = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            # Another thread may have finished construction while we waited
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._load_seconds[name] = time.perf_counter() - start
+                self._instances[name] = instance
+            return instance
+
+    def preload(self, *names):
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def status(self):
+        return {
+            name: {"loaded": name in self._instances, "load_seconds": round(self._load_seconds.get(name, 0.0), 3)}
+            for name in self._factories
+        }
+
+
+def _make_visualizer():
+    from app.visualizer import Visualizer
+    return Visualizer()
+
+
+def _make_report_generator():
+    from app.report_generator import PDFReportGenerator
+    return PDFReportGenerator()
+
+
+def _make_text_generator():
+    from app.config import settings
+    if settings.text_model == "stub":
+        from app.text_generator import StubTextGenerator
+        return StubTextGenerator()
+    from app.text_generator import TextGenerator
+    return TextGenerator(settings.text_model, slots=settings.text_model_slots)
+
+
+services = ServiceLocator()
+services.register("visualizer", _make_visualizer)
+services.register("report_gen", _make_report_generator)
+services.register("text_gen", _make_text_generator)
@@ -0,0 +1,90 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+
+def _flatten(data, prefix=""):
+    out = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, path + "."))
+        else:
+            out[path] = value
+    return out
+
+
+def diff_inputs(old, new):
+    """Dotted field paths that differ between two UserInputs, e.g. ["plot.facing", "rooms.bedrooms"]."""
+    a = _flatten(old.model_dump(mode="json"))
+    b = _flatten(new.model_dump(mode="json"))
+    return sorted(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+
+
+class DesignSession:
+    """
+    Server-side state of one design form: the last input and its planned
+    options. Rendered tiles live in the pipeline's shared TileCache, keyed by
+    layout content, so unchanged floors are pasted rather than redrawn.
+    """
+
+    def __init__(self, session_id, ttl):
+        self.id = session_id
+        self.ttl = ttl
+        self.user_input = None
+        self.options = []
+        self.revision = 0
+        self.expires_at = time.time() + ttl
+        # One edit at a time per session; different sessions run in parallel
+        self.lock = threading.Lock()
+
+    def touch(self):
+        self.expires_at = time.time() + self.ttl
+
+
+class SessionStore:
+    """Thread-safe LRU of DesignSessions with idle TTL eviction."""
+
+    def __init__(self, ttl=1800, max_sessions=256):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def create(self):
+        session = DesignSession(secrets.token_urlsafe(16), self.ttl)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.touch()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        # Sessions are touched in LRU order, so expired ones sit at the front
+        now = time.time()
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._sessions)
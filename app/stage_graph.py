@@ -0,0 +1,125 @@
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from app.metrics import registry
+from app.profiling import capturing
+
+STAGE_GRAPH_RUNS = registry.counter("vastu_stage_graph_runs_total", "Stage graphs executed, by mode (parallel/inline).")
+STAGE_GRAPH_PROCESS_CALLS = registry.counter("vastu_stage_graph_process_calls_total", "Stage work shipped to the process pool.")
+
+
+class StageGraph:
+    """
+    A request's stages as a small DAG. Each stage names the stages whose
+    results it takes as arguments, in order:
+
+        graph.add("summary", lambda: ...)
+        graph.add("plan", lambda: ...)
+        graph.add("render:1", render, "plan")
+        graph.add("report:1", report, "render:1", "summary")
+
+    StageExecutor.run() starts every stage as soon as its inputs exist, so the
+    request takes as long as its longest chain instead of the sum of stages.
+    """
+
+    def __init__(self):
+        self.nodes = {} # name -> (fn, deps), in insertion order
+
+    def add(self, name, fn, *deps):
+        if name in self.nodes:
+            raise ValueError(f"Duplicate stage {name!r}")
+        for dep in deps:
+            # Stages can only depend on earlier ones, so the graph can't cycle
+            if dep not in self.nodes:
+                raise ValueError(f"Stage {name!r} depends on unknown stage {dep!r}")
+        self.nodes[name] = (fn, deps)
+        return name
+
+
+class StageExecutor:
+    """
+    Runs StageGraphs on a shared thread pool. Stages keep the caller's
+    contextvars (Server-Timing, memory samples), since each one runs in a
+    copy of the submitting context.
+
+    threads=0 runs every stage inline in insertion order (debugging). A
+    profiled request (X-Vastu-Profile) is always run inline too: cProfile
+    and the sampler only see the request thread.
+
+    Pure-Python CPU work that holds the GIL (ReportLab) can hop to a process
+    pool via in_process(); with processes=0 it just runs in the calling
+    thread. Workers come from a forkserver, never a fork of this threaded
+    process.
+    """
+
+    def __init__(self, threads=4, processes=0):
+        self.threads = threads
+        self.processes = processes
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix="vastu-stage") if threads > 0 else None
+        self._procs = None
+        self._procs_lock = threading.Lock()
+
+    def run(self, graph):
+        """{stage name: result}. The first stage to fail re-raises here, once running stages have finished."""
+        if self._pool is None or capturing():
+            STAGE_GRAPH_RUNS.inc(mode="inline")
+            results = {}
+            for name, (fn, deps) in graph.nodes.items():
+                results[name] = fn(*[results[d] for d in deps])
+            return results
+
+        STAGE_GRAPH_RUNS.inc(mode="parallel")
+        results = {}
+        pending = dict(graph.nodes)
+        running = {}
+        error = None
+        while pending or running:
+            if error is None:
+                for name, (fn, deps) in list(pending.items()):
+                    if all(d in results for d in deps):
+                        args = [results[d] for d in deps]
+                        running[self._pool.submit(contextvars.copy_context().run, fn, *args)] = name
+                        del pending[name]
+            else:
+                pending.clear()
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                else:
+                    results[name] = future.result()
+        if error is not None:
+            raise error
+        return results
+
+    def background(self, fn, *args):
+        """fn(*args) after the request is done (deferred output); not awaited."""
+        if self._pool is None:
+            return fn(*args)
+        return self._pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def in_process(self, fn, *args):
+        """fn(*args) in the process pool (fn and args must pickle), else inline."""
+        if self.processes <= 0:
+            return fn(*args)
+        STAGE_GRAPH_PROCESS_CALLS.inc()
+        return self._process_pool().submit(fn, *args).result()
+
+    def _process_pool(self):
+        with self._procs_lock:
+            if self._procs is None:
+                ctx = multiprocessing.get_context("forkserver")
+                ctx.set_forkserver_preload(["app.report_generator"])
+                self._procs = ProcessPoolExecutor(self.processes, mp_context=ctx)
+            return self._procs
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._procs is not None:
+            self._procs.shutdown(wait=False, cancel_futures=True)
@@ -1,18 +1,52 @@
-from transformers import pipeline
-import torch
+import queue
+import time
+
+from app.metrics import registry
+
+TEXT_INFERENCE_WAIT = registry.histogram("vastu_text_inference_wait_seconds", "Time spent waiting for a free text model slot.")
+
 
 class TextGenerator:
-    def __init__(self):
+    """
+    Hugging Face text generation behind a bounded pool of `slots` pipelines.
+
+    The slots share one copy of the model weights, but each has its own
+    tokenizer (fast tokenizers are not safe to call from two threads) and
+    pipeline object. A caller borrows a slot for one generation, so at most
+    `slots` inferences run at once and the rest wait; keep slots *
+    torch_threads within the worker's cores.
+    """
+
+    def __init__(self, model_name="distilgpt2", slots=1):
+        # Imported here so torch/transformers only load when the model is first needed
+        from transformers import AutoTokenizer, pipeline
+        import torch
+
         # Check for CUDA but default to CPU as most users might not have setup
         self.device = 0 if torch.cuda.is_available() else -1
+        self.slots = max(1, slots)
+        self._pool = queue.Queue()
         print(f"Loading Text Generator on {'GPU' if self.device == 0 else 'CPU'}...")
         try:
             # Using distilgpt2 for speed/size as requested
-            self.generator = pipeline('text-generation', model='distilgpt2', device=self.device)
+            self.generator = pipeline('text-generation', model=model_name, device=self.device)
+            self._pool.put(self.generator)
+            for _ in range(self.slots - 1):
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                self._pool.put(pipeline('text-generation', model=self.generator.model, tokenizer=tokenizer, device=self.device))
         except Exception as e:
             print(f"Error loading model: {e}")
             self.generator = None
 
+    def _generate(self, prompt, **kwargs):
+        start = time.perf_counter()
+        generator = self._pool.get()
+        TEXT_INFERENCE_WAIT.observe(time.perf_counter() - start)
+        try:
+            return generator(prompt, **kwargs)
+        finally:
+            self._pool.put(generator)
+
     def generate_report_text(self, context_dict):
         """
         Generates a professional architectural summary based on the context.
@@ -33,7 +67,7 @@ class TextGenerator:
 
         try:
             # max_new_tokens is preferred over max_length to avoid warnings
-            output = self.generator(prompt, max_new_tokens=100, num_return_sequences=1, temperature=0.7, pad_token_id=50256)
+            output = self._generate(prompt, max_new_tokens=100, num_return_sequences=1, temperature=0.7, pad_token_id=50256)
             generated_text = output[0]['generated_text']
             
             # Simple cleanup to return the summarization part
@@ -56,7 +90,27 @@ class TextGenerator:
         )
         
         try:
-            output = self.generator(prompt, max_new_tokens=40, num_return_sequences=1, temperature=0.7, pad_token_id=50256)
+            output = self._generate(prompt, max_new_tokens=40, num_return_sequences=1, temperature=0.7, pad_token_id=50256)
             return output[0]['generated_text']
         except:
             return prompt + " optimal energy flow."
+
+
+class StubTextGenerator:
+    """
+    Same interface as TextGenerator, without the model: fills a fixed
+    template. Selected with VASTU_TEXT_MODEL=stub so benchmarks and load
+    tests measure our pipeline rather than GPT-2 sampling.
+    """
+
+    def generate_report_text(self, context_dict):
+        return (
+            f"Architectural Design Report for a {context_dict.get('style', 'Modern')} Residence.\n"
+            f"Plot: {context_dict.get('plot_size', 'standard')} sq ft, {context_dict.get('facing', 'North')} Facing.\n"
+            f"Layout Configuration: {context_dict.get('floors', 'G+1')} structure with {context_dict.get('bedrooms', '3')} bedrooms.\n"
+            "Executive Summary:\n"
+            "This design prioritizes functional flow and Vastu compliance."
+        )
+
+    def generate_room_description(self, room_name, zone):
+        return f"The {room_name.replace('_', ' ').title()} is strategically placed in the {zone} zone. This location promotes optimal energy flow."
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+
+def image_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+class TileCache:
+    """
+    Thread-safe LRU of rendered floor tiles (PIL images), bounded by raw
+    pixel bytes.
+
+    Keys are content keys built by the Visualizer (Layout, plot fields,
+    floor label), so an unchanged floor is never rasterized twice, whether it
+    comes back in a design session, another option or a later request.
+    Cached images are shared: callers paste/resize them, never draw on them.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict() # key -> image
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def peek(self, key):
+        # Lookup without touching LRU order or hit/miss stats
+        if key is None:
+            return None
+        with self._lock:
+            return self._items.get(key)
+
+    def put(self, key, img):
+        size = image_bytes(img)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.total_bytes -= image_bytes(old)
+            self._items[key] = img
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= image_bytes(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        """Returns (image, rendered_now)."""
+        if key is not None:
+            img = self.get(key)
+            if img is not None:
+                return img, False
+        img = render()
+        if key is not None:
+            self.put(key, img)
+        return img, True
+
+    def clear(self):
+        # Memory pressure: tiles are only a cache, so drop them all
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,3 +1,24 @@
+from functools import lru_cache
+
+from app.layout import Layout
+
+
+@lru_cache(maxsize=1024)
+def score_name(room):
+    """
+    The name a room is weighted, ruled and described by: bedroom_2 -> bedroom.
+    Kept apart from layout.room_kind on purpose, since changing it changes
+    scores (study_room scores and reads as "study", kitchen_dining as "kitchen").
+    """
+    base_name = room.split("_")[0]
+    if "master" in room: base_name = "master_bedroom"
+    if "living" in room: base_name = "living_room"
+    if "dining" in room: base_name = "dining_area"
+    if "pooja" in room: base_name = "pooja_room"
+    if "kitchen" in room: base_name = "kitchen"
+    return base_name
+
+
 class VastuScorer:
 
     ROOM_WEIGHTS = {
@@ -79,14 +100,10 @@ class VastuScorer:
         max_score = 0 # Calculate dynamically based on actual rooms present
         breakdown = {}
 
-        for room, zone in layout.items():
-            # Handle identifiers like bedroom_2
-            base_name = room.split("_")[0] 
-            if "master" in room: base_name = "master_bedroom"
-            if "living" in room: base_name = "living_room"
-            if "dining" in room: base_name = "dining_area"
-            if "pooja" in room: base_name = "pooja_room"
-            if "kitchen" in room: base_name = "kitchen"
+        for rid, zone in Layout.of(layout).entries():
+            # Identifiers like bedroom_2 resolve to their base name once per name
+            room = rid.name
+            base_name = score_name(room)
             
             # 1. Determine Weight
             weight = self.ROOM_WEIGHTS.get(base_name, self.ROOM_WEIGHTS.get(room, 5)) 
@@ -0,0 +1,87 @@
+"""
+Synthetic request payloads for benchmarks and load tests.
+
+`sample_payloads()` walks a deterministic grid over the input space
+(bedrooms 1-8, bathrooms, floor configs, facings, vastu levels) so runs on
+different commits see exactly the same workload.
+"""
+import itertools
+import json
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLOOR_CONFIGS = ("G", "G+1", "G+2", "G+3", "duplex")
+FACINGS = ("north", "east", "south", "west")
+VASTU_LEVELS = ("high", "medium", "low")
+PLOTS = ((30, 40), (40, 60), (50, 80))
+
+
+def make_payload(bedrooms=3, bathrooms=2, floors="G+1", facing="east", vastu_level="high",
+                 plot=(30, 40), plans=3, images=True, pdf=True, seed=None):
+    """One /generate-design (or /generate-prompt) request body as a dict."""
+    return {
+        "plot": {"length": plot[0], "width": plot[1], "unit": "ft", "shape": "rectangle", "facing": facing},
+        "building": {"floors": floors, "building_type": "independent_house"},
+        "rooms": {
+            "bedrooms": bedrooms,
+            "bathrooms": bathrooms,
+            "kitchen": True,
+            "living_room": True,
+            "dining_area": True,
+            "pooja_room": bedrooms >= 2,
+            "study_room": bedrooms >= 4,
+            "balcony": floors != "G",
+            "parking": True,
+        },
+        "vastu_preference": vastu_level,
+        "vastu_level": vastu_level,
+        "design": {"style": "modern", "layout_type": "open-plan", "natural_lighting": "high", "visualization": "2D"},
+        "output": {
+            "number_of_plans": plans,
+            "output_format": "2D" if images else "none",
+            "export_format": ["PDF"] if pdf else [],
+        },
+        "seed": seed,
+    }
+
+
+def sample_payloads(limit=None, seed=0, **overrides):
+    """
+    Cartesian grid over bedrooms x floors x facings x vastu levels, shuffled
+    with a fixed seed so a `limit` still covers the space evenly.
+    """
+    grid = list(itertools.product(range(1, 9), FLOOR_CONFIGS, FACINGS, VASTU_LEVELS))
+    random.Random(seed).shuffle(grid)
+    if limit:
+        grid = grid[:limit]
+
+    out = []
+    for i, (bedrooms, floors, facing, level) in enumerate(grid):
+        kwargs = dict(
+            bedrooms=bedrooms,
+            bathrooms=max(1, (bedrooms + 1) // 2 + (i % 2)),
+            floors=floors,
+            facing=facing,
+            vastu_level=level,
+            plot=PLOTS[i % len(PLOTS)],
+            seed=i,
+        )
+        kwargs.update(overrides)
+        out.append(make_payload(**kwargs))
+    return out
+
+
+def sample_inputs(limit=None, seed=0, **overrides):
+    from app.schemas import UserInput
+    return [UserInput(**p) for p in sample_payloads(limit, seed, **overrides)]
+
+
+def load_fixture(path=None):
+    """input.txt-style JSON file -> payload dict, with the fields the API requires filled in."""
+    with open(path or os.path.join(ROOT, "input.txt")) as f:
+        payload = json.load(f)
+    payload.setdefault("vastu_preference", payload.get("vastu_level", "high"))
+    payload.setdefault("output", {"number_of_plans": 3, "output_format": "2D", "export_format": ["PDF"]})
+    return payload
@@ -0,0 +1,319 @@
+"""
+End-to-end load test against a local uvicorn server.
+
+Boots `uvicorn app.main:app` on a free port with the stub text model
+(VASTU_TEXT_MODEL=stub) and the result cache off, drives /generate-prompt
+and /generate-design, and reports per endpoint: throughput, p50/p95/p99
+latency, error / 429 / 503 rates and response bytes, plus the server's
+peak RSS.
+
+    python -m benchmarks.loadtest run --duration 30 --concurrency 8
+    python -m benchmarks.loadtest run --rate 5 --mix prompt=3,design=1 --workers 2 --json lt.json
+    python -m benchmarks.loadtest run --url http://127.0.0.1:8000 --fixture input.txt
+    python -m benchmarks.loadtest compare before.json after.json
+
+Without --rate the test is closed-loop (each of --concurrency clients sends
+back to back). With --rate requests arrive on a fixed schedule and latency
+is measured from the scheduled time, so a backed-up client pool shows up
+as latency instead of silently lowering the load.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import load_fixture, sample_payloads
+from benchmarks.stages import _git_commit, _percentile
+
+ENDPOINTS = {"prompt": "/generate-prompt", "design": "/generate-design"}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_kb(pid):
+    """RSS of pid plus its children (uvicorn --workers), from /proc; None off Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except (OSError, StopIteration, ValueError):
+        return None
+    for child in children:
+        rss += _rss_kb(child) or 0
+    return rss
+
+
+class Server:
+    """uvicorn subprocess with load-test settings; use as a context manager."""
+
+    def __init__(self, workers=1, cache=False, env=None):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.workers = workers
+        self.env = dict(os.environ, VASTU_TEXT_MODEL="stub", VASTU_CACHE_ENABLED="1" if cache else "0")
+        self.env.update(env or {})
+        self.proc = None
+        self.peak_rss_kb = 0
+        self._sampling = False
+
+    def __enter__(self):
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"]
+        self.proc = subprocess.Popen(cmd, cwd=ROOT, env=self.env)
+        self._wait_ready()
+        self._sampling = True
+        threading.Thread(target=self._sample_rss, daemon=True).start()
+        return self
+
+    def _wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise SystemExit(f"server exited with code {self.proc.returncode}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=2)
+                conn.request("GET", "/services")
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise SystemExit("server did not become ready")
+
+    def _sample_rss(self):
+        while self._sampling:
+            rss = _rss_kb(self.proc.pid)
+            if rss:
+                self.peak_rss_kb = max(self.peak_rss_kb, rss)
+            time.sleep(0.2)
+
+    def __exit__(self, *exc):
+        self._sampling = False
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class Client:
+    """One keep-alive connection per thread."""
+
+    def __init__(self, base_url, timeout=120):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, path, body):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            data = resp.read()
+            return resp.status, len(data)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            return None, 0
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {} # endpoint -> [(status, seconds, nbytes)]
+
+    def add(self, endpoint, status, seconds, nbytes):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((status, seconds, nbytes))
+
+    def summary(self, wall_seconds):
+        out = {}
+        for endpoint, rows in sorted(self.samples.items()):
+            ok = [r for r in rows if r[0] is not None and 200 <= r[0] < 300]
+            latencies = [r[1] * 1000 for r in ok]
+            n = len(rows)
+            out[endpoint] = {
+                "requests": n,
+                "ok": len(ok),
+                "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0,
+                "p50_ms": round(_percentile(latencies, 0.50), 1) if latencies else None,
+                "p95_ms": round(_percentile(latencies, 0.95), 1) if latencies else None,
+                "p99_ms": round(_percentile(latencies, 0.99), 1) if latencies else None,
+                "max_ms": round(max(latencies), 1) if latencies else None,
+                "error_rate": round(sum(1 for r in rows if r[0] is None or (r[0] >= 400 and r[0] not in (429, 503))) / n, 4),
+                "rate_429": round(sum(1 for r in rows if r[0] == 429) / n, 4),
+                "rate_503": round(sum(1 for r in rows if r[0] == 503) / n, 4),
+                "avg_response_bytes": round(sum(r[2] for r in ok) / len(ok)) if ok else 0,
+                "total_response_bytes": sum(r[2] for r in rows),
+            }
+        return out
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint in --mix: {name} (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def drive(base_url, payloads, mix, duration, concurrency, rate=None, seed=0):
+    client = Client(base_url)
+    recorder = Recorder()
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    bodies = [json.dumps(p).encode("utf-8") for p in payloads]
+    lock = threading.Lock()
+
+    def next_request():
+        with lock:
+            return rng.choices(names, weights)[0], rng.choice(bodies)
+
+    def send(endpoint, body, scheduled):
+        status, nbytes = client.post(ENDPOINTS[endpoint], body)
+        recorder.add(endpoint, status, time.perf_counter() - scheduled, nbytes)
+
+    start = time.perf_counter()
+    end = start + duration
+
+    if rate:
+        # Open loop: fixed arrival schedule, queued client-side when all threads are busy
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            interval = 1.0 / rate
+            scheduled = start
+            while scheduled < end:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                endpoint, body = next_request()
+                pool.submit(send, endpoint, body, scheduled)
+                scheduled += interval
+    else:
+        def loop():
+            while time.perf_counter() < end:
+                endpoint, body = next_request()
+                send(endpoint, body, time.perf_counter())
+
+        threads = [threading.Thread(target=loop) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    return recorder.summary(time.perf_counter() - start)
+
+
+def print_summary(result):
+    print(f"{'endpoint':>10} {'reqs':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>7} {'429':>7} {'503':>7} {'avg bytes':>11}")
+    for endpoint, s in result["endpoints"].items():
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{endpoint:>10} {s['requests']:6d} {s['throughput_rps']:8.2f} {fmt(s['p50_ms'])} {fmt(s['p95_ms'])} {fmt(s['p99_ms'])} "
+              f"{s['error_rate']:7.2%} {s['rate_429']:7.2%} {s['rate_503']:7.2%} {s['avg_response_bytes']:11d}")
+    if result.get("peak_rss_mb") is not None:
+        print(f"peak server RSS: {result['peak_rss_mb']:.1f} MB")
+
+
+def compare(a, b):
+    print(f"{'endpoint':>10} {'metric':>16} {'before':>10} {'after':>10} {'change':>8}")
+    for endpoint in sorted(set(a["endpoints"]) | set(b["endpoints"])):
+        ea, eb = a["endpoints"].get(endpoint, {}), b["endpoints"].get(endpoint, {})
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "rate_429", "avg_response_bytes"):
+            va, vb = ea.get(metric), eb.get(metric)
+            change = f"{(vb - va) / va:+8.1%}" if va and vb is not None else f"{'-':>8}"
+            print(f"{endpoint:>10} {metric:>16} {str(va):>10} {str(vb):>10} {change}")
+    ra, rb = a.get("peak_rss_mb"), b.get("peak_rss_mb")
+    print(f"{'server':>10} {'peak_rss_mb':>16} {str(ra):>10} {str(rb):>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the API against a local server.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--duration", type=float, default=20, help="seconds of load")
+    p_run.add_argument("--concurrency", type=int, default=4, help="client threads")
+    p_run.add_argument("--rate", type=float, help="arrivals per second (open loop); omit for closed loop")
+    p_run.add_argument("--mix", default="prompt=1,design=1", help="endpoint weights, e.g. prompt=3,design=1")
+    p_run.add_argument("--fixture", action="append", help="input.txt-style JSON payload(s); default: synthetic")
+    p_run.add_argument("--payloads", type=int, default=32, help="number of synthetic payloads")
+    p_run.add_argument("--plans", type=int, default=3, help="number_of_plans for synthetic payloads")
+    p_run.add_argument("--no-pdf", action="store_true", help="synthetic payloads skip PDF export")
+    p_run.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    p_run.add_argument("--cache", action="store_true", help="leave the result cache on")
+    p_run.add_argument("--url", help="target an already running server instead of booting one")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--json", dest="json_path", help="write results to this file")
+
+    p_cmp = sub.add_parser("compare")
+    p_cmp.add_argument("before")
+    p_cmp.add_argument("after")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.before) as f:
+            a = json.load(f)
+        with open(args.after) as f:
+            b = json.load(f)
+        compare(a, b)
+        return 0
+
+    if args.fixture:
+        payloads = [load_fixture(path) for path in args.fixture]
+    else:
+        payloads = sample_payloads(limit=args.payloads, plans=args.plans, pdf=not args.no_pdf)
+    mix = parse_mix(args.mix)
+
+    config = {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "mix": mix,
+        "workers": args.workers if not args.url else None,
+        "cache": args.cache,
+        "payloads": len(payloads),
+    }
+
+    if args.url:
+        endpoints = drive(args.url, payloads, mix, args.duration, args.concurrency, args.rate, args.seed)
+        peak_rss_mb = None
+    else:
+        with Server(workers=args.workers, cache=args.cache) as server:
+            endpoints = drive(server.url, payloads, mix, args.duration, args.concurrency, args.rate, args.seed)
+            peak_rss_mb = round(server.peak_rss_kb / 1024, 1) if server.peak_rss_kb else None
+
+    result = {"commit": _git_commit(), "config": config, "endpoints": endpoints, "peak_rss_mb": peak_rss_mb}
+    print_summary(result)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+In-process micro-benchmarks for every /generate-design stage.
+
+No server or network: each stage is called directly on a deterministic set
+of synthetic inputs (benchmarks.fixtures), with the text model stubbed
+(VASTU_TEXT_MODEL=stub) unless --real-model is given.
+
+    python -m benchmarks.stages run --json bench.json
+    python -m benchmarks.stages run --samples 48 --only optimize,score
+    python -m benchmarks.stages compare baseline.json bench.json --threshold 0.2
+
+`compare` exits 1 when any stage's median got slower than the baseline by
+more than --threshold (relative) and --min-ms (absolute), so it can gate CI.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stages that rasterize or build PDFs run on fewer samples
+HEAVY_STAGES = ("render", "png_encode", "pdf_report")
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summarize(durations):
+    ms = [d * 1000 for d in durations]
+    return {
+        "calls": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(_percentile(ms, 0.95), 4),
+        "min_ms": round(min(ms), 4),
+    }
+
+
+def _time_calls(fn, args_list, repeat):
+    durations = []
+    for args in args_list:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(*args)
+            durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(samples=24, heavy_samples=4, repeat=3, only=None, real_model=False):
+    if not real_model:
+        os.environ["VASTU_TEXT_MODEL"] = "stub"
+    sys.path.insert(0, ROOT)
+
+    from app.rule_engine import VastuRuleEngine
+    from app.optimizer import LayoutOptimizer
+    from app.vastu_scoring import VastuScorer
+    from app.floor_allocator import FloorAllocator
+    from app.design_pipeline import DesignPipeline
+    from app.services import services
+    from benchmarks.fixtures import sample_inputs
+
+    inputs = sample_inputs(limit=samples)
+    rule_engine = VastuRuleEngine()
+    optimizer = LayoutOptimizer()
+    scorer = VastuScorer()
+    allocator = FloorAllocator()
+    pipeline = DesignPipeline(rule_engine, optimizer, scorer, allocator, services)
+    rules = rule_engine.get_all_rules()
+
+    # Shared intermediates so each stage is timed on realistic inputs
+    allocations = [allocator.allocate(ui) for ui in inputs]
+    zone_sets = [
+        pipeline._option_zones(0, rooms, ui.vastu_level, random.Random(i))
+        for i, (ui, alloc) in enumerate(zip(inputs, allocations))
+        for rooms in alloc.values()
+    ]
+    plans = [pipeline.plan(ui, random.Random(i), count=1)[0] for i, ui in enumerate(inputs)]
+    full_layouts = []
+    for plan in plans:
+        merged = {}
+        for layout in plan.values():
+            merged.update(layout)
+        full_layouts.append(merged)
+
+    stages = {}
+
+    def bench(name, fn, args_list, heavy=False):
+        if only and name not in only:
+            return
+        if heavy:
+            args_list = args_list[:heavy_samples]
+        # One untimed call so lazy imports / font loading aren't measured
+        fn(*args_list[0])
+        stages[name] = _summarize(_time_calls(fn, args_list, 1 if heavy else repeat))
+        print(f"{name:>16}  median {stages[name]['median_ms']:10.3f} ms  p95 {stages[name]['p95_ms']:10.3f} ms  ({stages[name]['calls']} calls)")
+
+    bench("rules_load", lambda: VastuRuleEngine(), [()])
+    bench("rule_lookup", lambda z: [rule_engine.get_zone_for_room(r, "medium") for r in z], [(list(z),) for z in zone_sets])
+    bench("allocate", allocator.allocate, [(ui,) for ui in inputs])
+    bench("optimize", lambda z, s: optimizer.generate_variants(z, count=3, rng=random.Random(s)),
+          [(z, i) for i, z in enumerate(zone_sets)])
+    bench("plan", lambda ui, s: pipeline.plan(ui, random.Random(s), count=3), [(ui, i) for i, ui in enumerate(inputs)])
+    bench("score", scorer.calculate_score, [(layout, rules) for layout in full_layouts])
+
+    visualizer = services.get("visualizer")
+    images = []
+
+    def render(plan, plot):
+        img = visualizer.create_composite_image([plan], plot_details=plot, single_option_mode=True)
+        images.append(img)
+
+    bench("render", render, [(plan, ui.plot) for plan, ui in zip(plans, inputs)], heavy=True)
+
+    def encode(img):
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        return buf
+
+    if not images:
+        render(plans[0], inputs[0].plot)
+    bench("png_encode", encode, [(img,) for img in images], heavy=True)
+
+    text_gen = services.get("text_gen")
+    bench("text_generation", lambda ui: pipeline.summary(ui, ui.plot), [(ui,) for ui in inputs[:heavy_samples]])
+
+    report_gen = services.get("report_gen")
+    png = encode(images[0])
+
+    def report(layout, ui):
+        score, breakdown = scorer.calculate_score(layout, rules)
+        return report_gen.generate_report(1, BytesIO(png.getvalue()), score, breakdown, [], ui.plot, ai_summary="summary")
+
+    bench("pdf_report", report, [(layout, ui) for layout, ui in zip(full_layouts, inputs)], heavy=True)
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "text_model": type(text_gen).__name__,
+        "samples": len(inputs),
+        "stages": stages,
+    }
+
+
+def compare(baseline, current, threshold=0.2, min_ms=0.05, metric="median_ms"):
+    """Returns (rows, regressions); a row is (stage, base, cur, ratio, status)."""
+    rows = []
+    regressions = []
+    for name, cur in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None:
+            rows.append((name, None, cur[metric], None, "new"))
+            continue
+        b, c = base[metric], cur[metric]
+        ratio = c / b if b else float("inf")
+        if c > b * (1 + threshold) and c - b > min_ms:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif c < b * (1 - threshold) and b - c > min_ms:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, b, c, ratio, status))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline stage micro-benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="time every stage and print/write results")
+    p_run.add_argument("--samples", type=int, default=24)
+    p_run.add_argument("--heavy-samples", type=int, default=4, help="samples for render/encode/pdf stages")
+    p_run.add_argument("--repeat", type=int, default=3, help="timed calls per sample for light stages")
+    p_run.add_argument("--only", help="comma-separated stage names")
+    p_run.add_argument("--real-model", action="store_true", help="use the configured text model instead of the stub")
+    p_run.add_argument("--json", dest="json_path", help="write results to this file")
+
+    p_cmp = sub.add_parser("compare", help="flag regressions against a baseline results file")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    p_cmp.add_argument("--min-ms", type=float, default=0.05, help="ignore absolute differences below this")
+    p_cmp.add_argument("--metric", default="median_ms", choices=("median_ms", "mean_ms", "p95_ms", "min_ms"))
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        only = set(args.only.split(",")) if args.only else None
+        result = run(args.samples, args.heavy_samples, args.repeat, only, args.real_model)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(result, f, indent=2)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows, regressions = compare(baseline, current, args.threshold, args.min_ms, args.metric)
+
+    print(f"{'stage':>16}  {'baseline':>12}  {'current':>12}  {'ratio':>7}  status ({args.metric})")
+    for name, b, c, ratio, status in rows:
+        b_txt = f"{b:12.3f}" if b is not None else f"{'-':>12}"
+        r_txt = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:>16}  {b_txt}  {c:12.3f}  {r_txt}  {status}")
+
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
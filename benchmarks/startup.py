@@ -0,0 +1,123 @@
+"""
+Startup benchmark: how long does it take a worker to import the app?
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter,
+reports the slowest modules (cumulative import time) and fails when the
+total exceeds a budget, so CI can keep boot time from creeping back up.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget-ms 1500 --top 25 --json startup.json
+    python -m benchmarks.startup --services   # also time first use of lazy services
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy packages that must not be imported by `import app.main`
+FORBIDDEN_AT_IMPORT = ("torch", "transformers", "reportlab", "PIL", "cv2")
+
+
+def measure_imports(target="app.main", runs=3):
+    """Returns (best_total_us, {module: cumulative_us}) over `runs` cold interpreters."""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise SystemExit(f"import {target} failed:\n{proc.stderr[-2000:]}")
+
+        modules = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            parts = line[len("import time:"):].split("|")
+            if len(parts) != 3:
+                continue
+            try:
+                cum_us = int(parts[1].strip())
+            except ValueError:
+                continue # header line
+            modules[parts[2].strip()] = cum_us
+
+        total = modules.get(target, 0)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def measure_services():
+    """Times first use of every lazily loaded service in a fresh interpreter."""
+    code = (
+        "import json, time\n"
+        "from app.services import services\n"
+        "out = {}\n"
+        "for name in services.status():\n"
+        "    t = time.perf_counter()\n"
+        "    try:\n"
+        "        services.get(name)\n"
+        "        out[name] = round((time.perf_counter() - t) * 1000, 1)\n"
+        "    except Exception as e:\n"
+        "        out[name] = f'error: {e}'\n"
+        "print(json.dumps(out))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    return json.loads(lines[-1]) if lines else {"error": proc.stderr[-500:]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import time against a budget.")
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("VASTU_STARTUP_BUDGET_MS", 2000)))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--services", action="store_true", help="also time first use of lazy services")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    total_us, modules = measure_imports(args.target, args.runs)
+    total_ms = total_us / 1000
+
+    print(f"import {args.target}: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14}  module")
+    for name, cum in sorted(modules.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{cum / 1000:14.1f}  {name}")
+
+    leaked = sorted(m for m in modules if m.split(".")[0] in FORBIDDEN_AT_IMPORT)
+    top_level_leaks = sorted({m.split(".")[0] for m in leaked})
+    if top_level_leaks:
+        print(f"\nheavy packages imported at startup: {', '.join(top_level_leaks)}")
+
+    result = {
+        "target": args.target,
+        "total_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "modules_ms": {k: round(v / 1000, 2) for k, v in modules.items()},
+        "heavy_imports": top_level_leaks,
+    }
+
+    if args.services:
+        result["services_first_use_ms"] = measure_services()
+        print("\nfirst use of lazy services (ms):")
+        for name, ms in result["services_first_use_ms"].items():
+            print(f"  {name}: {ms}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if total_ms > args.budget_ms or top_level_leaks:
+        print("\nFAIL: startup budget exceeded" if total_ms > args.budget_ms else "\nFAIL: heavy import at startup")
+        return 1
+    print("\nOK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
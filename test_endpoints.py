@@ -50,6 +50,7 @@ def test_endpoints():
         
         if response.status_code == 200:
             data = response.json()
+            print(f"Server-Timing: {response.headers.get('Server-Timing', 'n/a')}")
             try:
                 if "images" in data and data["images"]:
                      for i, img_b64 in enumerate(data["images"]):
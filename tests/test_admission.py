@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from app.admission import AdmissionController, AdmissionMiddleware
+
+
+class BlockingApp:
+    # Heavy requests hold their slot until `release` is set
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+        self.calls = []
+
+    async def __call__(self, scope, receive, send):
+        self.calls.append(scope["path"])
+        if scope["path"].startswith("/generate-design"):
+            self.started.set()
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _request(app, path):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "path": path, "method": "POST", "headers": []}, receive, send)
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start.get("headers", [])}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def _middleware(max_queue=0, queue_timeout=0.05):
+    inner = BlockingApp()
+    heavy = AdmissionController("heavy", max_concurrency=1, max_queue=max_queue, queue_timeout=queue_timeout)
+    light = AdmissionController("light", max_concurrency=4, max_queue=4, queue_timeout=1)
+    app = AdmissionMiddleware(
+        inner, heavy, light,
+        heavy_paths=("/generate-design",), heavy_suffixes=("/bundle",), exempt_paths=("/metrics",)
+    )
+    return app, inner, heavy, light
+
+
+def test_heavy_queue_timeout_is_503_with_retry_after():
+    async def scenario():
+        app, inner, heavy, _ = _middleware(max_queue=1, queue_timeout=0.05)
+        first = asyncio.create_task(_request(app, "/generate-design"))
+        await inner.started.wait()
+
+        status, headers, body = await _request(app, "/generate-design")
+        assert status == 503
+        assert int(headers["retry-after"]) >= 1
+        assert "queue wait exceeded" in json.loads(body)["detail"]
+        assert heavy.rejected == 1 and heavy.waiting == 0
+
+        inner.release.set()
+        assert (await first)[0] == 200
+        assert heavy.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_heavy_queue_full_is_429_with_retry_after():
+    async def scenario():
+        app, inner, heavy, _ = _middleware(max_queue=0)
+        first = asyncio.create_task(_request(app, "/generate-design"))
+        await inner.started.wait()
+
+        status, headers, _ = await _request(app, "/generate-design")
+        assert status == 429 and int(headers["retry-after"]) >= 1
+        assert inner.calls == ["/generate-design"]
+
+        inner.release.set()
+        await first
+
+    asyncio.run(scenario())
+
+
+def test_light_and_exempt_paths_bypass_the_heavy_pool():
+    async def scenario():
+        app, inner, heavy, light = _middleware(max_queue=0)
+        first = asyncio.create_task(_request(app, "/generate-design"))
+        await inner.started.wait()
+
+        # Heavy is saturated, but these never touch its semaphore
+        assert (await _request(app, "/generate-prompt"))[0] == 200
+        assert (await _request(app, "/artifacts/abc"))[0] == 200
+        assert (await _request(app, "/metrics"))[0] == 200
+        assert heavy.active == 1 and heavy.rejected == 0
+        assert light.admitted == 2 # /metrics is exempt from both pools
+
+        # Routes ending in /bundle are heavy even with an id in the middle
+        assert (await _request(app, "/projects/p1/bundle"))[0] == 429
+
+        inner.release.set()
+        await first
+
+    asyncio.run(scenario())
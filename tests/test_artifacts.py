@@ -0,0 +1,96 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.artifact_store import ArtifactStore, parse_range
+
+
+def test_parse_range_satisfiable():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    # Past-the-end ends and oversized suffixes are trimmed to the body
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+
+@pytest.mark.parametrize("header", [
+    None, "", "items=0-10", "bytes=", "bytes=-", "bytes=abc", "bytes=5", "bytes=5-3",
+    "bytes=+1-2", "bytes=0-10,20-30", "bytes=1-x",
+])
+def test_parse_range_ignores_malformed(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+def test_pending_artifacts_are_never_evicted():
+    store = ArtifactStore(max_bytes=100)
+    pending = store.reserve("application/pdf", "report.pdf")
+    old = store.put(b"a" * 60, "image/png")
+    store.put(b"b" * 60, "image/png")
+    store.put(b"c" * 60, "image/png")
+
+    assert store.get(pending.id) is pending and pending.pending
+    assert store.get(old.id) is None
+    assert store.total_bytes <= 100
+
+    store.fulfil(pending, b"%PDF" * 10)
+    assert store.get(pending.id).data == b"%PDF" * 10
+
+
+def test_newest_artifact_is_kept_even_if_oversized():
+    store = ArtifactStore(max_bytes=10)
+    big = store.put(b"x" * 50, "image/png")
+    assert store.get(big.id) is big
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_etag_and_not_modified(client):
+    artifact = main.artifact_store.put(b"\x89PNG" + bytes(range(200)), "image/png", "a.png")
+    r = client.get(f"/artifacts/{artifact.id}")
+    assert r.status_code == 200 and r.content == artifact.data
+    assert r.headers["etag"] == artifact.etag
+
+    r = client.get(f"/artifacts/{artifact.id}", headers={"If-None-Match": artifact.etag})
+    assert r.status_code == 304 and r.content == b""
+    r = client.get(f"/artifacts/{artifact.id}", headers={"If-None-Match": '"other"'})
+    assert r.status_code == 200
+
+
+def test_range_requests(client):
+    artifact = main.artifact_store.put(bytes(range(100)), "application/pdf", "r.pdf")
+    url = f"/artifacts/{artifact.id}"
+
+    r = client.get(url, headers={"Range": "bytes=10-19"})
+    assert r.status_code == 206 and r.content == bytes(range(10, 20))
+    assert r.headers["content-range"] == "bytes 10-19/100"
+
+    r = client.get(url, headers={"Range": "bytes=oops"})
+    assert r.status_code == 200 and r.content == artifact.data
+
+    r = client.get(url, headers={"Range": "bytes=200-"})
+    assert r.status_code == 416 and r.headers["content-range"] == "bytes */100"
+
+    # A stale If-Range falls back to the full body
+    r = client.get(url, headers={"Range": "bytes=10-19", "If-Range": '"other"'})
+    assert r.status_code == 200
+
+
+def test_pending_artifact_is_accepted_not_served(client):
+    artifact = main.artifact_store.reserve("application/pdf", "report.pdf")
+    try:
+        r = client.get(f"/artifacts/{artifact.id}")
+        assert r.status_code == 202
+        assert r.headers["retry-after"] == "1"
+    finally:
+        main.artifact_store.discard(artifact.id)
+    assert client.get(f"/artifacts/{artifact.id}").status_code == 404
@@ -0,0 +1,71 @@
+import io
+import json
+import zipfile
+
+from app.bundle import ZipStream
+
+
+class UnseekableSink(io.RawIOBase):
+    # Like a socket: write-only, tell()/seek() fail
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+
+def _stream(entries):
+    bundle = ZipStream()
+    sink = UnseekableSink()
+    for name, data in entries:
+        sink.write(bundle.add(name, data))
+    sink.write(bundle.close())
+    assert not sink.seekable()
+    return bundle, b"".join(sink.chunks)
+
+
+def test_streamed_bundle_is_a_valid_zip():
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+    pdf = b"%PDF-1.4\n" + b"stream" * 500
+    layout = json.dumps({"0": {"kitchen": "SE"}}) * 50
+    bundle, data = _stream([("option_1.png", png), ("report_1.pdf", pdf), ("option_1.json", layout)])
+
+    assert bundle.bytes_sent == len(data)
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.testzip() is None
+        assert z.namelist() == ["option_1.png", "report_1.pdf", "option_1.json"]
+        assert z.read("option_1.png") == png
+        assert z.read("report_1.pdf") == pdf
+        assert z.read("option_1.json").decode("utf-8") == layout
+
+        infos = {i.filename: i for i in z.infolist()}
+        # Streamed entries carry sizes in a data descriptor (general purpose bit 3)
+        assert all(i.flag_bits & 0x08 for i in infos.values())
+        assert infos["option_1.png"].compress_type == zipfile.ZIP_STORED
+        assert infos["report_1.pdf"].compress_type == zipfile.ZIP_STORED
+        assert infos["option_1.json"].compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_each_add_returns_only_its_own_entry():
+    bundle = ZipStream()
+    first = bundle.add("a.txt", "hello")
+    second = bundle.add("b.txt", "world", seconds=0.123456)
+    assert first.startswith(b"PK\x03\x04") and second.startswith(b"PK\x03\x04")
+    assert b"world" not in first
+    tail = bundle.close()
+    assert tail.startswith(b"PK\x01\x02") # central directory only
+
+    with zipfile.ZipFile(io.BytesIO(first + second + tail)) as z:
+        assert z.testzip() is None
+        assert z.read("b.txt") == b"world"
+    assert bundle.files[1] == {"name": "b.txt", "size": 5, "compression": "deflated", "seconds": 0.1235}
+
+
+def test_empty_bundle():
+    bundle, data = _stream([])
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        assert z.namelist() == []
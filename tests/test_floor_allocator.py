@@ -0,0 +1,28 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config import settings
+from app.floor_allocator import parse_floor_count
+from app.schemas import BuildingConfig
+
+
+@pytest.mark.parametrize("text, count", [
+    ("G", 1), ("g+0", 1), ("G+1", 2), (" G + 12 ", 13), ("G+59", 60),
+    ("3", 3), ("4 floors", 4), ("2storeys", 2), ("1 floor", 1),
+    ("Duplex", 2), ("triplex", 3), ("bungalow", 1), ("single", 1),
+])
+def test_parse_floor_count(text, count):
+    assert parse_floor_count(text) == count
+
+
+@pytest.mark.parametrize("text", [None, "", "penthouse", "G+", "G+x", "+1", "-3", "1.5", "G-1", "0"])
+def test_malformed_floor_counts_mean_one_floor(text):
+    assert parse_floor_count(text) == 1
+
+
+def test_building_config_floor_limit():
+    top = f"G+{settings.max_floors - 1}"
+    assert BuildingConfig(floors=top, building_type="apartment").floors == top
+    for floors in (f"G+{settings.max_floors}", "G+100000", str(settings.max_floors + 1)):
+        with pytest.raises(ValidationError, match=f"At most {settings.max_floors} floors"):
+            BuildingConfig(floors=floors, building_type="apartment")
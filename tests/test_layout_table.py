@@ -0,0 +1,68 @@
+from app.layout import Layout
+from app.layout_table import LayoutTable, _pack_record, table_key, write_table
+from app.mandala import get_grid
+
+
+ZONES_3X3 = {"kitchen": ["SE", "NW"], "pooja_room": ["NE"], "master_bedroom": ["SW"]}
+ZONES_9X9 = {"kitchen": ["SE"], "bathroom": ["W", "NW"]}
+
+
+def _build(path, version="abc123"):
+    grid = get_grid("9x9")
+    coarse = Layout({"kitchen": "SE", "pooja_room": "NE", "master_bedroom": "SW"})
+    fine = Layout({"kitchen": "SE", "bathroom": "NW"}, grid, {"kitchen": (6, 6, 2, 2), "bathroom": (0, 0, 1, 1)})
+    entries = {
+        table_key(ZONES_3X3): _pack_record(
+            table_key(ZONES_3X3), ZONES_3X3, coarse, ["kitchen placed in SE (Fallback)"], None
+        ),
+        table_key(ZONES_9X9, grid): _pack_record(
+            table_key(ZONES_9X9, grid), ZONES_9X9, fine, ["bathroom reduced to a single pada in NW"], grid
+        ),
+    }
+    assert write_table(str(path), entries, version) == 2
+    return coarse, fine
+
+
+def test_round_trip_hits(tmp_path):
+    path = tmp_path / "table.bin"
+    coarse, fine = _build(path)
+    table = LayoutTable.open(str(path), "abc123")
+    try:
+        assert table.n_records == 2
+
+        layout, notes = table.lookup(ZONES_3X3)
+        assert layout == coarse
+        assert layout.grid is None
+        assert notes == ["kitchen placed in SE (Fallback)"]
+
+        layout, notes = table.lookup(ZONES_9X9, get_grid("9x9"))
+        assert layout == fine
+        assert dict(layout.blocks) == {"kitchen": (6, 6, 2, 2), "bathroom": (0, 0, 1, 1)}
+        assert notes == ["bathroom reduced to a single pada in NW"]
+    finally:
+        table.close()
+
+
+def test_misses(tmp_path):
+    path = tmp_path / "table.bin"
+    _build(path)
+    table = LayoutTable.open(str(path), "abc123")
+    try:
+        # Different zones, room order or grid are different problems
+        assert table.lookup({"kitchen": ["NW", "SE"], "pooja_room": ["NE"], "master_bedroom": ["SW"]}) is None
+        assert table.lookup(dict(reversed(list(ZONES_3X3.items())))) is None
+        assert table.lookup(ZONES_3X3, get_grid("9x9")) is None
+        assert table.lookup(ZONES_9X9, get_grid("8x8")) is None
+    finally:
+        table.close()
+
+
+def test_rejects_stale_or_foreign_files(tmp_path):
+    path = tmp_path / "table.bin"
+    _build(path)
+    assert LayoutTable.open(str(path), "other") is None
+    assert LayoutTable.open(str(tmp_path / "missing.bin")) is None
+
+    bogus = tmp_path / "bogus.bin"
+    bogus.write_bytes(b"NOPE" + bytes(64))
+    assert LayoutTable.open(str(bogus)) is None
@@ -0,0 +1,97 @@
+import json
+
+from app.result_cache import ResultCache, cacheable, canonical_key
+from app.schemas import UserInput
+
+
+PAYLOAD = {
+    "plot": {"length": 40, "width": 30, "unit": "ft", "shape": "rectangle", "facing": "east"},
+    "building": {"floors": "G+1", "building_type": "independent_house"},
+    "rooms": {"bedrooms": 3, "bathrooms": 2, "kitchen": True, "living_room": True,
+              "dining_area": True, "pooja_room": True, "parking": True},
+    "vastu_preference": "high",
+    "vastu_level": "high",
+    "output": {"number_of_plans": 2, "output_format": "2D", "export_format": ["PDF"]},
+    "seed": 7,
+}
+
+
+def _input(**changes):
+    data = json.loads(json.dumps(PAYLOAD))
+    for path, value in changes.items():
+        *parents, leaf = path.split("__")
+        node = data
+        for p in parents:
+            node = node[p]
+        node[leaf] = value
+    return UserInput(**data)
+
+
+def _key(user_input, **kw):
+    return canonical_key("design", user_input, "v1", **kw)
+
+
+def test_key_ignores_field_order_and_spelling():
+    base = _key(_input())
+    reordered = dict(reversed(list(PAYLOAD.items())))
+    reordered["plot"] = dict(reversed(list(PAYLOAD["plot"].items())))
+    assert _key(UserInput(**reordered)) == base
+    assert _key(_input(plot__unit="Feet", plot__facing="East-facing", plot__length=40.0)) == base
+
+
+def test_key_fills_defaults():
+    base = _key(_input())
+    explicit = _input(lifestyle={"layout_style": "modern", "open_kitchen": True, "natural_light_priority": "medium"},
+                      room_sizes={}, entrance={"main_entrance_preference": [], "separate_service_entry": False})
+    assert _key(explicit) == base
+    # Anything but high/medium is the same rule set
+    assert _key(_input(vastu_level="low")) == _key(_input(vastu_level="whatever"))
+    # Filing metadata and deadlines don't change the design
+    assert _key(_input(project={"id": "p1"}, output__deadline_ms=500)) == base
+
+
+def test_key_separates_real_differences():
+    base = _key(_input())
+    assert _key(_input(seed=8)) != base
+    assert _key(_input(plot__facing="north")) != base
+    assert _key(_input(plot__facing="north"), facing=False) == _key(_input(), facing=False)
+    assert canonical_key("prompt", _input(), "v1") != base
+    assert canonical_key("design", _input(), "v2") != base
+
+
+def test_unseeded_requests_are_not_cacheable():
+    assert cacheable(_input())
+    assert not cacheable(_input(seed=None))
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = ResultCache(max_entries=2, max_bytes=1000)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a") == "x" * 10 # a is now most recent
+    cache.put("c", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache.put("big", "w" * 995)
+    assert cache.get("big") is not None
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.total_bytes <= 1000
+    assert cache.stats()["evictions"] == 3
+
+    # Larger than the whole cache: not stored at all
+    cache.put("huge", "v" * 2000)
+    assert cache.get("huge") is None and cache.get("big") is not None
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.result_cache.time.monotonic", lambda: now[0])
+    cache = ResultCache(ttl=60)
+    cache.put("k", {"v": 1})
+    now[0] += 59
+    assert cache.get("k") == {"v": 1}
+    now[0] += 2
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
@@ -0,0 +1,113 @@
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app import profiling
+from app.stage_graph import StageExecutor, StageGraph
+
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture
+def executor():
+    ex = StageExecutor(threads=4)
+    yield ex
+    ex.shutdown()
+
+
+def test_add_rejects_unknown_and_duplicate_stages():
+    graph = StageGraph()
+    graph.add("plan", lambda: 1)
+    with pytest.raises(ValueError):
+        graph.add("plan", lambda: 2)
+    with pytest.raises(ValueError):
+        graph.add("render", lambda plan: plan, "missing")
+
+
+def test_stages_run_after_their_dependencies(executor):
+    finished = []
+    lock = threading.Lock()
+
+    def stage(name, value, delay=0.0):
+        def fn(*args):
+            time.sleep(delay)
+            with lock:
+                finished.append(name)
+            return value + sum(args)
+        return fn
+
+    graph = StageGraph()
+    graph.add("plan", stage("plan", 1, delay=0.05))
+    graph.add("summary", stage("summary", 10))
+    graph.add("render", stage("render", 100), "plan")
+    graph.add("report", stage("report", 1000), "render", "summary")
+    results = executor.run(graph)
+
+    assert results == {"plan": 1, "summary": 10, "render": 101, "report": 1111}
+    # summary doesn't wait for the slow plan; render and report do
+    assert finished.index("summary") < finished.index("plan")
+    assert finished.index("plan") < finished.index("render") < finished.index("report")
+
+
+def test_failed_stage_skips_dependents_and_reraises(executor):
+    ran = []
+
+    def boom():
+        raise RuntimeError("render failed")
+
+    def slow_independent():
+        time.sleep(0.05)
+        ran.append("summary")
+        return "text"
+
+    graph = StageGraph()
+    graph.add("render", boom)
+    graph.add("summary", slow_independent)
+    graph.add("report", lambda img, text: ran.append("report"), "render", "summary")
+    with pytest.raises(RuntimeError, match="render failed"):
+        executor.run(graph)
+    # Already running stages finish before the error surfaces; dependents never start
+    assert ran == ["summary"]
+
+
+def test_contextvars_reach_pool_threads(executor):
+    token = request_id.set("req-1")
+    try:
+        graph = StageGraph()
+        graph.add("a", lambda: (request_id.get(), threading.current_thread().name))
+        graph.add("b", lambda a: request_id.get(), "a")
+        results = executor.run(graph)
+    finally:
+        request_id.reset(token)
+
+    value, thread = results["a"]
+    assert value == "req-1" and thread.startswith("vastu-stage")
+    assert results["b"] == "req-1"
+
+
+def test_stage_context_changes_stay_in_the_stage(executor):
+    graph = StageGraph()
+    graph.add("a", lambda: request_id.set("inside"))
+    executor.run(graph)
+    assert request_id.get() is None
+
+
+def test_inline_without_threads_or_while_profiling():
+    graph = StageGraph()
+    graph.add("a", lambda: threading.current_thread().name)
+    graph.add("b", lambda a: a + "!", "a")
+    main = threading.current_thread().name
+
+    inline = StageExecutor(threads=0)
+    assert inline.run(graph) == {"a": main, "b": main + "!"}
+
+    ex = StageExecutor(threads=2)
+    token = profiling._capturing.set(True)
+    try:
+        assert ex.run(graph)["a"] == main
+    finally:
+        profiling._capturing.reset(token)
+        ex.shutdown()